@@ -1,3 +1,4 @@
+import typing
 import utils.utils as ut
 import model.states.assignment as asn
 
@@ -5,18 +6,15 @@ import model.states.assignment as asn
 
 class Action:
     # Elements of an operator instance.
+    __slots__ = ("operator", "preconditions", "effects", "location")
 
-    def __init__(self, operator: str, preconditions: list[asn.Assignment], effects: list[asn.Assignment]):
+    def __init__(self, operator: str, preconditions: typing.Iterable[asn.Assignment], effects: typing.Iterable[asn.Assignment]):
         self.operator = operator # a string that describes the operator instance.
-        self.preconditions = preconditions # lists of assignments.
-        self.effects = effects # lists of assignments.
+        self.preconditions = tuple(preconditions) # tuples of assignments.
+        self.effects = tuple(effects) # tuples of assignments.
 
         self.location = None  # Position of action in the totally ordered plan, starting at 0.
-        self.predecessor_links = []  # Causal links with self as its consumer.
-        self.predecessor_actions = []  # Producer actions that are linked self as its consumer.
-
-        self.successor_actions = []  # Actions that immediately follow action in its partial ordered plan.
-        self.successor_links = []  # Causal links with self as its producer.
+        # The links and actions adjacent to an action in its partial order plan are held by its compiled plan.
 
     def __str__(self):
         pres = ut.list2string(self.preconditions)
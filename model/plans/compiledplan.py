@@ -0,0 +1,91 @@
+from array import array
+import model.actions.action as am
+import model.plans.partialorderplan as pp
+
+# Compiled plan:
+
+# The read only form of a partial order plan that the executive dispatches.
+# A compiled plan is never changed by an execution, so that one compiled plan can back
+# any number of executions, each of which keeps its own state (see planexecutive.executioncontext).
+
+# Actions are identified by integer ids, their locations in the encoded plan sequence.
+# The adjacency of actions is held in compressed sparse row (CSR) arrays, as in CompactDirectedGraph:
+# the successors of action i are successor_ids[successor_offsets[i]:successor_offsets[i + 1]].
+# The successors of an action are the consumers of the links it produces, followed by the successors
+# of its orderings.  Links are listed in the order the compiler closes them, from the last producer to the first,
+# by the producer's effects, then by the order of links; orderings are listed in the order of the plan's orderings.
+
+class CompiledPlan:
+    def __init__(self, partial_order_plan: pp.PartialOrderPlan):
+        self.name = partial_order_plan.name
+        self.actions: tuple[am.Action, ...] = tuple(partial_order_plan.actions)
+        self.links: tuple[pp.CausalLink, ...] = tuple(partial_order_plan.links)
+        self.orderings: tuple[pp.Ordering, ...] = tuple(partial_order_plan.orderings)
+        self.start = partial_order_plan.start_action.location  # Id of the start action.
+
+        n = len(self.actions)
+        successors = [[] for _ in range(n)]
+        predecessors = [[] for _ in range(n)]
+        produced = [[] for _ in range(n)]
+        consumed = [[] for _ in range(n)]
+
+        closing = []
+        for i, link in enumerate(self.links):
+            producer = link.producer
+            if producer is not None:
+                closing.append((-producer.location, producer.effects.index(link.condition), i))
+        closing.sort()
+        for _, _, i in closing:
+            link = self.links[i]
+            producer = link.producer.location
+            consumer = link.consumer.location
+            successors[producer].append(consumer)
+            predecessors[consumer].append(producer)
+            produced[producer].append(i)
+            consumed[consumer].append(i)
+
+        for ordering in self.orderings:
+            successors[ordering.predecessor.location].append(ordering.successor.location)
+            predecessors[ordering.successor.location].append(ordering.predecessor.location)
+
+        self.successor_offsets, self.successor_ids = csr_arrays(successors)
+        self.predecessor_offsets, self.predecessor_ids = csr_arrays(predecessors)
+        self.produced_offsets, self.produced_link_ids = csr_arrays(produced)
+        self.consumed_offsets, self.consumed_link_ids = csr_arrays(consumed)
+
+        # Number of predecessors of each action, counting an action once for each link or ordering.
+        self.predecessor_counts = array('l', [len(p) for p in predecessors])
+
+    def __str__(self):
+        return f"Compiled plan {self.name}"
+
+    def action_count(self) -> int:
+        return len(self.actions)
+
+    def successors(self, action_id: int) -> array:
+        # Returns the ids of the successors of action_id.
+        return self.successor_ids[self.successor_offsets[action_id]:self.successor_offsets[action_id + 1]]
+
+    def predecessors(self, action_id: int) -> array:
+        # Returns the ids of the predecessors of action_id.
+        return self.predecessor_ids[self.predecessor_offsets[action_id]:self.predecessor_offsets[action_id + 1]]
+
+    def produced_links(self, action_id: int) -> list[pp.CausalLink]:
+        # Returns the causal links produced by action_id.
+        links = self.links
+        return [links[i] for i in self.produced_link_ids[self.produced_offsets[action_id]:self.produced_offsets[action_id + 1]]]
+
+    def consumed_links(self, action_id: int) -> list[pp.CausalLink]:
+        # Returns the causal links consumed by action_id.
+        links = self.links
+        return [links[i] for i in self.consumed_link_ids[self.consumed_offsets[action_id]:self.consumed_offsets[action_id + 1]]]
+
+
+def csr_arrays(lists: list[list[int]]) -> tuple[array, array]:
+    # Returns the offsets and ids of the compressed sparse row form of lists.
+    offsets = array('l', [0])
+    ids = array('l')
+    for items in lists:
+        ids.extend(items)
+        offsets.append(len(ids))
+    return offsets, ids
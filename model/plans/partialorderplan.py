@@ -6,6 +6,8 @@ import typing
 
 class CausalLink:
     # Describes the actions that produce and rely upon a condition.
+    __slots__ = ("condition", "producer", "consumer")
+
     def __init__(self, condition: asn.Assignment, producer: am.Action or None, consumer: am.Action):
         self.condition = condition  # An assignment
         self.producer = producer  # Action with an effect that is condition.
@@ -16,6 +18,8 @@ class CausalLink:
 
 class LinkConflict:
     # Conflict between an activated causal link and an observed value.
+    __slots__ = ("link", "observed_value")
+
     def __init__(self, link: CausalLink, observed_value: typing.Any):
         self.link = link  # The active causal link that was violated.
         self.observed_value = observed_value  # Observed value that violates
@@ -26,6 +30,8 @@ class LinkConflict:
 
 class Ordering:
     # Specifies a partial order between actions in a plan.
+    __slots__ = ("predecessor", "successor")
+
     def __init__(self, predecessor: am.Action, successor: am.Action):
         self.predecessor = predecessor  # Action that occurs first.
         self.successor = successor  # Action that occurs later.
@@ -35,6 +41,8 @@ class Ordering:
 
 class Threat:
     # Specifies the threat of an action to a causal link.
+    __slots__ = ("link", "action")
+
     def __init__(self, causal_link: CausalLink, action: am.Action):
         self.link = causal_link  # Causal link whose condition is threatened.
         self.action = action  # Action that threatens the link.
@@ -1,6 +1,8 @@
 import model.actions.action as am
 import model.states.assignment as asn
+import model.plans.compiledplan as cp
 import plancompiler.extractpartialorderplan as ex
+import plancompiler.plancache as pc
 import utils.utils as ut
 
 # Total Order Plan:
@@ -14,17 +16,26 @@ class TotalOrderPlan:
     # - Its partial order plan is the set of plan actions, causal links that close preconditions,
     #   and orderings that are needed to resolve threats.
 
-    def __init__(self, name: str, action_sequence: list[am.Action], start : list[asn.Assignment], goal: list[asn.Assignment]):
+    def __init__(self, name: str, action_sequence: list[am.Action], start : list[asn.Assignment], goal: list[asn.Assignment],
+                 graph_engine: str = "object", plan_cache: pc.CompiledPlanCache = None, backend: str = "python"):
         # Record the plan, encode it and extract its least commitment plan.
+        # graph_engine selects the graph implementation used by the compiler ("object" or "compact").
+        # If plan_cache is given, a plan compiled before is restored from the cache, rather than compiled.
+        # backend selects the compiler implementation ("python" or "numpy").
         self.name = name
         self.action_sequence = action_sequence
         self.start = start
         self.goal = goal
         encoding = encode_total_order_plan(action_sequence, start, goal)
         self.encoded_sequence = encoding
-        pop_plan, threats = ex.extract_partial_order_plan(self.name, self.encoded_sequence)
+        if plan_cache is None:
+            pop_plan, threats = ex.extract_partial_order_plan(self.name, self.encoded_sequence, graph_engine, backend)
+        else:
+            pop_plan, threats = plan_cache.compile(self.name, self.encoded_sequence, graph_engine, backend)
         self.partial_order_plan = pop_plan
         self.threats = threats
+        # The read only form of the partial order plan, shared by the plan's executions.
+        self.compiled_plan = cp.CompiledPlan(pop_plan)
         if threats:
             actstr = ut.list2string(self.action_sequence)
             print(f"In plan {self}: {actstr}:")
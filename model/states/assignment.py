@@ -1,11 +1,34 @@
 class Assignment:
     # A variable / value assignment.
-    def __init__(self, variable: str, value):
-        self.variable = variable
-        self.value = value
+    # Assignments created by a SymbolTable are shared, and record the ids of their variable and value;
+    # other assignments have ids None.  Assignments are equal if they assign the same value to the same variable.
+    # Assignments are immutable, so that they can be shared and hashed.
+    __slots__ = ("variable", "value", "variable_id", "value_id")
+
+    def __init__(self, variable: str, value, variable_id: int = None, value_id: int = None):
+        object.__setattr__(self, "variable", variable)
+        object.__setattr__(self, "value", value)
+        object.__setattr__(self, "variable_id", variable_id)
+        object.__setattr__(self, "value_id", value_id)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Can't set {name} of assignment {self}, which is immutable.")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Can't delete {name} of assignment {self}, which is immutable.")
+
+    def __reduce__(self):
+        return Assignment, (self.variable, self.value, self.variable_id, self.value_id)
 
     def __eq__(self, other):
-        return isinstance(other, Assignment) and self.__dict__ == other.__dict__
+        # Equal shared assignments of the same table are identical, so the identity test settles most comparisons.
+        # Otherwise the variables and values are compared, which is fast for interned strings.
+        if self is other:
+            return True
+        return isinstance(other, Assignment) and self.variable == other.variable and self.value == other.value
+
+    def __hash__(self):
+        return hash((self.variable, self.value))
 
     def __str__(self):
-        return f"{self.variable}={self.value}"
\ No newline at end of file
+        return f"{self.variable}={self.value}"
@@ -1,5 +1,6 @@
 import utils.utils as ut
 import model.states.assignment as asn
+import model.states.symboltable as sym
 
 # Classes that represent a state space (States and Operators):
 
@@ -33,5 +34,5 @@ class State:
             return None
 
     def assign_value(self, variable, value):
-        assignment: asn.Assignment = asn.Assignment(variable,value)
+        assignment: asn.Assignment = sym.symbols.assignment(variable, value)
         self.assignments[variable] = assignment
@@ -0,0 +1,74 @@
+import threading
+import model.states.assignment as asn
+
+# Symbol table:
+
+# Interns the variables and values of plans and scenarios as they are loaded.
+# Each distinct variable and value is stored once, and numbered by a small integer, its id.
+# Each distinct assignment is a single shared Assignment, a flyweight,
+# so that plans with many repeated conditions hold one object per condition,
+# and equal assignments, variables and values are the same objects.
+# Assignments are immutable once shared; a changed state is a different assignment.
+
+# A table is shared by the threads of a process (see symbols), so that a symbol is interned under the table's lock;
+# a symbol already interned is looked up without it.  Only the symbols of plans and scenarios are interned:
+# values observed while executing are looked up without interning them (see currentstate),
+# so that the table grows with the plans and scenarios loaded, not with telemetry.
+
+class SymbolTable:
+    def __init__(self):
+        self.variables = []  # Variables, indexed by id.
+        self.variable_ids = dict()  # Maps a variable to its id.
+        self.values = []  # Values, indexed by id.
+        self.value_ids = dict()  # Maps a value to its id.
+        self.assignments = dict()  # Maps a (variable, value) pair to its shared assignment.
+        self.lock = threading.Lock()  # Held while interning.
+
+    def __str__(self):
+        return f"Symbol table of {len(self.variables)} variables, {len(self.values)} values"
+
+    def variable_id(self, variable: str) -> int:
+        # Returns the id of variable, interning it if new.
+        vid = self.variable_ids.get(variable)
+        if vid is None:
+            with self.lock:
+                vid = self.variable_ids.get(variable)
+                if vid is None:
+                    # The variable is listed before its id is published, so that an id always has its variable.
+                    self.variables.append(variable)
+                    vid = self.variable_ids[variable] = len(self.variables) - 1
+        return vid
+
+    def value_id(self, value) -> int:
+        # Returns the id of value, interning it if new.
+        vid = self.value_ids.get(value)
+        if vid is None:
+            with self.lock:
+                vid = self.value_ids.get(value)
+                if vid is None:
+                    self.values.append(value)
+                    vid = self.value_ids[value] = len(self.values) - 1
+        return vid
+
+    def assignment(self, variable: str, value) -> asn.Assignment:
+        # Returns the shared assignment of value to variable, creating it if new.
+        assignment = self.assignments.get((variable, value))
+        if assignment is None:
+            variable_id = self.variable_id(variable)
+            value_id = self.value_id(value)
+            assignment = asn.Assignment(self.variables[variable_id], self.values[value_id], variable_id, value_id)
+            # Another thread may have made the assignment meanwhile; the first one made is shared.
+            assignment = self.assignments.setdefault((variable, value), assignment)
+        return assignment
+
+    def intern_assignments(self, assignments: dict) -> dict:
+        # Returns a copy of a dictionary of variable / value assignments,
+        # whose variables and values are the interned ones.
+        variables = self.variables
+        values = self.values
+        return {variables[self.variable_id(variable)]: values[self.value_id(value)]
+                for variable, value in assignments.items()}
+
+
+# The symbol table shared by the plans and scenarios loaded in a process.
+symbols = SymbolTable()
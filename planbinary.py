@@ -0,0 +1,335 @@
+import functools
+import json
+import mmap
+import struct
+import sys
+from array import array
+from pathlib import Path
+import model.states.symboltable as sym
+import model.actions.action as at
+import model.plans.totalorderplan as tp
+import plancompiler.plancache as pc
+import planexecutive.executionscenario as es
+
+# Binary plan and scenario format:
+
+# A compact encoding of total order plans and execution scenarios, which is read without parsing:
+# a plan or scenario file is memory mapped, and while it is open, its actions or stages are decoded only when they are read.
+# Loading a plan decodes all its actions, which the compiler needs, and closes the file;
+# a dispatched scenario decodes one stage at a time.
+# Strings (names, variables and values) are stored once, in a string table, and referred to by their index.
+# Assignments are stored once, as pairs of a variable and a value index, and referred to by their index.
+# Sets of assignments are runs of assignment indexes in a pool, each referred to by its start and length.
+# Actions and stages are fixed width records, so that the record of any action or stage is found directly.
+
+#        <file> ::= <header> <string_offsets> <string_bytes> <assignments> <pool> <records>
+#      <header> ::= <magic> <version: u16> <reserved: u16>
+#                   <string_count> <assignment_count> <pool_count> <record_count>
+#                   <name> <plan_name> <start_start> <start_count> <goal_start> <goal_count>
+#  <string_offsets> ::= (string_count + 1) u32 offsets of each string's utf-8 bytes in <string_bytes>
+#  <assignments> ::= (<variable: u32> <value: u32>)*
+#        <pool> ::= <assignment: u32>*
+#      <record> ::= <action: u32> <precondition_start> <precondition_count> <effect_start> <effect_count>   (plans)
+#                 | <action: u32> <state_change_start> <state_change_count>                                (scenarios)
+
+# Numbers are little endian, and every u32 not otherwise marked.  Sections are padded to multiples of 4 bytes.
+# magic is "RXPL" for a plan and "RXSC" for a scenario; a plan's plan_name is its name, and a scenario has no goal.
+# A value that isn't a string is stored as its json text, with the top bit of its index set.
+
+PLAN_MAGIC = b"RXPL"
+SCENARIO_MAGIC = b"RXSC"
+BINARY_VERSION = 1
+
+header_format = struct.Struct("<4sHH10I")
+plan_record_format = struct.Struct("<5I")
+stage_record_format = struct.Struct("<3I")
+pair_format = struct.Struct("<2I")
+JSON_VALUE = 0x80000000  # Marks a value index whose string is json text.
+
+
+# ***  Converting json descriptions to the binary format ***
+
+class BinaryEncoder:
+    # Collects the strings, assignments and assignment pool of a binary file as it is encoded.
+
+    def __init__(self):
+        self.string_ids: dict[str, int] = dict()
+        self.assignment_ids: dict[tuple[int, int], int] = dict()
+        self.pool: list[int] = []
+
+    def __str__(self):
+        return f"Binary encoder of {len(self.string_ids)} strings, {len(self.assignment_ids)} assignments"
+
+    def string_id(self, string: str) -> int:
+        sid = self.string_ids.get(string)
+        if sid is None:
+            sid = self.string_ids[string] = len(self.string_ids)
+        return sid
+
+    def value_id(self, value) -> int:
+        if isinstance(value, str):
+            return self.string_id(value)
+        return self.string_id(json.dumps(value)) | JSON_VALUE
+
+    def assignments(self, dict_assignments: dict) -> tuple[int, int]:
+        # Adds the assignments of dict_assignments to the pool, and returns their start and count.
+        start = len(self.pool)
+        for variable, value in dict_assignments.items():
+            pair = (self.string_id(variable), self.value_id(value))
+            aid = self.assignment_ids.get(pair)
+            if aid is None:
+                aid = self.assignment_ids[pair] = len(self.assignment_ids)
+            self.pool.append(aid)
+        return start, len(dict_assignments)
+
+    def encode(self, magic: bytes, name: str, plan_name: str, start: tuple[int, int], goal: tuple[int, int],
+               records: list[tuple], record_format: struct.Struct) -> bytes:
+        # Returns the binary file of records, whose strings and assignments have been added to the encoder.
+        string_bytes = [string.encode("utf-8") for string in self.string_ids]
+        offsets = [0]
+        for encoded in string_bytes:
+            offsets.append(offsets[-1] + len(encoded))
+        header = header_format.pack(magic, BINARY_VERSION, 0, len(string_bytes), len(self.assignment_ids),
+                                    len(self.pool), len(records), self.string_ids[name], self.string_ids[plan_name],
+                                    start[0], start[1], goal[0], goal[1])
+        blob = b"".join(string_bytes)
+        parts = [header, struct.pack(f"<{len(offsets)}I", *offsets), blob, bytes(-len(blob) % 4)]
+        parts.append(struct.pack(f"<{2 * len(self.assignment_ids)}I", *(i for pair in self.assignment_ids for i in pair)))
+        parts.append(struct.pack(f"<{len(self.pool)}I", *self.pool))
+        parts.extend(record_format.pack(*record) for record in records)
+        return b"".join(parts)
+
+
+def plan_dict2binary(dict_plan: dict) -> bytes:
+    # Returns the binary encoding of a dictionary description of a total order plan (see planlibrary).
+    encoder = BinaryEncoder()
+    name = dict_plan["plan_name"]
+    encoder.string_id(name)
+    start = encoder.assignments(dict_plan["start"])
+    goal = encoder.assignments(dict_plan["goal"])
+    records = [(encoder.string_id(action["action"]), *encoder.assignments(action["precondition"]),
+                *encoder.assignments(action["effect"]))
+               for action in dict_plan["sequence"]]
+    return encoder.encode(PLAN_MAGIC, name, name, start, goal, records, plan_record_format)
+
+def scenario_dict2binary(dict_scenario: dict) -> bytes:
+    # Returns the binary encoding of a dictionary description of an execution scenario (see planlibrary).
+    encoder = BinaryEncoder()
+    name = dict_scenario["scenario_name"]
+    plan_name = dict_scenario["plan_name"]
+    encoder.string_id(name)
+    encoder.string_id(plan_name)
+    start = encoder.assignments(dict_scenario["start"])
+    records = [(encoder.string_id(stage["action"]), *encoder.assignments(stage["state_change"]))
+               for stage in dict_scenario["sequence"]]
+    return encoder.encode(SCENARIO_MAGIC, name, plan_name, start, (0, 0), records, stage_record_format)
+
+def json2binary(json_path: str, binary_path: str = None) -> Path:
+    # Converts the json plan or scenario file at json_path to the binary format,
+    # written to binary_path, by default json_path with the suffix .bin.  Returns the path written.
+    json_path = Path(json_path)
+    binary_path = json_path.with_suffix(".bin") if binary_path is None else Path(binary_path)
+    with open(json_path, "rt") as file:
+        description = json.load(file)
+    if "scenario_name" in description:
+        encoded = scenario_dict2binary(description)
+    else:
+        encoded = plan_dict2binary(description)
+    with open(binary_path, "wb") as file:
+        file.write(encoded)
+    return binary_path
+
+
+# ***  Reading binary files ***
+
+class BinaryFile:
+    # A memory mapped plan or scenario file in the binary format.
+    # The pool and records are read in place, as arrays of u32 over the mapped file (copied only on big endian machines).
+    # Strings and assignments are decoded when first read, and assignments are the shared ones of symbol_table.
+    # The file is read only until it is closed, by close or at the end of a with statement.
+
+    def __init__(self, path: str, magic: bytes, record_format: struct.Struct, symbol_table: sym.SymbolTable = sym.symbols):
+        self.path = Path(path)
+        self.symbol_table = symbol_table
+        with open(self.path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+        (file_magic, version, _, string_count, assignment_count, pool_count, record_count,
+         name, plan_name, start_start, start_count, goal_start, goal_count) = header_format.unpack_from(self.map, 0)
+        if file_magic != magic or version != BINARY_VERSION:
+            self.map.close()
+            raise ValueError(f"{self.path} is not a version {BINARY_VERSION} {magic.decode()} file.")
+        self.record_count = record_count
+        self.record_width = record_format.size // 4  # Words of each record.
+
+        # Sections.
+        offset = header_format.size
+        if offset + 4 * (string_count + 1) > len(self.map):
+            self.close()
+            raise ValueError(f"{self.path} is truncated.")
+        self.string_offsets = self.words(offset, string_count + 1)
+        self.string_bytes = offset + 4 * (string_count + 1)
+        string_end = self.string_offsets[string_count]
+        offset = self.string_bytes + string_end + (-string_end % 4)
+        self.assignment_words = self.words(offset, 2 * assignment_count)
+        offset += 8 * assignment_count
+        self.pool = self.words(offset, pool_count)
+        offset += 4 * pool_count
+        if offset + 4 * self.record_width * record_count > len(self.map):
+            self.close()
+            raise ValueError(f"{self.path} is truncated.")
+        self.records = self.words(offset, self.record_width * record_count)
+
+        self.strings: list[str or None] = [None] * string_count
+        self.assignments: list[object] = [None] * assignment_count
+        self.name = self.string(name)
+        self.plan_name = self.string(plan_name)
+        self.start_run = (start_start, start_count)
+        self.goal_run = (goal_start, goal_count)
+
+    def __str__(self):
+        return f"Binary file {self.path}"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def words(self, offset: int, count: int):
+        # Returns the count u32 at offset in the file.
+        words = memoryview(self.map)[offset:offset + 4 * count].cast("I")
+        if sys.byteorder == "little":
+            return words
+        swapped = array("I", words)
+        swapped.byteswap()
+        words.release()
+        return swapped
+
+    def close(self):
+        # Releases the arrays over the mapped file before closing it.
+        for name in ("string_offsets", "assignment_words", "pool", "records"):
+            words = getattr(self, name, None)
+            if isinstance(words, memoryview):
+                words.release()
+        self.map.close()
+
+    def string(self, sid: int) -> str:
+        string = self.strings[sid]
+        if string is None:
+            start = self.string_bytes + self.string_offsets[sid]
+            end = self.string_bytes + self.string_offsets[sid + 1]
+            string = self.strings[sid] = str(self.map[start:end], "utf-8")
+        return string
+
+    def value(self, vid: int):
+        if vid & JSON_VALUE:
+            return json.loads(self.string(vid & ~JSON_VALUE))
+        return self.string(vid)
+
+    def assignment(self, aid: int):
+        # Returns the shared assignment of index aid.
+        assignment = self.assignments[aid]
+        if assignment is None:
+            words = self.assignment_words
+            assignment = self.assignments[aid] = self.symbol_table.assignment(self.string(words[2 * aid]),
+                                                                              self.value(words[2 * aid + 1]))
+        return assignment
+
+    def assignment_run(self, start: int, count: int) -> list:
+        # Returns the assignments of the run of count assignments at start in the pool.
+        assignments = self.assignments
+        return [assignments[aid] or self.assignment(aid) for aid in self.pool[start:start + count]]
+
+    def record(self, index: int):
+        width = self.record_width
+        return self.records[width * index:width * (index + 1)]
+
+
+class BinaryPlanFile(BinaryFile):
+    # A memory mapped total order plan in the binary format, whose actions are decoded when first read.
+    # Actions read before the file is closed remain valid, but no other action can be read after it is closed.
+
+    def __init__(self, path: str, symbol_table: sym.SymbolTable = sym.symbols):
+        BinaryFile.__init__(self, path, PLAN_MAGIC, plan_record_format, symbol_table)
+        self.actions: list[at.Action or None] = [None] * self.record_count
+
+    def action_count(self) -> int:
+        return self.record_count
+
+    def action(self, index: int) -> at.Action:
+        # Returns the action at index in the plan's sequence.
+        action = self.actions[index]
+        if action is None:
+            name, pre_start, pre_count, eff_start, eff_count = self.record(index)
+            action = self.actions[index] = at.Action(self.string(name), self.assignment_run(pre_start, pre_count),
+                                                     self.assignment_run(eff_start, eff_count))
+        return action
+
+    def start(self) -> list:
+        return self.assignment_run(*self.start_run)
+
+    def goal(self) -> list:
+        return self.assignment_run(*self.goal_run)
+
+    def total_order_plan(self, plan_cache: pc.CompiledPlanCache = None, backend: str = "python") -> tp.TotalOrderPlan:
+        # Returns the total order plan of the file, compiled as PlanLibrary.dict2plan compiles it.
+        sequence = [self.action(index) for index in range(self.record_count)]
+        return tp.TotalOrderPlan(self.name, sequence, self.start(), self.goal(), plan_cache = plan_cache, backend = backend)
+
+
+class BinaryScenarioFile(BinaryFile):
+    # A memory mapped execution scenario in the binary format, whose stages are decoded when read.
+
+    def __init__(self, path: str, symbol_table: sym.SymbolTable = sym.symbols):
+        BinaryFile.__init__(self, path, SCENARIO_MAGIC, stage_record_format, symbol_table)
+
+    def stage_count(self) -> int:
+        return self.record_count
+
+    def start(self) -> dict:
+        return {assignment.variable: assignment.value for assignment in self.assignment_run(*self.start_run)}
+
+    def stage(self, index: int) -> es.Stage:
+        name, change_start, change_count = self.record(index)
+        state_change = {assignment.variable: assignment.value
+                        for assignment in self.assignment_run(change_start, change_count)}
+        return es.Stage(self.string(name), state_change)
+
+
+def load_binary_plan(path: str, plan_cache: pc.CompiledPlanCache = None, backend: str = "python") -> tp.TotalOrderPlan:
+    # Returns the total order plan of the binary file at path.
+    # Every action is decoded, since the plan is compiled; to decode only some actions, use a BinaryPlanFile.
+    with BinaryPlanFile(path) as plan_file:
+        return plan_file.total_order_plan(plan_cache, backend)
+
+def read_binary_scenario(path: str) -> es.StreamingExecutionScenario:
+    # Returns the scenario of the binary file at path, whose stages are read from the file each time it is dispatched.
+    with BinaryScenarioFile(path) as scenario_file:
+        return es.StreamingExecutionScenario(scenario_file.name, scenario_file.plan_name, scenario_file.start(),
+                                             functools.partial(binary_stages, str(path)))
+
+def binary_stages(path: str):
+    # Yields the stages of the binary scenario file at path.
+    with BinaryScenarioFile(path) as scenario_file:
+        for index in range(scenario_file.stage_count()):
+            yield scenario_file.stage(index)
+
+def binary_name(path: str, plan_namep = False) -> str or None:
+    # Returns the name of the plan or scenario in the binary file at path, or if plan_namep, its plan_name,
+    # reading only its header and name, or None if it isn't a binary plan or scenario file.
+    try:
+        with open(path, "rb") as file:
+            header = file.read(header_format.size)
+            fields = header_format.unpack(header)
+            magic, version, string_count, name = fields[0], fields[1], fields[3], fields[8 if plan_namep else 7]
+            if magic not in (PLAN_MAGIC, SCENARIO_MAGIC) or version != BINARY_VERSION:
+                return None
+            file.seek(header_format.size + 4 * name)
+            start, end = pair_format.unpack(file.read(8))
+            file.seek(header_format.size + 4 * (string_count + 1) + start)
+            encoded = file.read(end - start)
+            if len(encoded) != end - start:
+                return None
+            return str(encoded, "utf-8")
+    except (OSError, struct.error, UnicodeDecodeError):
+        return None
@@ -1,31 +1,53 @@
 import utils.directedgraph as dg
+import utils.compactgraph as cg
 import model.actions.action as am
 import model.plans.partialorderplan as pp
 
 # Identifies a subset of the orderings of a partial order plan that, together with the causal links, imply all other orderings.
 # Used to ensure the plan is "least commitment".
 
-def remove_dominated_orderings(graph: dg.DirectedGraph, orderings: list[pp.Ordering]) -> list[pp.Ordering]:
+# Graph implementations that a plan can be compiled with, selected by name:
+# - "object" represents each vertex and edge as an object.
+# - "compact" represents vertices and edges as integer ids into arrays, for large plans.
+graph_engines = {"object": dg.DirectedGraph, "compact": cg.CompactDirectedGraph}
+
+def remove_dominated_orderings(graph: dg.DirectedGraph, orderings: list[pp.Ordering],
+                               trace: bool = False) -> list[pp.Ordering]:
     # Return a minimal subset of orderings that, together with links, imply all removed orderings.
+    # If trace is True, report how many orderings were removed.
 
     # Construct a directed graph that represents the causal links and orderings.
+    # Its reachability is recomputed by the reduction, rather than updated for each ordering.
+    graph.clear_reachability()
     graph = add_orderings_to_graph(graph, orderings)
 
-    # Identify spanning tree of graph, while selecting links over orderings.
-    # Spanning tree contains the minimal set of orderings.
-    graph.mark_preferred_spanning_tree()
+    # Identify the transitive reduction of graph, while selecting links over parallel orderings.
+    # An ordering outside the reduction is implied by the links and the orderings in the reduction,
+    # and the reduction contains the minimal set of orderings.
+    if graph.mark_transitive_reduction() is None:
+        # The links and orderings form a cycle, so no ordering can be shown to be implied by the others:
+        # keep them all, rather than whichever happen to be marked.
+        print(f"Keeping all {len(orderings)} orderings, which with the causal links form a cycle.")
+        return list(orderings)
 
     # extract orderings that are marked in the graph.
-    return marked_orderings(orderings,graph)
+    minimal_orderings = marked_orderings(orderings, graph)
+    if trace:
+        print(f"Removed {len(orderings) - len(minimal_orderings)} of {len(orderings)} orderings,"
+              f" as implied by causal links and {len(minimal_orderings)} remaining orderings.")
+    return minimal_orderings
 
 
-def graph_for_actions_and_links(start: am.Action, actions: list[am.Action], links: list[pp.CausalLink]) -> dg.DirectedGraph:
+def graph_for_actions_and_links(start: am.Action, actions: list[am.Action], links: list[pp.CausalLink],
+                                graph_engine: str = "object") -> dg.DirectedGraph:
     # Returns a directed graph that represents connections between actions,
     # that are established by the causal links.
     # Causal links are labeled with priority 1.
+    # graph_engine names the graph implementation in graph_engines.
 
     # - Start vertex corresponds to start action.
-    graph = dg.DirectedGraph(actions)
+    # - Actions and links form an acyclic graph, so paths are tested against its transitive closure.
+    graph = graph_engines[graph_engine](actions, True)
 
     for action in actions:
         graph.add_vertex(action, action == start)
@@ -51,7 +73,6 @@ def marked_orderings(orderings: list[pp.Ordering], graph: dg.DirectedGraph)-> li
 
     morderings = []
     for ordering in orderings:
-        edge = graph.edge_named[ordering]
-        if edge.mark:
-            morderings.append(edge)
+        if graph.edge_markedp(ordering):
+            morderings.append(ordering)
     return morderings
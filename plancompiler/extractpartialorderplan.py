@@ -1,20 +1,49 @@
+import bisect
 import model.actions.action as am
 import model.states.assignment as asn
 import model.plans.partialorderplan as pp
 import plancompiler.extractminimalordering as mo
+import plancompiler.numpycompiler as nc
+
+# Version of the plan compiler.
+# Increment whenever a change to the compiler changes the partial order plans it produces,
+# so that plans compiled by earlier versions are no longer used (see plancache).
+COMPILER_VERSION = 1
+
+# Limits of the numpy backend (see numpycompiler).
+# A plan of fewer than NUMPY_MIN_ACTIONS actions is compiled by the python backend,
+# which is faster on small plans: the numpy backend's fixed cost of encoding the plan as arrays dominates,
+# so that a 50 action plan compiles about 4 times slower (0.5 ms python, 2 ms numpy), and the two meet near 250 actions.
+# The numpy backend holds two bit matrices of actions x actions, 2 n^2 / 8 bytes for n actions;
+# a plan whose matrices would exceed NUMPY_MAX_MATRIX_BYTES (512 MB, about 46,000 actions) is compiled
+# by the python backend instead, with a warning.
+NUMPY_MIN_ACTIONS = 250
+NUMPY_MAX_MATRIX_BYTES = 512 * 1024 * 1024
 
 
 # Extract a Partial Order Plan:
 
-def extract_partial_order_plan(plan_name: str, encoded_sequence: list[am.Action]) -> tuple[pp.PartialOrderPlan, list[pp.Threat]]:
+def extract_partial_order_plan(plan_name: str, encoded_sequence: list[am.Action],
+                               graph_engine: str = "object", backend: str = "python") -> tuple[pp.PartialOrderPlan, list[pp.Threat]]:
     # Abstracts a total order plan to a partial order plan.
     # Takes as input the encoded_sequence of a total order plan,
     # with start and end operators added.
+    # graph_engine names the graph implementation used to compile orderings (see extractminimalordering).
+    # backend names the compiler implementation: "python", or "numpy", which gives the same plan (see numpycompiler),
+    # and is used for plans within its limits, NUMPY_MIN_ACTIONS and NUMPY_MAX_MATRIX_BYTES.
     # Returns a partial order plan, composed of <actions, causal links, orderings>.
 
+    if backend == "numpy" and len(encoded_sequence) >= NUMPY_MIN_ACTIONS:
+        matrix_bytes = nc.matrix_bytes(len(encoded_sequence))
+        if matrix_bytes <= NUMPY_MAX_MATRIX_BYTES:
+            return nc.extract_partial_order_plan(plan_name, encoded_sequence)
+        print(f"Plan {plan_name} of {len(encoded_sequence)} actions needs {matrix_bytes // (1024 * 1024)} MB"
+              f" to compile with the numpy backend, over its limit of {NUMPY_MAX_MATRIX_BYTES // (1024 * 1024)} MB."
+              f" Compiling it with the python backend.")
+
     actions = encoded_sequence  # The list is viewed as a set.
     links = extract_causal_links(plan_name, encoded_sequence)
-    orderings, threats = extract_orderings(encoded_sequence,links)
+    orderings, threats = extract_orderings(encoded_sequence, links, graph_engine)
     start_action = encoded_sequence[0] # start is 1st action of sequence
     partial_order_plan = pp.PartialOrderPlan(plan_name, actions, links, orderings, start_action)
     return partial_order_plan, threats
@@ -29,51 +58,64 @@ def extract_causal_links(plan_name: str, encoded_sequence: list[am.Action]) -> l
     # Returns the complete set of causal links.
 
     causal_links: list[pp.CausalLink] = []
-    active_links: list[pp.CausalLink] = []
+
+    # Links whose precondition is still open, indexed by the (variable, value) of their condition.
+    # An effect closes every open link with the same condition in a single lookup.
+    open_links: dict[tuple, list[pp.CausalLink]] = dict()
 
     # Process actions from plan end to start,
     # constructing causal links by pairing each action precondition with a preceding action effect.
-    # Also records action predecessors and successors according to the links.
+    # The adjacency of actions is not recorded on the actions; see compiledplan.
     for action in reversed(encoded_sequence):
         # print()
         # print(f"Extracting Causal links for {action}.")
 
-        # Note: no effect on the first pass, since no active links and
+        # Note: no effect on the first pass, since no open links and
         # goal operator has no effects.
         for effect in action.effects:
-            for link in active_links:
-                if link.condition == effect:
+            closed_links = open_links.pop((effect.variable, effect.value), None)
+            if closed_links:
+                for link in closed_links:
                     link.producer = action
-                    consumer = link.consumer
-                    action.successor_links.append(link)
-                    action.successor_actions.append(consumer)
-                    consumer.predecessor_links.append(link)
-                    consumer.predecessor_actions.append(action)
-                    active_links.remove(link)
         for precondition in action.preconditions:
             link = pp.CausalLink(precondition,None, action)
-            active_links.append(link)
+            key = (precondition.variable, precondition.value)
+            if key in open_links:
+                open_links[key].append(link)
+            else:
+                open_links[key] = [link]
             causal_links.append(link)
 
     # Warn that plan is incomplete (has open preconditions).
-    if active_links:
-        print()
-        print(f"Missing producers for conditions in plan {plan_name}:")
-        for link in active_links:
-            print(f"condition {link.condition} of action {link.consumer} ")
+    if open_links:
+        warn_missing_producers(plan_name, causal_links)
     return causal_links
 
 
-def extract_orderings(encoded_sequence: list[am.Action], links: list[pp.CausalLink]) -> tuple[list[pp.Ordering], list[pp.Threat]]:
+def warn_missing_producers(plan_name: str, causal_links: list[pp.CausalLink]):
+    # Prints the conditions of causal_links that have no producer.
+    print()
+    print(f"Missing producers for conditions in plan {plan_name}:")
+    for link in causal_links:
+        if link.producer is None:
+            print(f"condition {link.condition} of action {link.consumer} ")
+
+
+def extract_orderings(encoded_sequence: list[am.Action], links: list[pp.CausalLink],
+                      graph_engine: str = "object", trace: bool = False) -> tuple[list[pp.Ordering], list[pp.Threat]]:
     # Given the causal links of an encoded plan sequence,
     # extract additional orderings needed to resolve potential threats.
     # An encoded_sequence is ill formed if it has a threat that can't be resolved
     # (an action with an effect that prevents a subsequent action from being invoked).
+    # If trace is True, report how many orderings are removed as dominated.
     # Returns a set of orderings and a set of unresolved threats.
 
     start = encoded_sequence[0]
     actions = encoded_sequence
-    graph = mo.graph_for_actions_and_links(start, actions, links)
+    graph = mo.graph_for_actions_and_links(start, actions, links, graph_engine)
+
+    # Actions that assign each variable, in plan order.
+    writers = extract_writers(encoded_sequence)
 
     orderings = []
     threats = []
@@ -81,45 +123,64 @@ def extract_orderings(encoded_sequence: list[am.Action], links: list[pp.CausalLi
         condition = link.condition
         producer = link.producer
         consumer = link.consumer
+        if producer is None:
+            # The link's condition is open: it was reported as a missing producer by extract_causal_links,
+            # and has no producer to order writers before, or to threaten.
+            continue
 
         # For every threat, introduce an ordering that resolves the threat, consistent with the encoded sequence.
-
-        for action in encoded_sequence:
+        # Only actions that assign the condition's variable can threaten the link.
+        # Split them into those at or before the producer, those at or after the consumer,
+        # and those in between, which are unresolvable threats.
+        locations, writer_actions = writers.get(condition.variable, ([], []))
+        after_producer = bisect.bisect_right(locations, producer.location)
+        before_consumer = bisect.bisect_left(locations, consumer.location, after_producer)
+
+        for action in writer_actions[:after_producer]:
             if effects_violate_condition(condition, action):
                 # The effects of action could threaten the link.
+                # Action appears before the producer in the grounded plan,
+                # so ensure that action precedes producer.
+                # Add this ordering if not already implied by the links.
+                if action != producer and not graph.path_exists(action, producer):
+                    ordering = pp.Ordering(action, producer)
+                    orderings.append(ordering)
+
+        for action in writer_actions[after_producer:before_consumer]:
+            if effects_violate_condition(condition, action):
+                threat = pp.Threat(link, action)
+                threats.append(threat)
 
-                if action.location <= producer.location:
-                    # If action appears before the producer in the grounded plan,
-                    # then ensure that action precedes producer.
-                    # Add this ordering if not already implied by the links.
-                    if action != producer and not graph.path_exists(action, producer):
-                        ordering = pp.Ordering(action, producer)
-                        orderings.append(ordering)
-
-                elif consumer.location <= action.location:
-                    # If action appears after the consumer in the grounded plan,
-                    # Ensure that action follows consumer, by adding an ordering if not implied by links.
-                    if action != consumer and not graph.path_exists(consumer, action):
-                        ordering = pp.Ordering(consumer, action)
-                        orderings.append(ordering)
-
-                else:
-                    threat = pp.Threat(link, action)
-                    threats.append(threat)
+        for action in writer_actions[before_consumer:]:
+            if effects_violate_condition(condition, action):
+                # Action appears after the consumer in the grounded plan,
+                # Ensure that action follows consumer, by adding an ordering if not implied by links.
+                if action != consumer and not graph.path_exists(consumer, action):
+                    ordering = pp.Ordering(consumer, action)
+                    orderings.append(ordering)
 
     # Remove any ordering that is implied by the causal links
     # and the (minimal) set of remaining orderings.
-    minimal_orderings = mo.remove_dominated_orderings(graph, orderings)
+    minimal_orderings = mo.remove_dominated_orderings(graph, orderings, trace)
+    return minimal_orderings, threats
 
-    # For each action, record the actions that immediately precede or follow,
-    # according to the minimal orderings.
-    for ordering in minimal_orderings:
-        predecessor = ordering.predecessor
-        successor = ordering.successor
-        successor.predecessor_actions.append(predecessor)
-        predecessor.successor_actions.append(successor)
 
-    return minimal_orderings, threats
+def extract_writers(encoded_sequence: list[am.Action]) -> dict[str, tuple[list[int], list[am.Action]]]:
+    # Indexes the actions of an encoded plan sequence by the variables that their effects assign.
+    # Returns a dictionary that maps each variable to a pair of lists:
+    # the locations of the actions that assign the variable, in increasing order, and those actions.
+    writers = dict()
+    for action in encoded_sequence:
+        for effect in action.effects:
+            if effect.variable in writers:
+                locations, actions = writers[effect.variable]
+            else:
+                locations, actions = writers[effect.variable] = ([], [])
+            # Record an action once, even if it assigns the variable more than once.
+            if not actions or actions[-1] is not action:
+                locations.append(action.location)
+                actions.append(action)
+    return writers
 
 
 def effects_violate_condition(condition: asn.Assignment, action: am.Action) -> bool:
@@ -0,0 +1,274 @@
+import model.actions.action as am
+import model.plans.partialorderplan as pp
+import plancompiler.extractpartialorderplan as ex
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# NumPy compiler backend:
+
+# Compiles a total order plan to the same causal links, orderings and threats as extract_partial_order_plan,
+# computing them with array operations rather than loops over the plan, where it can.
+# Selected by backend "numpy" of extract_partial_order_plan, for plans within the limits given there:
+# large enough to repay encoding the plan as arrays, and small enough for its bit matrices (see matrix_bytes).
+# Requires NumPy; if NumPy is not installed, plans are compiled by the python backend.
+
+# The plan is encoded as sparse integer matrices, with one row per nonzero entry:
+# - preconditions and effects, actions x interned (variable, value) conditions, with the condition's position;
+# - writers, actions x variables, with the value assigned, as a condition.
+
+# - The producer of each precondition is the last effect of its condition before the consumer,
+#   found by a binary search of the effects, sorted by condition and location.
+# - The threats to each link are the writers of its variable between its producer and consumer,
+#   found by a binary search of the writers, sorted by variable and location.
+# - The orderings are the edges of the transitive reduction of the graph of links and candidate orderings
+#   that are not links.  Each action's predecessors are a bitset row of a matrix, built from masks
+#   of the writers and readers of each variable, and its ancestors are computed in plan order,
+#   which orders every link and candidate ordering.  Orderings are listed in the order that
+#   extract_orderings first finds them.
+
+def extract_partial_order_plan(plan_name: str, encoded_sequence: list[am.Action]) -> tuple[pp.PartialOrderPlan, list[pp.Threat]]:
+    # Abstracts a total order plan to a partial order plan, as extract_partial_order_plan does.
+    if np is None:
+        print(f"NumPy is not installed. Compiling plan {plan_name} with the python backend.")
+        return ex.extract_partial_order_plan(plan_name, encoded_sequence)
+
+    encoding = PlanEncoding(encoded_sequence)
+    links = extract_causal_links(plan_name, encoding)
+    threats = extract_threats(encoding, links)
+    orderings = extract_orderings(encoding, links)
+    start_action = encoded_sequence[0]
+    partial_order_plan = pp.PartialOrderPlan(plan_name, encoded_sequence, links, orderings, start_action)
+    return partial_order_plan, threats
+
+
+class PlanEncoding:
+    # The integer matrices of an encoded plan sequence.
+    def __init__(self, encoded_sequence: list[am.Action]):
+        self.actions = encoded_sequence
+        self.n_actions = n = len(encoded_sequence)
+
+        # Intern conditions and variables.
+        condition_ids = dict()
+        variable_ids = dict()
+        condition_variables = []
+
+        def condition_id(assignment) -> int:
+            key = (assignment.variable, assignment.value)
+            cid = condition_ids.get(key)
+            if cid is None:
+                cid = condition_ids[key] = len(condition_variables)
+                vid = variable_ids.get(assignment.variable)
+                if vid is None:
+                    vid = variable_ids[assignment.variable] = len(variable_ids)
+                condition_variables.append(vid)
+            return cid
+
+        pre_rows = []
+        effect_rows = []
+        for location, action in enumerate(encoded_sequence):
+            for position, precondition in enumerate(action.preconditions):
+                pre_rows.append((location, position, condition_id(precondition)))
+            for position, effect in enumerate(action.effects):
+                effect_rows.append((location, position, condition_id(effect)))
+
+        self.condition_variables = np.array(condition_variables, dtype=np.int64)
+        pre = np.array(pre_rows, dtype=np.int64).reshape(-1, 3)
+        effects = np.array(effect_rows, dtype=np.int64).reshape(-1, 3)
+        self.pre_actions, self.pre_positions, self.pre_conditions = pre[:, 0], pre[:, 1], pre[:, 2]
+
+        # Effects, sorted by condition, then location.
+        order = np.argsort(effects[:, 2] * n + effects[:, 0], kind="stable")
+        self.effect_keys = effects[order, 2] * n + effects[order, 0]
+        self.effect_actions = effects[order, 0]
+        self.effect_conditions = effects[order, 2]
+
+        # Writers, sorted by variable, then location.
+        writer_variables = self.condition_variables[effects[:, 2]]
+        order = np.argsort(writer_variables * n + effects[:, 0], kind="stable")
+        self.writer_keys = writer_variables[order] * n + effects[order, 0]
+        self.writer_actions = effects[order, 0]
+        self.writer_conditions = effects[order, 2]
+
+
+def extract_causal_links(plan_name: str, encoding: PlanEncoding) -> list[pp.CausalLink]:
+    # Returns the causal links of the encoded plan, in the order of extract_causal_links.
+    n = encoding.n_actions
+    actions = encoding.actions
+
+    # Links are listed from the last consumer to the first, in the order of each consumer's preconditions.
+    order = np.lexsort((encoding.pre_positions, -encoding.pre_actions))
+    consumers = encoding.pre_actions[order]
+    positions = encoding.pre_positions[order]
+    conditions = encoding.pre_conditions[order]
+
+    # The producer of a link is the last effect of its condition before its consumer.
+    last = np.searchsorted(encoding.effect_keys, conditions * n + consumers, "left") - 1
+    found = last >= 0
+    if encoding.effect_keys.size:
+        last = np.maximum(last, 0)
+        found &= encoding.effect_conditions[last] == conditions
+        producers = np.where(found, encoding.effect_actions[last], -1)
+    else:
+        producers = np.full(len(consumers), -1)
+
+    links = [pp.CausalLink(actions[c].preconditions[p], None, actions[c])
+             for c, p in zip(consumers.tolist(), positions.tolist())]
+
+    linked = np.flatnonzero(found)
+    for i, producer in zip(linked.tolist(), producers[linked].tolist()):
+        links[i].producer = actions[producer]
+
+    if linked.size < len(links):
+        ex.warn_missing_producers(plan_name, links)
+
+    encoding.link_producers = producers
+    encoding.link_consumers = consumers
+    encoding.link_conditions = conditions
+    encoding.link_variables = encoding.condition_variables[conditions]
+    return links
+
+
+def extract_threats(encoding: PlanEncoding, links: list[pp.CausalLink]) -> list[pp.Threat]:
+    # Returns the threats to links, in the order of extract_orderings:
+    # the writers of a link's variable, of other values, strictly between its producer and consumer.
+    n = encoding.n_actions
+    producers = encoding.link_producers
+    variables = encoding.link_variables
+    first = np.searchsorted(encoding.writer_keys, variables * n + producers, "right")
+    last = np.searchsorted(encoding.writer_keys, variables * n + encoding.link_consumers, "left")
+    threatened = np.flatnonzero((producers >= 0) & (last > first))
+
+    threats = []
+    actions = encoding.actions
+    writer_actions = encoding.writer_actions
+    writer_conditions = encoding.writer_conditions
+    for i in threatened.tolist():
+        condition = encoding.link_conditions[i]
+        for j in range(first[i], last[i]):
+            if writer_conditions[j] != condition:
+                threats.append(pp.Threat(links[i], actions[writer_actions[j]]))
+    return threats
+
+
+def extract_orderings(encoding: PlanEncoding, links: list[pp.CausalLink]) -> list[pp.Ordering]:
+    # Returns the minimal orderings of the encoded plan, in the order of extract_orderings.
+    n = encoding.n_actions
+    linked = np.flatnonzero(encoding.link_producers >= 0)
+    producers = encoding.link_producers[linked]
+    consumers = encoding.link_consumers[linked]
+    conditions = encoding.link_conditions[linked]
+    variables = encoding.link_variables[linked]
+
+    # Predecessors of each action, as rows of bits, bit i of a row in bit i % 8 of byte i // 8.
+    predecessors = np.zeros((n, (n + 7) // 8), dtype=np.uint8)
+
+    # Links.
+    np.bitwise_or.at(predecessors, (consumers, producers >> 3), np.left_shift(1, producers & 7).astype(np.uint8))
+
+    # Candidate orderings, for each variable:
+    # - the producer of a link follows the earlier writers of other values;
+    # - a writer follows the earlier consumers of links of other values.
+    writer_variables = encoding.condition_variables[encoding.writer_conditions]
+    for variable in np.unique(variables).tolist():
+        in_writers = writer_variables == variable
+        writer_actions = encoding.writer_actions[in_writers]
+        writer_conditions = encoding.writer_conditions[in_writers]
+        in_links = variables == variable
+        reader_actions = consumers[in_links]
+        reader_conditions = conditions[in_links]
+
+        all_writers = action_row(n, writer_actions)
+        all_readers = action_row(n, reader_actions)
+        writers_of = {c: action_row(n, writer_actions[writer_conditions == c]) for c in np.unique(writer_conditions).tolist()}
+        readers_of = {c: action_row(n, reader_actions[reader_conditions == c]) for c in np.unique(reader_conditions).tolist()}
+
+        produced = np.unique(np.stack((producers[in_links], reader_conditions)), axis=1)
+        for producer, condition in produced.T.tolist():
+            mask = all_writers & ~writers_of[condition] if condition in writers_of else all_writers
+            add_earlier(predecessors[producer], mask, producer)
+
+        for writer, condition in zip(writer_actions.tolist(), writer_conditions.tolist()):
+            mask = all_readers & ~readers_of[condition] if condition in readers_of else all_readers
+            add_earlier(predecessors[writer], mask, writer)
+
+    # Transitive reduction.
+    link_pairs = set((producers * n + consumers).tolist())
+    ordering_pairs = [pair for pair in reduction_pairs(predecessors) if pair[0] * n + pair[1] not in link_pairs]
+
+    # List orderings in the order that extract_orderings first finds them.
+    produced = dict()
+    consumed = dict()
+    for i in linked.tolist():
+        produced.setdefault(int(encoding.link_producers[i]), []).append(i)
+        consumed.setdefault(int(encoding.link_consumers[i]), []).append(i)
+    actions = encoding.actions
+    ordering_pairs.sort(key = lambda pair: ordering_rank(actions, links, produced, consumed, pair))
+    return [pp.Ordering(actions[predecessor], actions[successor]) for predecessor, successor in ordering_pairs]
+
+
+def matrix_bytes(n: int) -> int:
+    # Returns the bytes of the bit matrices of a plan of n actions, its predecessors and their ancestors.
+    return 2 * n * ((n + 7) // 8)
+
+
+def action_row(n: int, locations) -> np.ndarray:
+    # Returns a row of bits that is set at locations.
+    bits = np.zeros(n, dtype=bool)
+    bits[locations] = True
+    return np.packbits(bits, bitorder="little")
+
+
+def add_earlier(row: np.ndarray, mask: np.ndarray, location: int):
+    # Sets the bits of row that are set in mask before location.
+    end = location >> 3
+    row[:end] |= mask[:end]
+    row[end] |= mask[end] & ((1 << (location & 7)) - 1)
+
+
+def reduction_pairs(predecessors: np.ndarray) -> list[tuple[int, int]]:
+    # Returns the edges (predecessor, successor) of the transitive reduction of a graph whose edges go forward in plan order,
+    # given the predecessors of each action as rows of bits.
+    # The ancestors of each action are computed in plan order.  Its predecessors are visited from the last,
+    # and a predecessor that is not an ancestor of a later one is an edge of the reduction.
+    n = predecessors.shape[0]
+    ancestors = np.zeros_like(predecessors)
+    pairs = []
+    for successor in range(n):
+        row = predecessors[successor]
+        end = (successor >> 3) + 1
+        uncovered = row[:end].copy()
+        found = np.flatnonzero(uncovered)
+        if found.size == 0:
+            continue
+        covered = ancestors[successor]
+        while found.size:
+            byte = int(found[-1])
+            predecessor = (byte << 3) + int(uncovered[byte]).bit_length() - 1
+            pairs.append((predecessor, successor))
+            covered |= ancestors[predecessor]
+            covered[byte] |= 1 << (predecessor & 7)
+            uncovered = row[:byte + 1] & ~covered[:byte + 1]
+            found = np.flatnonzero(uncovered)
+    return pairs
+
+
+def ordering_rank(actions: list[am.Action], links: list[pp.CausalLink], produced: dict[int, list[int]],
+                  consumed: dict[int, list[int]], pair: tuple[int, int]) -> tuple[int, int, int]:
+    # Returns the position at which extract_orderings first finds the ordering pair:
+    # the index of the link it resolves, then 0 if it orders a writer before the link's producer,
+    # or 1 if it orders a writer after the link's consumer, then the location of the writer.
+    # produced and consumed map an action id to the indexes of the links it produces and consumes.
+    predecessor, successor = pair
+    ranks = []
+    for i in produced.get(successor, ()):
+        if ex.effects_violate_condition(links[i].condition, actions[predecessor]):
+            ranks.append((i, 0, predecessor))
+            break
+    for i in consumed.get(predecessor, ()):
+        if ex.effects_violate_condition(links[i].condition, actions[successor]):
+            ranks.append((i, 1, successor))
+            break
+    return min(ranks)
@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+import model.actions.action as am
+import model.plans.partialorderplan as pp
+import plancompiler.extractpartialorderplan as ex
+
+# Persistent cache of compiled plans:
+
+# Compiling a total order plan to its partial order plan is the costly step of loading a plan.
+# The cache records the result of compilation on disk, so that a plan that was compiled before,
+# possibly by an earlier process, is restored without being compiled again.
+
+# A compiled plan is keyed by a hash of its content, that is, its start, goal and action sequence,
+# in the order given, since the order of assignments determines the order of the plan's causal links.
+# Each entry is a json file that records the compilation in terms of action locations:
+
+#    <entry> ::= "{" "compiler_version" ":" <int> ","
+#                    "key" ":" <string> ","
+#                    "links" ":" "[" ("[" <consumer_location> "," <precondition_index> "," <producer_location> "]")* "]" ","
+#                    "orderings" ":" "[" ("[" <predecessor_location> "," <successor_location> "]")* "]" ","
+#                    "threats" ":" "[" ("[" <link_index> "," <action_location> "]")* "]" "}"
+
+# Entries are kept in the cache's own subdirectory, VERSIONS_DIRECTORY, in a directory for the current COMPILER_VERSION,
+# v<COMPILER_VERSION>; the entries of other versions are removed when a cache is opened.
+# Nothing else in the cache directory is touched, so a cache may be opened in a directory that holds other files.
+# The number of entries is bounded; the least recently used entries are evicted,
+# based on file modification times, which are updated on each use.
+
+VERSIONS_DIRECTORY = "compiled_plans"
+version_name_pattern = re.compile(r"v\d+")
+entry_name_pattern = re.compile(r"[0-9a-f]{64}\.json(\.\d+\.tmp)?")
+
+class CompiledPlanCache:
+
+    def __init__(self, directory_name, max_entries: int = 10000, trace = False):
+        # Opens the cache in directory_name, creating the directory if needed.
+        # Holds at most max_entries compiled plans.
+        self.directory = Path(directory_name)
+        self.max_entries = max_entries
+        self.trace = trace
+        self.hits = 0
+        self.misses = 0
+
+        self.versions_directory = self.directory / VERSIONS_DIRECTORY
+        self.version_directory = self.versions_directory / f"v{ex.COMPILER_VERSION}"
+        self.version_directory.mkdir(parents=True, exist_ok=True)
+        self.remove_other_versions()
+        self.entry_count = sum(1 for _ in self.version_directory.glob("*.json"))
+
+    def __str__(self):
+        return f"Plan cache {self.directory}"
+
+    def remove_other_versions(self):
+        # Removes the entries of compiler versions other than the current one.
+        # Only the entries the cache writes are removed, and then their version directory if it is left empty.
+        for path in self.versions_directory.iterdir():
+            if path.is_dir() and version_name_pattern.fullmatch(path.name) and path != self.version_directory:
+                if self.trace:
+                    print(f"{self}: removing plans compiled by compiler {path.name}.")
+                for entry in path.iterdir():
+                    if entry_name_pattern.fullmatch(entry.name):
+                        try:
+                            entry.unlink()
+                        except OSError:
+                            pass
+                try:
+                    path.rmdir()
+                except OSError:
+                    print(f"{self}: kept {path}, which holds files that aren't compiled plans.")
+
+    def compile(self, plan_name: str, encoded_sequence: list[am.Action],
+                graph_engine: str = "object", backend: str = "python") -> tuple[pp.PartialOrderPlan, list[pp.Threat]]:
+        # Returns the partial order plan and threats of encoded_sequence,
+        # as extract_partial_order_plan does,
+        # restoring them from the cache if present, else compiling and adding them to the cache.
+        key = plan_key(encoded_sequence)
+        entry = self.read_entry(key)
+        if entry is not None:
+            self.hits += 1
+            if self.trace:
+                print(f"{self}: restoring compiled plan {plan_name}.")
+            return decode_compiled_plan(plan_name, encoded_sequence, entry)
+
+        self.misses += 1
+        pop_plan, threats = ex.extract_partial_order_plan(plan_name, encoded_sequence, graph_engine, backend)
+        self.write_entry(key, encode_compiled_plan(key, pop_plan, threats))
+        return pop_plan, threats
+
+    def entry_path(self, key: str) -> Path:
+        return self.version_directory / f"{key}.json"
+
+    def read_entry(self, key: str) -> dict or None:
+        # Returns the entry for key, or None if there is no valid entry.
+        path = self.entry_path(key)
+        try:
+            with open(path, "rt") as file:
+                entry = json.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # Unreadable or partially written entry.
+            self.remove_entry(path)
+            return None
+
+        if entry.get("compiler_version") != ex.COMPILER_VERSION or entry.get("key") != key:
+            self.remove_entry(path)
+            return None
+
+        # Mark the entry as most recently used.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def write_entry(self, key: str, entry: dict):
+        # Writes entry atomically, so that concurrent readers never see a partial entry,
+        # then evicts the least recently used entries if the cache is full.
+        # An entry that replaces one of the same key, for example written by another process, isn't counted again.
+        path = self.entry_path(key)
+        newp = not path.exists()
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(temporary, "wt") as file:
+            json.dump(entry, file, separators=(",", ":"))
+        os.replace(temporary, path)
+        if newp:
+            self.entry_count += 1
+            if self.entry_count > self.max_entries:
+                self.evict()
+
+    def remove_entry(self, path: Path):
+        try:
+            path.unlink()
+            self.entry_count -= 1
+        except OSError:
+            pass
+
+    def evict(self):
+        # Removes the least recently used entries,
+        # leaving the cache 90% full so that eviction is not repeated on every write.
+        entries = []
+        for path in self.version_directory.glob("*.json"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except OSError:
+                pass
+        entries.sort()
+        keep = (self.max_entries * 9) // 10
+        excess = len(entries) - keep
+        for _, path in entries[:max(excess, 0)]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        self.entry_count = min(len(entries), keep)
+        if self.trace:
+            print(f"{self}: evicted {max(excess, 0)} compiled plans.")
+
+    def clear(self):
+        # Removes all entries.
+        for path in self.version_directory.glob("*.json"):
+            self.remove_entry(path)
+        self.entry_count = 0
+
+
+class CompiledPlanRecord:
+    # A single compiled plan, used in place of a cache to restore a plan that was compiled elsewhere,
+    # for example in another process.
+    # entry is a cache entry for the plan, as returned by encode_compiled_plan.
+
+    def __init__(self, entry: dict):
+        self.entry = entry
+
+    def compile(self, plan_name: str, encoded_sequence: list[am.Action],
+                graph_engine: str = "object", backend: str = "python") -> tuple[pp.PartialOrderPlan, list[pp.Threat]]:
+        return decode_compiled_plan(plan_name, encoded_sequence, self.entry)
+
+
+# Keys and entries:
+
+def plan_key(encoded_sequence: list[am.Action]) -> str:
+    # Returns a hash of the content of an encoded plan sequence, that is,
+    # the operator, preconditions and effects of each action, including start and goal.
+    content = [[action.operator,
+                [[a.variable, a.value] for a in action.preconditions],
+                [[a.variable, a.value] for a in action.effects]]
+               for action in encoded_sequence]
+    text = json.dumps(content, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def encode_compiled_plan(key: str, pop_plan: pp.PartialOrderPlan, threats: list[pp.Threat]) -> dict:
+    # Returns a cache entry that records the links, orderings and threats of a compiled plan
+    # by the locations of their actions.
+    link_index = dict()
+    links = []
+    for i, link in enumerate(pop_plan.links):
+        link_index[id(link)] = i
+        consumer = link.consumer
+        precondition_index = next(j for j, p in enumerate(consumer.preconditions) if p is link.condition)
+        producer = None if link.producer is None else link.producer.location
+        links.append([consumer.location, precondition_index, producer])
+
+    orderings = [[o.predecessor.location, o.successor.location] for o in pop_plan.orderings]
+    threats = [[link_index[id(t.link)], t.action.location] for t in threats]
+    return {"compiler_version": ex.COMPILER_VERSION, "key": key,
+            "links": links, "orderings": orderings, "threats": threats}
+
+
+def decode_compiled_plan(plan_name: str, encoded_sequence: list[am.Action],
+                         entry: dict) -> tuple[pp.PartialOrderPlan, list[pp.Threat]]:
+    # Restores the partial order plan and threats of encoded_sequence from a cache entry.
+    links = []
+    for consumer_location, precondition_index, _ in entry["links"]:
+        consumer = encoded_sequence[consumer_location]
+        links.append(pp.CausalLink(consumer.preconditions[precondition_index], None, consumer))
+
+    for link, (_, _, producer_location) in zip(links, entry["links"]):
+        if producer_location is not None:
+            link.producer = encoded_sequence[producer_location]
+    if any(link.producer is None for link in links):
+        ex.warn_missing_producers(plan_name, links)
+
+    orderings = [pp.Ordering(encoded_sequence[predecessor_location], encoded_sequence[successor_location])
+                 for predecessor_location, successor_location in entry["orderings"]]
+
+    threats = [pp.Threat(links[i], encoded_sequence[location]) for i, location in entry["threats"]]
+
+    start_action = encoded_sequence[0]
+    pop_plan = pp.PartialOrderPlan(plan_name, encoded_sequence, links, orderings, start_action)
+    return pop_plan, threats
@@ -0,0 +1,161 @@
+from typing import Iterable, Iterator
+import model.actions.action as am
+import model.states.assignment as asn
+import model.plans.partialorderplan as pp
+import plancompiler.extractpartialorderplan as ex
+
+# Streaming compiler:
+
+# Compiles a total order plan whose actions arrive one at a time, for example from a planner,
+# in a single forward pass, emitting causal links, orderings and threats as they are found.
+# Unlike extract_partial_order_plan, the action sequence is never held in memory.
+# For each variable, the compiler keeps the last writer of each of its values, the last writer of the variable,
+# and the actions that read the variable since its last writer.
+# Its memory is proportional to the number of variables and their values,
+# plus the readers of each variable since it was last written, which no ordering relates to each other.
+
+# Each precondition is linked to the last producer of its condition, which gives the same causal links
+# as extract_causal_links.  A link whose producer isn't the last writer of its variable is threatened
+# by the writers of other values after its producer; the last writer of each such value is reported.
+
+# Each writer of a variable is ordered after the readers of the variable since its previous writer,
+# and after the previous writer itself, unless one of those readers consumes the previous writer's value,
+# so that the writers of a variable form a chain.  A writer before a producer is then ordered before it,
+# and a consumer before the writers after it, as extract_orderings orders them, through the chain.
+# Earlier readers and writers need not be kept: any ordering they need follows from the chain.
+
+# The chain also orders actions that extract_orderings leaves unordered, in the order of the plan:
+# a writer whose value is overwritten before any action reads it, and readers of a value that is written again.
+# Where every value written is read before its variable is written again with a different value,
+# and the plan has no threats, the links and orderings that are emitted imply the same partial order
+# as extract_partial_order_plan's.  The orderings are not minimized, since that requires the whole plan.
+
+
+class VariableWindow:
+    # The state kept by the streaming compiler for one variable.
+    def __init__(self):
+        self.last_producers: dict[object, am.Action] = dict()  # Maps each value to its last writer.
+        self.last_writer: am.Action or None = None  # The last writer of the variable.
+        # The actions that read the variable since its last writer, each with the producer of the value it reads.
+        self.readers: list[tuple[am.Action, am.Action]] = []
+
+    def size(self) -> int:
+        # Returns the number of actions held by the window.
+        return len(self.last_producers) + len(self.readers) + 1
+
+
+def stream_partial_order_plan(plan_name: str, action_stream: Iterable[am.Action],
+                              start: list[asn.Assignment], goal: list[asn.Assignment]) -> Iterator[pp.CausalLink or pp.Ordering or pp.Threat]:
+    # Compiles the total order plan whose actions are generated by action_stream, with start and goal,
+    # generating its causal links, orderings and threats as they are found.
+    # Records the location of each action.
+    return stream_encoded_plan(plan_name, encode_action_stream(action_stream, start, goal))
+
+
+def stream_encoded_plan(plan_name: str, encoded_stream: Iterable[am.Action]) -> Iterator[pp.CausalLink or pp.Ordering or pp.Threat]:
+    # Generates the causal links, orderings and threats of the actions generated by encoded_stream,
+    # which starts with the start action, ends with the goal action, and records action locations.
+    windows: dict[str, VariableWindow] = dict()
+    open_links = []
+    for action in encoded_stream:
+        yield from compile_action(action, windows, open_links)
+
+    # Warn that plan is incomplete (has open preconditions).
+    if open_links:
+        ex.warn_missing_producers(plan_name, open_links)
+
+
+def compile_stream(plan_name: str, action_stream: Iterable[am.Action],
+                   start: list[asn.Assignment], goal: list[asn.Assignment]) -> tuple[pp.PartialOrderPlan, list[pp.Threat]]:
+    # Compiles the total order plan generated by action_stream into a partial order plan and its threats,
+    # collecting the records generated by stream_partial_order_plan.
+    # Unlike extract_partial_order_plan, the orderings of the partial order plan are not minimal.
+    encoded_sequence = []
+    links = []
+    orderings = []
+    threats = []
+
+    def collect(encoded_stream):
+        for action in encoded_stream:
+            encoded_sequence.append(action)
+            yield action
+
+    encoded_stream = collect(encode_action_stream(action_stream, start, goal))
+    for record in stream_encoded_plan(plan_name, encoded_stream):
+        if isinstance(record, pp.CausalLink):
+            links.append(record)
+        elif isinstance(record, pp.Ordering):
+            orderings.append(record)
+        else:
+            threats.append(record)
+
+    start_action = encoded_sequence[0]
+    return pp.PartialOrderPlan(plan_name, encoded_sequence, links, orderings, start_action), threats
+
+
+def encode_action_stream(action_stream: Iterable[am.Action], start: list[asn.Assignment],
+                         goal: list[asn.Assignment]) -> Iterator[am.Action]:
+    # Generates the actions of action_stream, preceded by a start action and followed by a goal action,
+    # and records the location of each action, as encode_total_order_plan does.
+    start_action = am.Action("start", [], start)
+    start_action.location = 0
+    yield start_action
+
+    location = 0
+    for action in action_stream:
+        location += 1
+        action.location = location
+        yield action
+
+    goal_action = am.Action("goal", goal, [])
+    goal_action.location = location + 1
+    yield goal_action
+
+
+def compile_action(action: am.Action, windows: dict[str, VariableWindow],
+                   open_links: list[pp.CausalLink]) -> Iterator[pp.CausalLink or pp.Ordering or pp.Threat]:
+    # Generates the links, orderings and threats that action introduces, given the actions before it,
+    # and records action in the windows of the variables it reads and writes.
+
+    # Link each precondition to the last producer of its condition.
+    for precondition in action.preconditions:
+        window = variable_window(windows, precondition.variable)
+        producer = window.last_producers.get(precondition.value)
+        link = pp.CausalLink(precondition, producer, action)
+        yield link
+        if producer is None:
+            open_links.append(link)
+            continue
+
+        # Writers of other values since the producer threaten the link.
+        if producer is not window.last_writer:
+            for value, writer in window.last_producers.items():
+                if value != precondition.value and writer.location > producer.location:
+                    yield pp.Threat(link, writer)
+
+        window.readers.append((action, producer))
+
+    # Order action after the readers of each variable it writes, and the chain of the variable's writers.
+    for effect in action.effects:
+        window = variable_window(windows, effect.variable)
+        previous = window.last_writer
+        if previous is not action:
+            chainedp = previous is None
+            for reader, producer in window.readers:
+                if reader is not action:
+                    yield pp.Ordering(reader, action)
+                if producer is previous:
+                    chainedp = True
+            if not chainedp:
+                yield pp.Ordering(previous, action)
+            window.readers = []
+        window.last_writer = action
+        window.last_producers[effect.value] = action
+
+
+def variable_window(windows: dict[str, VariableWindow], variable: str) -> VariableWindow:
+    # Returns the window of variable, creating it if needed.
+    window = windows.get(variable)
+    if window is None:
+        window = windows[variable] = VariableWindow()
+    return window
@@ -0,0 +1,172 @@
+import asyncio
+import concurrent.futures
+import planexecutive.events as ev
+from planexecutive.robot import bot
+import planexecutive.robot.asyncbot as ab
+import planexecutive.monitor.planmonitor as lm
+from model.plans.totalorderplan import TotalOrderPlan
+import model.actions.action as am
+import planexecutive.executionscenario as es
+import planexecutive.executioncontext as ec
+
+# Asynchronous Plan Dispatcher
+
+# Dispatches the enabled actions of a plan concurrently, on an asyncio event loop.
+# Every enabled action is started, up to max_concurrent running actions,
+# and each completion is handled as it arrives.
+
+# Monitoring is the same as for Dispatcher, with the actions of a plan interleaved:
+# - when an action starts, the monitor removes the links it consumes;
+# - when an action completes, its observed state change is checked against the active links,
+#   and then the links it produces are activated and checked against the current state.
+# The handling of a completion does not wait, so that it is not interleaved with another completion.
+# If the dispatcher is given an executor, completions are monitored in the executor's worker threads,
+# one at a time for each dispatcher, so that other dispatchers proceed on the event loop (see fleetexecutive).
+
+class AsyncDispatcher:
+    # Given a TotalOrderPlan, with its lifted, partial order plan,
+    # dispatch and monitor the partially ordered plan, running enabled actions concurrently.
+    # Each dispatcher performs one execution of the plan's shared compiled plan,
+    # whose state is kept in the dispatcher's execution context.
+    # Actions are performed by async_bot, by default a bot that completes actions immediately.
+
+    def __init__(self, name: str, total_order_plan: TotalOrderPlan, async_bot: ab.AsyncBot = None,
+                 max_concurrent: int = 8, trace = True, executor: concurrent.futures.Executor = None):
+
+        self.name = name
+        self.total_order_plan = total_order_plan
+        self.max_concurrent = max_concurrent  # Most actions running at once.
+        self.trace = trace
+        self.executor = executor  # Runs the monitoring of completions, if not None.
+        self.completion_lock = asyncio.Lock()  # Held while a completion is monitored by the executor.
+
+        # Get the plan that is to be dispatched.
+        self.compiled_plan = total_order_plan.compiled_plan
+
+        # Set up the state of this execution.
+        self.context = ec.ExecutionContext(self.compiled_plan, trace)
+
+        # Report the execution's events to the context's event stream, printing them if trace.
+        self.events = self.context.events
+        ev.trace_events(self.events, trace)
+
+        # Set up the monitor for the plan.
+        self.monitor = lm.CausalLinkMonitor(total_order_plan, trace, context = self.context)
+
+        # Set up the physical robot that performs the plan actions.
+        if async_bot is None:
+            async_bot = ab.AsyncBot(name, False)
+        self.set_bot(async_bot)
+
+        self.successp = True  # Execution is correct thus far.
+        self.conflicts = []
+
+    def __str__(self):
+        return f"Async dispatcher {self.name}"
+
+    async def dispatch_scenario(self, scenario: es.ExecutionScenario):
+        # Dispatch plan while comparing against the action and observation sequence
+        # specified by scenario, using a scripted Bot.
+        self.load_scenario(scenario)
+        return await self.dispatch_plan()
+
+    def load_scenario(self, scenario: es.ExecutionScenario):
+        # Set up a scripted Bot that performs the action and observation sequence specified by scenario.
+        scripted_bot = bot.Bot(self.name, self.monitor, False, False, self.trace)
+        scripted_bot.load_scenario(scenario)
+        self.set_bot(ab.AsyncBotAdapter(scripted_bot))
+
+    def set_bot(self, async_bot: ab.AsyncBot):
+        # Sets the bot that performs the plan actions, which reports its events with the execution's events.
+        async_bot.events = self.events
+        ev.trace_events(self.events, async_bot.trace)
+        self.bot = async_bot
+
+    async def dispatch_plan(self):
+        # Dispatch and monitor the plan from start to finish.
+        # Implements a loop of
+        #      1) select enabled actions and start them, up to max_concurrent running actions,
+        #      2) wait for an action to complete, then
+        #      3) observe state and check state changes against active conditions,
+        #      4) update active conditions and check, and
+        #      5) update actions to dispatch next.
+        # Returns the completed actions, the current state, whether execution succeeded, and the conflicts found.
+
+        context = self.context
+        monitor = self.monitor
+        running: set[asyncio.Task] = set()
+        events = self.events
+
+        if events.sinks:
+            events.emit(ev.Event(ev.EXECUTION_STARTED, self, self.total_order_plan.partial_order_plan.name))
+
+        while self.successp:
+            # 1) Start enabled actions, informing the monitor of each.
+            #    - Monitor removes the active causal links that action consumes.
+            #    Actions are not started while a completion is monitored by the executor.
+            if context.enabled_actions and len(running) < self.max_concurrent and not self.completion_lock.locked():
+                for action in self.bot.select_enabled_actions(context.enabled_actions, self.max_concurrent - len(running)):
+                    if events.sinks:
+                        events.emit(ev.Event(ev.ACTION_STARTED, self, action))
+                    context.start_action(action)
+                    monitor.monitor_action_start(action)
+                    running.add(asyncio.create_task(self.execute_action(action)))
+
+            if not running:  # No actions running or enabled.
+                break  # End the plan dispatch.
+
+            # 2) - 5) Wait for actions to complete.
+            done, running = await asyncio.wait(running, return_when = asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()  # Raise any error of the task.
+
+        # Stop running actions if execution failed.
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.wait(running)
+
+        if events.sinks:
+            events.emit(ev.Event(ev.EXECUTION_ENDED, self, None, len(context.completed_actions)))
+
+        return context.completed_actions, monitor.current_state, self.successp, self.conflicts
+
+    async def execute_action(self, action: am.Action):
+        # Execute action and observe its state changes, then monitor its completion.
+        await self.bot.execute_action(action)
+        changes = await self.bot.observe_state_change(self.monitor.current_state)
+        if self.executor is None:
+            self.monitor_completion(action, changes)
+        else:
+            async with self.completion_lock:
+                await asyncio.get_running_loop().run_in_executor(self.executor, self.monitor_completion, action, changes)
+
+    def monitor_completion(self, action: am.Action, changes: dict):
+        # Monitor the completion of action, which observed changes.
+        if not self.successp:
+            return  # Another action failed while this one ran.
+
+        # 3) Check the state changes against the active links.
+        #    The active links DO NOT include the links produced by action.
+        monitor = self.monitor
+        self.successp, self.conflicts = monitor.check_state_change(changes, self.successp, self.conflicts)
+        if not self.successp:
+            if self.events.sinks:
+                self.events.emit(ev.Event(ev.EXECUTION_CONFLICT, self, action, self.conflicts))
+            return
+
+        # 4) Inform monitor that action has completed.
+        #    - Monitor updates active links with the links produced by action's effects.
+        #    - Check assignments in the current state against the new active links.
+        self.successp, self.conflicts = monitor.monitor_completed_action(action, self.successp, self.conflicts)
+        if not self.successp:
+            if self.events.sinks:
+                self.events.emit(ev.Event(ev.EFFECT_CONFLICT, self, action, self.conflicts))
+            return
+
+        # 5) Action produced the desired effect.
+        #    Record that action succeeded, and update the actions enabled to be dispatched.
+        enabled_successors = self.context.complete_action(action)
+
+        if self.events.sinks:
+            self.events.emit(ev.Event(ev.ACTION_SUCCEEDED, self, action, enabled_successors))
@@ -1,8 +1,9 @@
-import utils.utils as ut
+import planexecutive.events as ev
 from planexecutive.robot import bot
 import planexecutive.monitor.planmonitor as lm
 from model.plans.totalorderplan import TotalOrderPlan
 import planexecutive.executionscenario as es
+import planexecutive.executioncontext as ec
 
 # Notes on user interaction:
 
@@ -20,8 +21,8 @@ import planexecutive.executionscenario as es
 class Dispatcher:
     # Given a TotalOrderPlan, with its lifted, partial order plan,
     # flexibly dispatch and monitor the partially ordered plan,
-
-    completed_actions = []
+    # Each dispatcher performs one execution of the plan's shared compiled plan,
+    # whose state is kept in the dispatcher's execution context.
 
     def __init__(self, name: str, total_order_plan: TotalOrderPlan, trace = True):
 
@@ -29,17 +30,22 @@ class Dispatcher:
         self.trace = trace
 
         # Get the plan that is to be dispatched.
-        par = total_order_plan.partial_order_plan
+        self.compiled_plan = total_order_plan.compiled_plan
+
+        # Set up the state of this execution.
+        # The plan's start action is enabled, since it has no preconditions.
+        self.context = ec.ExecutionContext(self.compiled_plan, trace)
 
-        # Enable the plan's start action, since it has no preconditions.
-        self.enabled_actions = [par.start_action]
+        # Report the execution's events to the context's event stream, printing them if trace.
+        self.events = self.context.events
+        ev.trace_events(self.events, trace)
 
         # Set up the monitor for the plan.
-        self.monitor = lm.CausalLinkMonitor(total_order_plan)
+        self.monitor = lm.CausalLinkMonitor(total_order_plan, trace, context = self.context)
 
         # Set up the physical robot that performs the plan actions,
         # and connect to the monitor that observes the action effects.
-        self.bot = bot.Bot(name, self.monitor, False, False)
+        self.bot = bot.Bot(name, self.monitor, False, False, trace)
 
     def dispatch_scenario(self, scenario: es.ExecutionScenario):
         # Dispatch plan while comparing against the action and observation sequence
@@ -60,24 +66,24 @@ class Dispatcher:
         b = self.bot
         successp = True # Execution is correct thus far.
         conflicts = []
-        completed = self.completed_actions # Actions that have been correctly dispatched
+        context = self.context
+        completed = context.completed_actions # Actions that have been correctly dispatched
+        events = self.events
 
-        if self.trace:
-            print()
-            print(f'Executing {self.total_order_plan.partial_order_plan.name}:')
+        if events.sinks:
+            events.emit(ev.Event(ev.EXECUTION_STARTED, self, self.total_order_plan.partial_order_plan.name))
 
         while True:
             # 1) Select an enabled action to execute next.
-            action = b.select_enabled_action(self.enabled_actions)
+            action = b.select_enabled_action(context.enabled_actions)
 
             # 2) Inform monitor that action is about to be executed.
             #    - Monitor removes the active causal links that action consumes.
             if action is None:  # None if no enabled actions remain.
                 break  # End the plan dispatch.
             else:
-                if self.trace:
-                    print()
-                    print(f'   Next action {action}.')
+                if events.sinks:
+                    events.emit(ev.Event(ev.ACTION_STARTED, self, action))
 
                 monitor.monitor_action_start(action)
 
@@ -86,8 +92,8 @@ class Dispatcher:
             successp, conflicts = b.execute_action(action, successp, conflicts)
 
             if not successp:
-                if self.trace:
-                    print(f'      Execution produces conflicts {ut.list2string(conflicts)}.')
+                if events.sinks:
+                    events.emit(ev.Event(ev.EXECUTION_CONFLICT, self, action, conflicts))
 
                 return completed, monitor.current_state, successp, conflicts
 
@@ -100,54 +106,25 @@ class Dispatcher:
             #    - Action didn't produce the intended effect, terminate plan dispatch
             #      and return conflicts.
             if not successp:
-                if self.trace:
-                    print(f'      Produces conflicts {ut.list2string(conflicts)}.')
+                if events.sinks:
+                    events.emit(ev.Event(ev.EFFECT_CONFLICT, self, action, conflicts))
 
                 return completed, monitor.current_state, successp, conflicts
 
             # 4) Action produced the desired effect.
             #  - Record that action succeeded.
-            self.completed_actions.append(action)
-            completed = self.completed_actions
-
-            #     Update list of actions enabled to be dispatched,
+            #     Update the actions enabled to be dispatched,
             #     as a result of action's execution.
             #     These are successors of action, whose predecessors
             #     have all been dispatched.
-            enabled_successors = self.enabled_successors(action)
+            enabled_successors = context.complete_action(action)
 
-            if self.trace:
-                if enabled_successors == list():
-                    print(f'      Success, no enabled successors.')
-                else:
-                    print(f'      Success, enables successors:')
-                    for sact in enabled_successors:
-                        print(f'         {sact}')
-
-            self.enabled_actions.remove(action)
-            self.enabled_actions.extend(enabled_successors)
+            if events.sinks:
+                events.emit(ev.Event(ev.ACTION_SUCCEEDED, self, action, enabled_successors))
 
         # 5) End of plan reached.
         #  - Return with success.
-        if self.trace:
-                print('   Plan dispatch ended with {complete} completed.')
+        if events.sinks:
+            events.emit(ev.Event(ev.EXECUTION_ENDED, self, None, len(completed)))
 
         return completed, monitor.current_state, successp, conflicts
-
-    def enabled_successors(self, action):
-        # Returns all successor actions of action
-        # whose predecessor actions
-        # have all been dispatched.
-        enabled_successors = []
-        for action in action.successor_actions:
-            if self.action_enabledp(action) and action not in enabled_successors:
-                enabled_successors.append(action)
-        return enabled_successors
-
-    def action_enabledp(self, action):
-        # Returns True if all predecessor actions of action have been completed.
-        completed = self.completed_actions
-        for predecessor in action.predecessor_actions:
-            if predecessor not in completed:
-                return False
-        return True
@@ -0,0 +1,237 @@
+import collections
+import time
+import utils.utils as ut
+
+# Execution events:
+
+# The plan library, dispatchers, monitors, bots and current states report what they do as typed events,
+# written to an event stream.  A stream passes each event to the sinks attached to it:
+# a sink is any object with a method handle(event).
+# Events are only made when a stream has a sink, and they hold the objects they report, not text,
+# so that no formatting is done unless a sink formats them.
+# Components emit events with:
+#     if self.events.sinks:
+#         self.events.emit(ev.Event(ev.KIND, self, subject, data))
+
+# Print tracing is the print sink, which prints events as trace lines.
+# A component whose trace flag is True attaches the print sink to its stream,
+# and the print sink prints only the events of components whose trace flag is True.
+
+# Event kinds, with the subject and data of their events:
+LIBRARY_OPENED = "library_opened"            # subject: scenario directory.
+LIBRARY_INDEXED = "library_indexed"          # subject: scenario directory, data: (plans, scenarios, files read).
+PLAN_ADDED = "plan_added"                    # subject: plan name, data: plan.
+PLANS_LOADED = "plans_loaded"                # subject: scenario directory, data: (plans loaded, files failed).
+SCENARIO_ADDED = "scenario_added"            # subject: scenario name, data: scenario.
+SCENARIOS_DISPATCHED = "scenarios_dispatched"  # data: fleet statistics.
+BATCH_DISPATCHED = "batch_dispatched"        # data: (scenarios dispatched, scenarios succeeded).
+EXECUTION_STARTED = "execution_started"      # subject: plan name.
+ACTION_SELECTED = "action_selected"          # subject: action.
+NO_ACTION_SELECTED = "no_action_selected"
+ACTION_STARTED = "action_started"            # subject: action.
+LINKS_CONSUMED = "links_consumed"            # subject: action, data: links deactivated.
+ACTION_DISPATCHED = "action_dispatched"      # subject: action.
+STATE_OBSERVED = "state_observed"            # data: changed assignments.
+STATE_CHANGE_CHECKED = "state_change_checked"  # data: number of active links.
+LINK_SATISFIED = "link_satisfied"            # subject: link, data: "change" or "state", what satisfies it.
+LINK_VIOLATED = "link_violated"              # subject: link, data: "change" or "state", what violates it.
+LINKS_ACTIVATED = "links_activated"          # subject: action, data: links activated.
+ACTIVE_LINKS = "active_links"                # data: active links.
+EXECUTION_CONFLICT = "execution_conflict"    # subject: action, data: conflicts with changes while it executed.
+EFFECT_CONFLICT = "effect_conflict"          # subject: action, data: conflicts with the links it activated.
+ACTION_SUCCEEDED = "action_succeeded"        # subject: action, data: successors enabled.
+EXECUTION_ENDED = "execution_ended"          # data: number of actions completed.
+STATE_UPDATED = "state_updated"              # data: changed assignments.
+
+
+class Event:
+    # An event of kind, reported by source, about subject, with data, at time (from time.perf_counter).
+    __slots__ = ("kind", "source", "subject", "data", "time")
+
+    def __init__(self, kind: str, source, subject = None, data = None):
+        self.kind = kind
+        self.source = source
+        self.subject = subject
+        self.data = data
+        self.time = time.perf_counter()
+
+    def __str__(self):
+        return f"{self.kind} {self.subject} {self.data}"
+
+
+class EventStream:
+    # The sinks that the events of components are written to.
+
+    def __init__(self):
+        self.sinks = []
+
+    def __str__(self):
+        return f"Event stream to {len(self.sinks)} sinks"
+
+    def attach(self, sink):
+        # Writes the events of the stream to sink, unless sink is already attached.
+        if sink not in self.sinks:
+            self.sinks.append(sink)
+
+    def detach(self, sink):
+        if sink in self.sinks:
+            self.sinks.remove(sink)
+
+    def emit(self, event: Event):
+        for sink in self.sinks:
+            sink.handle(event)
+
+
+def trace_events(events: EventStream, trace: bool):
+    # Attaches the print sink to events, if trace.
+    if trace:
+        events.attach(print_sink)
+
+
+class RingBufferSink:
+    # Keeps the last capacity events.
+
+    def __init__(self, capacity: int = 10000):
+        self.buffer = collections.deque(maxlen = capacity)
+
+    def __str__(self):
+        return f"Ring buffer of {len(self.buffer)} events"
+
+    def handle(self, event: Event):
+        self.buffer.append(event)
+
+    def events(self) -> list[Event]:
+        # Returns the events kept, oldest first.
+        return list(self.buffer)
+
+
+class StageSink:
+    # Assembles the events of one execution into stages, each an action that succeeded or produced conflicts,
+    # with the state change observed, the links activated and the links deactivated (consumed) by the action,
+    # and passes each to its stage method, for sinks that record executions stage by stage.
+    # Actions may run concurrently, so the links each action consumed are kept until it ends.
+    # The state change and activated links of an action are reported just before it ends (see asyncdispatcher).
+
+    def __init__(self):
+        self.startedp = False  # True once the execution has started.
+        self.deactivated = dict()  # Links consumed by each running action.
+        self.delta = dict()  # State change observed since the last stage.
+        self.activated = []  # Links activated since the last stage.
+
+    def handle(self, event: Event):
+        kind = event.kind
+        if kind == EXECUTION_STARTED:
+            self.startedp = True
+            self.start(event)
+        elif not self.startedp:
+            return
+        elif kind == LINKS_CONSUMED:
+            self.deactivated[event.subject] = event.data
+        elif kind == STATE_UPDATED:
+            self.delta.update(event.data)
+        elif kind == LINKS_ACTIVATED:
+            self.activated = event.data
+        elif kind == ACTION_SUCCEEDED or kind == EXECUTION_CONFLICT or kind == EFFECT_CONFLICT:
+            action = event.subject
+            self.stage(event, self.delta, self.activated, self.deactivated.pop(action, []))
+            self.delta = dict()
+            self.activated = []
+        elif kind == EXECUTION_ENDED:
+            self.end(event)
+
+    def start(self, event: Event):
+        # Called when the execution starts, with its EXECUTION_STARTED event.
+        pass
+
+    def stage(self, event: Event, delta: dict, activated: list, deactivated: list):
+        # Called when the action event.subject ends, with its ACTION_SUCCEEDED, EXECUTION_CONFLICT or EFFECT_CONFLICT event.
+        pass
+
+    def end(self, event: Event):
+        # Called when the execution ends, with its EXECUTION_ENDED event.
+        pass
+
+
+class PrintSink:
+    # Prints the events of components whose trace flag is True, as trace lines.
+
+    def handle(self, event: Event):
+        if getattr(event.source, "trace", True):
+            for line in event_lines(event):
+                print(line)
+
+
+def event_lines(event: Event) -> list[str]:
+    # Returns the trace lines of event.
+    kind = event.kind
+    subject = event.subject
+    data = event.data
+    if kind == LIBRARY_OPENED:
+        return [f"Will look for scenarios in directory {subject}."]
+    elif kind == LIBRARY_INDEXED:
+        return [f"Indexed {data[0]} plans and {data[1]} scenarios in {subject}, read {data[2]} files."]
+    elif kind == PLAN_ADDED:
+        return [f"Adding plan {subject} to library as {data}."]
+    elif kind == PLANS_LOADED:
+        return [f"Loaded {data[0]} plans from {subject}, {data[1]} failed."]
+    elif kind == SCENARIO_ADDED:
+        return [f"Adding scenario {subject} to library as {data}."]
+    elif kind == SCENARIOS_DISPATCHED:
+        return ["", f"Dispatched {data}."]
+    elif kind == BATCH_DISPATCHED:
+        return [f"Dispatched {data[0]} scenarios, {data[1]} succeeded."]
+    elif kind == EXECUTION_STARTED:
+        return ["", f"Executing {subject}:"]
+    elif kind == ACTION_SELECTED:
+        return [f"      Selects action {subject}."]
+    elif kind == NO_ACTION_SELECTED:
+        return ["      No action selected."]
+    elif kind == ACTION_STARTED:
+        return ["", f"   Starts action {subject}."]
+    elif kind == LINKS_CONSUMED:
+        if not data:
+            return ["      No links consumed."]
+        return ["      Links consumed:"] + [f"         {link}." for link in data]
+    elif kind == ACTION_DISPATCHED:
+        return [f"      Dispatches {subject.operator}."]
+    elif kind == STATE_OBSERVED:
+        return [f"      Observes {data}."]
+    elif kind == STATE_CHANGE_CHECKED:
+        if not data:
+            return ["         No past active links to check."]
+        return ["         Checking past active links"]
+    elif kind == LINK_SATISFIED:
+        if data == "state":
+            return [f"         State satisfies link {subject}."]
+        return [f"            Satisfies link {subject}."]
+    elif kind == LINK_VIOLATED:
+        if data == "state":
+            return [f"         State violates link {subject}."]
+        return [f"            Violates link {subject}."]
+    elif kind == LINKS_ACTIVATED:
+        if not data:
+            return ["      Action activates no links."]
+        return (["      Action activates links:"] + [f"         {link}:" for link in data]
+                + ["      Check new links against state:"])
+    elif kind == ACTIVE_LINKS:
+        if not data:
+            return ["      No links currently active."]
+        return ["      Current active links:"] + [f"         {link}" for link in data]
+    elif kind == EXECUTION_CONFLICT:
+        return [f"      Execution of {subject} produces conflicts {ut.list2string(data)}."]
+    elif kind == EFFECT_CONFLICT:
+        return [f"      {subject} produces conflicts {ut.list2string(data)}."]
+    elif kind == ACTION_SUCCEEDED:
+        if not data:
+            return [f"      {subject} succeeds, no enabled successors."]
+        return [f"      {subject} succeeds, enables successors:"] + [f"         {action}" for action in data]
+    elif kind == EXECUTION_ENDED:
+        return [f"   Plan dispatch ended with {data} completed."]
+    elif kind == STATE_UPDATED:
+        return ["         Updating state:"] + [f"           {variable} = {value}" for variable, value in data.items()]
+    else:
+        return [str(event)]
+
+
+# The print sink, shared by the streams that trace.
+print_sink = PrintSink()
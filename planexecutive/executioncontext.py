@@ -0,0 +1,75 @@
+from array import array
+import model.actions.action as am
+import model.plans.compiledplan as cp
+import planexecutive.stateestimator.currentstate as cs
+import planexecutive.monitor.activelinks as al
+import planexecutive.events as ev
+
+# Execution context:
+
+# The state of one execution of a compiled plan.
+# The compiled plan is shared and never changed; everything an execution changes is kept here,
+# so that one compiled plan can be dispatched any number of times, including concurrently.
+
+class ExecutionContext:
+    def __init__(self, compiled_plan: cp.CompiledPlan, trace = True):
+        self.plan = compiled_plan
+        self.completed_actions: list[am.Action] = []  # Actions that have been correctly dispatched, in order.
+        self.completedp = bytearray(compiled_plan.action_count())  # Indexed by action id, 1 if completed.
+
+        # Actions are enabled by counting down their predecessors that remain to be completed.
+        # Once enabled, an action's count is set to -1, so that it is enabled once.
+        self.remaining_predecessors = array('l', compiled_plan.predecessor_counts)
+
+        # Actions enabled to be dispatched, in the order they were enabled, as the keys of a dictionary,
+        # so that an action is added and removed in constant time.
+        # The plan's start action is enabled first, followed by any other action without predecessors.
+        self.enabled_actions: dict[am.Action, None] = dict()
+        self.enable_action(compiled_plan.start)
+        for action_id, count in enumerate(compiled_plan.predecessor_counts):
+            if count == 0 and action_id != compiled_plan.start:
+                self.enable_action(action_id)
+
+        # Actions that have started but not completed, when actions are dispatched concurrently (see asyncdispatcher).
+        self.running_actions: dict[am.Action, None] = dict()
+
+        # The events of the execution's dispatcher, monitor, bot and current state (see events).
+        self.events = ev.EventStream()
+
+        # Monitoring state: the causal links that are active, and the current state.
+        self.active_links = al.ActiveLinkStore()
+        self.current_state = cs.CurrentState([], trace, self.events)
+
+    def __str__(self):
+        return f"Execution of {self.plan.name}"
+
+    def complete_action(self, action: am.Action) -> list[am.Action]:
+        # Records that action was correctly dispatched, and replaces it in the enabled actions by the successors it enables,
+        # those whose predecessors have all been completed.  Returns the successors enabled.
+        # Takes time proportional to the number of successors of action.
+        self.completed_actions.append(action)
+        self.completedp[action.location] = 1
+        if action in self.running_actions:
+            del self.running_actions[action]
+        else:
+            del self.enabled_actions[action]
+
+        plan = self.plan
+        remaining = self.remaining_predecessors
+        successors = plan.successors(action.location)
+        for successor in successors:
+            remaining[successor] -= 1
+
+        return [self.enable_action(successor) for successor in successors if remaining[successor] == 0]
+
+    def start_action(self, action: am.Action):
+        # Records that the enabled action has started, moving it from the enabled actions to the running actions.
+        del self.enabled_actions[action]
+        self.running_actions[action] = None
+
+    def enable_action(self, action_id: int) -> am.Action:
+        # Adds action_id to the enabled actions, and returns its action.
+        self.remaining_predecessors[action_id] = -1
+        action = self.plan.actions[action_id]
+        self.enabled_actions[action] = None
+        return action
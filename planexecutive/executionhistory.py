@@ -0,0 +1,381 @@
+import json
+import mmap
+import os
+import threading
+import time
+from array import array
+from pathlib import Path
+import model.actions.action as am
+import model.plans.partialorderplan as pp
+import planexecutive.events as ev
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Execution history:
+
+# A record of executions, as an append-only columnar store in a directory, one file per column.
+# An execution recorder is an event sink (see events): it records each stage of the executions whose events
+# it is given, as the monitored_execution of the scenario output format describes (see planlibrary):
+# the action, the state change observed, the conditions of the links it activated and deactivated,
+# and the conflicts it produced, with the time the stage ended.
+
+# Columns are arrays of fixed width numbers, in the machine's byte order, each row appended to the end of its file.
+# Strings (plan and action names, variables and values) are replaced by their ids in the history's string table,
+# whose file lists the strings in the order of their ids, as a json string per line.
+# Stage columns have one row per stage.  The variable length parts of a stage, such as its state change,
+# are rows of their own columns, with a stage column of offsets to the end of each stage's rows.
+# Execution columns have one row per execution.  The stages of executions recorded together are interleaved,
+# each stage with the offset of its execution.
+
+# An execution history is read by memory mapping its column files, so that a query reads only the pages it touches,
+# and a column is a memoryview of its file, which NumPy can use as an array without copying (numpy.frombuffer).
+# Columns are written in order, rows of variable length parts before the stages that refer to them,
+# so that a history can be read while executions are being recorded.
+# A flush that is interrupted leaves some columns with more rows than others.  Readers use only the rows
+# that every column of a kind has (see consistent_lengths), and a recorder truncates the columns to them when opened.
+# A history has a single writer: a recorder holds an exclusive lock on the history's lock file until it is closed,
+# and a recorder opened on a history that another recorder, in this process or another, is writing to fails,
+# rather than truncating the rows that recorder is flushing.  The lock is an advisory file lock (fcntl.flock),
+# released when its holder exits; where there is no fcntl, as on Windows, it is not enforced.
+# Readers don't take the lock.
+
+# Stage outcomes:
+SUCCEEDED = 0
+EXECUTION_CONFLICT = 1  # A state change observed while the action executed violates an active link.
+EFFECT_CONFLICT = 2     # A link activated by the action is violated by the current state.
+
+# Columns and their array type codes, in the order they are written.
+EXECUTION_COLUMNS = {"execution_plan": "i",  # String id of the plan name.
+                     "execution_time": "d"}  # Time the execution started, in seconds since the epoch.
+
+PART_COLUMNS = {"delta_variable": "i", "delta_value": "i",  # State changes.
+                "activated_variable": "i", "activated_value": "i",  # Conditions of the links activated.
+                "deactivated_variable": "i", "deactivated_value": "i",  # Conditions of the links deactivated.
+                "conflict_variable": "i", "conflict_expected": "i", "conflict_observed": "i"}  # Conflicts.
+
+STAGE_COLUMNS = {"delta_end": "q", "activated_end": "q", "deactivated_end": "q", "conflict_end": "q",
+                 "stage_execution": "q",  # Offset of the stage's execution.
+                 "stage_action": "i",       # Id of the action in its plan.
+                 "stage_action_name": "i",  # String id of the action's operator.
+                 "stage_outcome": "b",
+                 "stage_time": "d"}         # Time the stage ended, in seconds since the epoch.
+
+STRINGS_FILE = "strings.jsonl"
+LOCK_FILE = "writer.lock"
+
+
+class ExecutionRecorder:
+    # Appends the executions it records to the execution history in directory, creating it if new.
+    # Rows are buffered, and written every flush_stages stages and when the recorder is closed.
+    # A recorder may be shared by executions whose events arrive in different threads (see fleetexecutive):
+    # each execution and stage is appended, and the rows flushed, while holding the recorder's lock.
+
+    def __init__(self, directory: str, flush_stages: int = 10000):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents = True, exist_ok = True)
+        self.flush_stages = flush_stages
+        self.lock = threading.Lock()
+
+        # The history's writer lock, taken before any column is truncated.
+        self.lock_file = open(self.directory / LOCK_FILE, "ab")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self.lock_file.close()
+                raise RuntimeError(f"Can't record to {self.directory}, another recorder is writing to it.")
+
+        # String table, continued from the strings already in the history,
+        # without a last string whose line was left incomplete by an interrupted flush.
+        self.strings: dict[str, int] = dict()
+        strings_path = self.directory / STRINGS_FILE
+        strings, size = read_strings(strings_path)
+        for string in strings:
+            self.strings[string] = len(self.strings)
+        if strings_path.exists() and strings_path.stat().st_size > size:
+            os.truncate(strings_path, size)
+        self.new_strings: list[str] = []
+
+        # Buffered rows of each column, and the number of rows of each column in the history, buffered or written.
+        # Rows left by an interrupted flush, past the rows every column of their kind has, are removed.
+        self.columns = {name: array(typecode) for name, typecode in all_columns().items()}
+        self.lengths = consistent_lengths(self.directory)
+        for name, typecode in all_columns().items():
+            path = column_path(self.directory, name, typecode)
+            size = self.lengths[name] * array(typecode).itemsize
+            if path.exists() and path.stat().st_size > size:
+                os.truncate(path, size)
+
+    def __str__(self):
+        return f"Execution recorder to {self.directory}"
+
+    def record(self, events: ev.EventStream) -> "ExecutionRecording":
+        # Records the execution whose events are written to events, and returns its recording.
+        recording = ExecutionRecording(self)
+        events.attach(recording)
+        return recording
+
+    def string_id(self, string) -> int:
+        # Returns the id of string in the history's string table, adding it if new.
+        string = str(string)
+        sid = self.strings.get(string)
+        if sid is None:
+            sid = self.strings[string] = len(self.strings)
+            self.new_strings.append(string)
+        return sid
+
+    def append(self, name: str, value):
+        self.columns[name].append(value)
+        self.lengths[name] += 1
+
+    def add_execution(self, plan_name: str, start_time: float) -> int:
+        # Appends an execution of the plan named plan_name, started at start_time, and returns its offset.
+        with self.lock:
+            execution = self.lengths["execution_plan"]
+            self.append("execution_plan", self.string_id(plan_name))
+            self.append("execution_time", start_time)
+            return execution
+
+    def add_stage(self, execution: int, action: am.Action, outcome: int, stage_time: float, delta: dict,
+                  activated: list[pp.CausalLink], deactivated: list[pp.CausalLink], conflicts: list[pp.LinkConflict]):
+        # Appends a stage of execution, in which action ended with outcome at stage_time.
+        with self.lock:
+            self.append_stage(execution, action, outcome, stage_time, delta, activated, deactivated, conflicts)
+            if len(self.columns["stage_action"]) >= self.flush_stages:
+                self.write()
+
+    def append_stage(self, execution: int, action: am.Action, outcome: int, stage_time: float, delta: dict,
+                     activated: list[pp.CausalLink], deactivated: list[pp.CausalLink], conflicts: list[pp.LinkConflict]):
+        # Appends the rows of a stage to the buffered columns.  Called while holding the lock.
+        string_id = self.string_id
+        for variable, value in delta.items():
+            self.append("delta_variable", string_id(variable))
+            self.append("delta_value", string_id(value))
+        for part, links in (("activated", activated), ("deactivated", deactivated)):
+            for link in links:
+                self.append(f"{part}_variable", string_id(link.condition.variable))
+                self.append(f"{part}_value", string_id(link.condition.value))
+        for conflict in conflicts:
+            condition = conflict.link.condition
+            self.append("conflict_variable", string_id(condition.variable))
+            self.append("conflict_expected", string_id(condition.value))
+            self.append("conflict_observed", string_id(conflict.observed_value))
+
+        lengths = self.lengths
+        for part in ("delta", "activated", "deactivated", "conflict"):
+            self.append(f"{part}_end", lengths[f"{part}_variable"])
+        self.append("stage_execution", execution)
+        self.append("stage_action", action.location)
+        self.append("stage_action_name", string_id(action.operator))
+        self.append("stage_outcome", outcome)
+        self.append("stage_time", stage_time)
+
+    def flush(self):
+        # Writes the buffered strings and rows to the history.
+        with self.lock:
+            self.write()
+
+    def write(self):
+        # Writes the buffered strings and rows to the history, strings first and stages last.
+        # Called while holding the lock.
+        if self.new_strings:
+            with open(self.directory / STRINGS_FILE, "at") as file:
+                file.writelines(json.dumps(string) + "\n" for string in self.new_strings)
+            self.new_strings = []
+        for name, column in self.columns.items():
+            if column:
+                with open(column_path(self.directory, name, column.typecode), "ab") as file:
+                    column.tofile(file)
+                del column[:]
+
+    def close(self):
+        # Writes the buffered rows, and releases the history's writer lock.
+        if not self.lock_file.closed:
+            self.flush()
+            self.lock_file.close()
+
+
+class ExecutionRecording(ev.StageSink):
+    # The event sink that records one execution to an execution recorder, stage by stage.
+
+    def __init__(self, recorder: ExecutionRecorder):
+        super().__init__()
+        self.recorder = recorder
+        self.execution = -1  # Offset of the execution in the history, once it starts.
+        self.start_time = 0.0  # Time the execution started, in seconds since the epoch,
+        self.start_counter = 0.0  # and as measured by time.perf_counter.
+
+    def __str__(self):
+        return f"Recording of execution {self.execution}"
+
+    def start(self, event: ev.Event):
+        self.start_time = time.time()
+        self.start_counter = event.time
+        self.execution = self.recorder.add_execution(event.subject, self.start_time)
+
+    def stage(self, event: ev.Event, delta: dict, activated: list[pp.CausalLink], deactivated: list[pp.CausalLink]):
+        kind = event.kind
+        if kind == ev.ACTION_SUCCEEDED:
+            outcome, conflicts = SUCCEEDED, []
+        else:
+            outcome = EXECUTION_CONFLICT if kind == ev.EXECUTION_CONFLICT else EFFECT_CONFLICT
+            conflicts = event.data
+        stage_time = self.start_time + (event.time - self.start_counter)
+        self.recorder.add_stage(self.execution, event.subject, outcome, stage_time, delta, activated, deactivated, conflicts)
+
+
+class ExecutionHistory:
+    # Reads the execution history in directory, by memory mapping its columns.
+    # Executions and stages recorded after the history is opened are read once it is opened again.
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.strings: list[str] = read_strings(self.directory / STRINGS_FILE)[0]
+
+        # Rows whose columns are all written, if a recorder was writing when the history was opened
+        # or a flush was interrupted.  Every column is cut to the rows of its kind.
+        lengths = consistent_lengths(self.directory)
+        self.maps = []
+        self.columns: dict[str, memoryview] = {name: self.map_column(name, typecode)[:lengths[name]]
+                                               for name, typecode in all_columns().items()}
+        self.execution_count = lengths["execution_plan"]
+        self.stage_count = lengths["stage_action"]
+        self.stage_index = None  # Without NumPy, the stages of each execution, made when first needed.
+
+    def __str__(self):
+        return f"Execution history of {self.execution_count} executions, {self.stage_count} stages"
+
+    def __len__(self):
+        return self.stage_count
+
+    def map_column(self, name: str, typecode: str) -> memoryview:
+        path = column_path(self.directory, name, typecode)
+        if not path.exists() or path.stat().st_size == 0:
+            return memoryview(array(typecode))
+        with open(path, "rb") as file:
+            column_map = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+        self.maps.append(column_map)
+        size = len(column_map) - len(column_map) % array(typecode).itemsize
+        return memoryview(column_map)[:size].cast(typecode)
+
+    def close(self):
+        for column in self.columns.values():
+            column.release()
+        for column_map in self.maps:
+            column_map.close()
+        self.maps = []
+
+    def column(self, name: str) -> memoryview:
+        # Returns the column named name, without copying it.
+        return self.columns[name]
+
+    def execution_stages(self, execution: int) -> list[int]:
+        # Returns the offsets of the stages of execution, in order.
+        # Stages of executions recorded together are interleaved, so with NumPy the stage column is compared at once;
+        # without it, the stages of every execution are indexed in one pass over the column, the first time.
+        stage_executions = self.columns["stage_execution"]
+        if np is not None:
+            return np.flatnonzero(np.asarray(stage_executions) == execution).tolist()
+        if self.stage_index is None:
+            self.stage_index = dict()
+            for stage, stage_execution in enumerate(stage_executions):
+                self.stage_index.setdefault(stage_execution, []).append(stage)
+        return list(self.stage_index.get(execution, ()))
+
+    def execution_plan(self, execution: int) -> str:
+        return self.strings[self.columns["execution_plan"][execution]]
+
+    def stage(self, stage: int) -> dict:
+        # Returns the stage at offset stage, as in the monitored_execution of the scenario output format.
+        columns = self.columns
+        return {"action": self.strings[columns["stage_action_name"][stage]],
+                "action_id": columns["stage_action"][stage],
+                "execution": columns["stage_execution"][stage],
+                "outcome": columns["stage_outcome"][stage],
+                "time": columns["stage_time"][stage],
+                "activated_conditions": self.part_assignments("activated", stage),
+                "deactivated-conditions": self.part_assignments("deactivated", stage),
+                "state-change": self.part_assignments("delta", stage),
+                "conflicts": self.stage_conflicts(stage)}
+
+    def part_rows(self, part: str, stage: int) -> slice:
+        # Returns the rows of the variable length part of stage.
+        ends = self.columns[f"{part}_end"]
+        return slice(ends[stage - 1] if stage > 0 else 0, ends[stage])
+
+    def part_assignments(self, part: str, stage: int) -> dict:
+        # Returns the assignments of the part of stage, state change or link conditions.
+        rows = self.part_rows(part, stage)
+        strings = self.strings
+        return {strings[variable]: strings[value]
+                for variable, value in zip(self.columns[f"{part}_variable"][rows], self.columns[f"{part}_value"][rows])}
+
+    def stage_conflicts(self, stage: int) -> list[dict]:
+        # Returns the conflicts of stage, each the variable of a violated link, its expected value and the value observed.
+        rows = self.part_rows("conflict", stage)
+        strings = self.strings
+        columns = self.columns
+        return [{"variable": strings[variable], "expected": strings[expected], "observed": strings[observed]}
+                for variable, expected, observed in zip(columns["conflict_variable"][rows],
+                                                        columns["conflict_expected"][rows],
+                                                        columns["conflict_observed"][rows])]
+
+
+def all_columns() -> dict[str, str]:
+    # Returns the type codes of the columns, in the order they are written.
+    return {**EXECUTION_COLUMNS, **PART_COLUMNS, **STAGE_COLUMNS}
+
+def column_path(directory: Path, name: str, typecode: str) -> Path:
+    return directory / f"{name}.{typecode}"
+
+def column_length(directory: Path, name: str, typecode: str) -> int:
+    # Returns the number of rows in the file of the column named name.
+    path = column_path(directory, name, typecode)
+    if not path.exists():
+        return 0
+    return path.stat().st_size // array(typecode).itemsize
+
+def read_strings(strings_path: Path) -> tuple[list[str], int]:
+    # Returns the strings of the string table file at strings_path, up to the last complete line,
+    # and the number of bytes of those lines.
+    strings = []
+    size = 0
+    if strings_path.exists():
+        with open(strings_path, "rb") as file:
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                strings.append(json.loads(line))
+                size += len(line)
+    return strings, size
+
+def consistent_lengths(directory: Path) -> dict[str, int]:
+    # Returns the number of rows of each column of the history in directory that are complete:
+    # the executions that every execution column has, the stages that every stage column has,
+    # and the rows of each variable length part up to the end of the last of those stages.
+    lengths = {name: column_length(directory, name, typecode) for name, typecode in all_columns().items()}
+    executions = min(lengths[name] for name in EXECUTION_COLUMNS)
+    stages = min(lengths[name] for name in STAGE_COLUMNS)
+    consistent = {name: executions for name in EXECUTION_COLUMNS}
+    consistent.update({name: stages for name in STAGE_COLUMNS})
+    for part in ("delta", "activated", "deactivated", "conflict"):
+        end = 0
+        if stages > 0:
+            typecode = STAGE_COLUMNS[f"{part}_end"]
+            with open(column_path(directory, f"{part}_end", typecode), "rb") as file:
+                file.seek((stages - 1) * array(typecode).itemsize)
+                ends = array(typecode)
+                ends.fromfile(file, 1)
+            end = ends[0]
+        for name in PART_COLUMNS:
+            if name.startswith(f"{part}_"):
+                consistent[name] = end
+    return consistent
@@ -1,3 +1,6 @@
+import collections
+import typing
+
 # Plan Execution Script
 
 class Stage:
@@ -19,21 +22,27 @@ class ExecutionScenario:
 
     # The user is requested to provide online input for a test if no stages are provided.
 
+    # A bot reads the scenario's stages with a stage reader (see bot), the start stage first,
+    # then the stages, then the goal stage.
+
     def __init__(self, scenario_name, plan_name: str, start: dict, stages: list[Stage]):
         # action_name is a string. state_change is a list of assignments.
         self.scenario_name = scenario_name
         self.plan_name = plan_name
         self.start = start
         self.stages = stages
-        start_stage = Stage("start", self.start)
-        goal_stage = Stage("goal", dict())
-        self.encoded_stages = self.stages[:]
-        self.encoded_stages.insert(0,start_stage)
-        self.encoded_stages.append(goal_stage)
 
     def __str__(self):
         return f'Scenario {self.scenario_name}'
 
+    def stage_reader(self) -> "StageReader":
+        # Returns a reader of the stages of one dispatch of the scenario.
+        return StageReader(self.start, self.stage_iterator())
+
+    def stage_iterator(self) -> typing.Iterator[Stage]:
+        # Returns an iterator over the stages, without the start and goal stages.
+        return iter(self.stages)
+
     def display_execution(self):
         print(f'{self.scenario_name} -executing {self.plan_name}:')
 
@@ -42,4 +51,88 @@ class ExecutionScenario:
         else:
             print(f'   {self.start}')
             for stg in self.stages:
-                print(f'   {stg}')
\ No newline at end of file
+                print(f'   {stg}')
+
+
+class StreamingExecutionScenario(ExecutionScenario):
+    # An execution scenario whose stages are read as they are dispatched, from the iterator returned by open_stages,
+    # so that a scenario of any length is dispatched in constant memory.
+    # open_stages is called for each dispatch of the scenario; it should be picklable,
+    # so that the scenario can be passed to worker processes (see planlibrary).
+
+    def __init__(self, scenario_name, plan_name: str, start: dict, open_stages: typing.Callable[[], typing.Iterator[Stage]]):
+        ExecutionScenario.__init__(self, scenario_name, plan_name, start, [])
+        self.open_stages = open_stages
+
+    def stage_iterator(self) -> typing.Iterator[Stage]:
+        return iter(self.open_stages())
+
+    def display_execution(self):
+        print(f'{self.scenario_name} -executing {self.plan_name}:')
+        print(f'   {self.start}')
+        print("   Stages read as dispatched.")
+
+
+class StageReader:
+    # Reads the stages of a dispatch of a scenario by their index: the start stage, with the scenario's start state,
+    # the stages produced by stage_iterator, and the goal stage.
+    # Stages are read from the iterator as they are needed, and kept until they are released.
+
+    def __init__(self, start: dict, stage_iterator: typing.Iterator[Stage]):
+        self.stage_iterator = stage_iterator
+        self.window: collections.deque[Stage] = collections.deque([Stage("start", start)])  # Stages kept,
+        self.window_start = 0  # starting with the stage at this index.
+        self.endedp = False  # True once the goal stage has been read.
+
+    def __str__(self):
+        return f'Stage reader at stage {self.window_start}'
+
+    def stage(self, index: int) -> Stage or None:
+        # Returns the stage at index, or None if the scenario has no more stages.
+        window = self.window
+        if index < self.window_start:
+            print(f"{self}: stage {index} was released.")
+            return None
+        while index >= self.window_start + len(window):
+            if self.endedp:
+                return None
+            next_stage = next(self.stage_iterator, None)
+            if next_stage is None:
+                next_stage = Stage("goal", dict())
+                self.endedp = True
+            window.append(next_stage)
+        return window[index - self.window_start]
+
+    def release(self, index: int):
+        # Releases the stages before index, which won't be read again.
+        window = self.window
+        while self.window_start < index and window:
+            window.popleft()
+            self.window_start += 1
+
+
+class ScenarioResult:
+    # The outcome of dispatching an execution scenario, in a form that can be reported as json:
+    # whether it succeeded, the operators of the completed actions, the conflicts found and the end state.
+    # If the scenario couldn't be dispatched, error describes why.
+
+    def __init__(self, scenario_name: str, plan_name: str or None, successp: bool, completed: list[str],
+                 conflicts: list[dict], end_state: dict, error: str = None):
+        self.scenario_name = scenario_name
+        self.plan_name = plan_name
+        self.successp = successp
+        self.completed = completed
+        self.conflicts = conflicts  # Each conflict's link, variable, expected and observed values.
+        self.end_state = end_state
+        self.error = error
+
+    def __str__(self):
+        if self.error is not None:
+            return f'Scenario {self.scenario_name} not dispatched: {self.error}'
+        outcome = "succeeded" if self.successp else "failed"
+        return f'Scenario {self.scenario_name} for {self.plan_name} {outcome} after {len(self.completed)} actions'
+
+    def to_dict(self) -> dict:
+        return {"scenario_name": self.scenario_name, "plan_name": self.plan_name, "success": self.successp,
+                "completed": self.completed, "conflicts": self.conflicts, "end_state": self.end_state,
+                "error": self.error}
@@ -0,0 +1,99 @@
+import asyncio
+import concurrent.futures
+import time
+from model.plans.totalorderplan import TotalOrderPlan
+import planexecutive.dispatcher.asyncdispatcher as ad
+import planexecutive.robot.asyncbot as ab
+import planexecutive.executionscenario as es
+import planexecutive.executionhistory as eh
+
+# Fleet executive:
+
+# Dispatches the plans of many robots together in one process.
+# Each execution has its own AsyncDispatcher, CausalLinkMonitor and bot, and all executions are multiplexed
+# over one asyncio event loop.  Executions of the same plan share its compiled plan.
+# If workers is more than 0, the monitoring of action completions runs on a pool of that many worker threads.
+# If the fleet has an execution recorder, every execution added is recorded to its history (see executionhistory).
+
+class FleetStatistics:
+    # Aggregate throughput of the executions dispatched by a fleet executive.
+
+    def __init__(self):
+        self.executions = 0           # Executions dispatched.
+        self.succeeded = 0            # Executions that succeeded.
+        self.actions_dispatched = 0   # Actions completed by the executions.
+        self.monitor_checks = 0       # Links checked against state changes and current states.
+        self.elapsed = 0.0            # Seconds spent dispatching.
+
+    def __str__(self):
+        return (f"{self.executions} executions, {self.succeeded} succeeded, "
+                f"{self.actions_dispatched} actions in {self.elapsed:.3f}s: "
+                f"{self.actions_per_second():.0f} actions/s, {self.checks_per_second():.0f} checks/s")
+
+    def actions_per_second(self) -> float:
+        return self.actions_dispatched / self.elapsed if self.elapsed else 0.0
+
+    def checks_per_second(self) -> float:
+        return self.monitor_checks / self.elapsed if self.elapsed else 0.0
+
+
+class FleetExecutive:
+    # Dispatches the executions added to it together, and accumulates their throughput statistics.
+
+    def __init__(self, max_concurrent: int = 8, workers: int = 0, trace = False, recorder: eh.ExecutionRecorder = None):
+        self.max_concurrent = max_concurrent  # Most actions running at once in each execution.
+        self.workers = workers  # Worker threads that monitor action completions, or 0 to monitor on the event loop.
+        self.trace = trace
+        self.recorder = recorder  # Records the executions, if not None.
+        self.executions: list[ad.AsyncDispatcher] = []  # Executions added, and not yet dispatched.
+        self.statistics = FleetStatistics()
+
+    def __str__(self):
+        return f"Fleet executive of {len(self.executions)} executions"
+
+    def add_execution(self, name: str, total_order_plan: TotalOrderPlan, async_bot: ab.AsyncBot = None) -> ad.AsyncDispatcher:
+        # Adds an execution of total_order_plan by async_bot, and returns its dispatcher.
+        dispatcher = ad.AsyncDispatcher(name, total_order_plan, async_bot, self.max_concurrent, self.trace)
+        if self.recorder is not None:
+            self.recorder.record(dispatcher.events)
+        self.executions.append(dispatcher)
+        return dispatcher
+
+    def add_scenario(self, name: str, total_order_plan: TotalOrderPlan, scenario: es.ExecutionScenario) -> ad.AsyncDispatcher:
+        # Adds an execution of total_order_plan by a bot scripted by scenario, and returns its dispatcher.
+        dispatcher = self.add_execution(name, total_order_plan)
+        dispatcher.load_scenario(scenario)
+        return dispatcher
+
+    def run(self) -> list[tuple]:
+        # Dispatches the executions added, until all have ended.
+        # Returns the result of each execution, in the order they were added:
+        # its completed actions, end state, whether it succeeded, and its conflicts.
+        return asyncio.run(self.run_async())
+
+    async def run_async(self) -> list[tuple]:
+        # Dispatches the executions added, on the running event loop, as run does.
+        executions = self.executions
+        self.executions = []
+
+        executor = None
+        if self.workers > 0:
+            executor = concurrent.futures.ThreadPoolExecutor(self.workers)
+            for dispatcher in executions:
+                dispatcher.executor = executor
+
+        start = time.perf_counter()
+        try:
+            results = await asyncio.gather(*(dispatcher.dispatch_plan() for dispatcher in executions))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        statistics = self.statistics
+        statistics.elapsed += time.perf_counter() - start
+        statistics.executions += len(executions)
+        for dispatcher, (completed, end_state, successp, conflicts) in zip(executions, results):
+            statistics.succeeded += successp
+            statistics.actions_dispatched += len(completed)
+            statistics.monitor_checks += dispatcher.monitor.checks
+        return results
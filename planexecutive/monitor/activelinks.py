@@ -0,0 +1,74 @@
+import model.actions.action as am
+import model.plans.partialorderplan as pp
+
+# Active link store:
+
+# The causal links of an execution that are active, those whose producer has completed and whose consumer
+# has not started, indexed by the variable of their condition and by their consumer.
+# A link is activated and deactivated in constant time,
+# and the links that a changed variable could violate are found without looking at other links.
+# Each index is a dictionary whose keys are the links, in the order they were activated.
+# If the store is one row of a batch monitor, the batch monitor is told of each activation and deactivation (see batchmonitor).
+
+class ActiveLinkStore:
+
+    def __init__(self):
+        self.links: dict[pp.CausalLink, None] = dict()  # All active links.
+        self.variable_links: dict[str, dict[pp.CausalLink, None]] = dict()  # Active links of each condition variable.
+        self.consumer_links: dict[am.Action, dict[pp.CausalLink, None]] = dict()  # Active links of each consumer.
+        self.batch = None  # Batch monitor of the store, if any.
+        self.batch_row = -1  # Row of the store in its batch monitor.
+
+    def __str__(self):
+        return f"{len(self.links)} active links"
+
+    def __len__(self):
+        return len(self.links)
+
+    def __iter__(self):
+        # Iterates over the active links, in the order they were activated.
+        return iter(self.links)
+
+    def __contains__(self, link: pp.CausalLink):
+        return link in self.links
+
+    def add(self, link: pp.CausalLink):
+        # Activates link.
+        self.links[link] = None
+        variable = link.condition.variable
+        if variable in self.variable_links:
+            self.variable_links[variable][link] = None
+        else:
+            self.variable_links[variable] = {link: None}
+        if link.consumer in self.consumer_links:
+            self.consumer_links[link.consumer][link] = None
+        else:
+            self.consumer_links[link.consumer] = {link: None}
+        if self.batch is not None:
+            self.batch.link_activated(self.batch_row, link)
+
+    def remove(self, link: pp.CausalLink):
+        # Deactivates the active link.
+        del self.links[link]
+        variable = link.condition.variable
+        links = self.variable_links[variable]
+        del links[link]
+        if not links:
+            del self.variable_links[variable]
+        links = self.consumer_links[link.consumer]
+        del links[link]
+        if not links:
+            del self.consumer_links[link.consumer]
+        if self.batch is not None:
+            self.batch.link_deactivated(self.batch_row, link)
+
+    def remove_consumed(self, action: am.Action) -> list[pp.CausalLink]:
+        # Deactivates the active links that action consumes, and returns them.
+        consumed = list(self.consumer_links.get(action, ()))
+        for link in consumed:
+            self.remove(link)
+        return consumed
+
+    def variable_active_links(self, variable: str) -> list[pp.CausalLink]:
+        # Returns the active links whose condition assigns variable.
+        return list(self.variable_links.get(variable, ()))
@@ -0,0 +1,191 @@
+import model.states.symboltable as sym
+import model.plans.partialorderplan as pp
+import planexecutive.monitor.planmonitor as lm
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Batch link monitor:
+
+# Checks the state changes observed by many executions against their active links at once,
+# as CausalLinkMonitor.check_state_change does for one execution.
+# The active links of the executions are kept as NumPy arrays over interned variable ids (see symboltable),
+# with one row per execution:
+# - counts, the number of active links of each variable, which is the active mask where it is nonzero;
+# - expected, the value id that the active links of each variable expect;
+# - mixed, True where the active links of a variable expect different values.
+# The arrays are updated as each execution's active link store activates and deactivates links (see activelinks).
+
+# A batch of state changes, each an execution, variable and value, is checked in one array operation,
+# which finds the changes that assign a variable with active links a value other than the one expected.
+# Only those changes are checked link by link, to produce their LinkConflicts.
+# The changes are then recorded in the current state of each execution, as for one execution.
+# Requires NumPy; if NumPy is not installed, each change is checked link by link.
+
+class BatchLinkMonitor:
+
+    def __init__(self, monitors: list[lm.CausalLinkMonitor], symbol_table: sym.SymbolTable = sym.symbols):
+        # monitors are the monitors of the executions, in the order of the batch's rows.
+        # symbol_table interns the variables and values of their plans.
+        self.monitors = monitors
+        self.symbol_table = symbol_table
+        self.vectorizedp = np is not None
+        if not self.vectorizedp:
+            print("NumPy is not installed. State changes are checked link by link.")
+
+        n = len(monitors)
+        n_variables = max(len(symbol_table.variables), 1)
+        if self.vectorizedp:
+            self.counts = np.zeros((n, n_variables), dtype=np.int32)
+            self.expected = np.full((n, n_variables), -1, dtype=np.int64)
+            self.mixed = np.zeros((n, n_variables), dtype=bool)
+
+        for row, monitor in enumerate(monitors):
+            store = monitor.active_links
+            store.batch = self
+            store.batch_row = row
+            for link in store:
+                self.link_activated(row, link)
+
+    def __str__(self):
+        return f"Batch link monitor of {len(self.monitors)} executions"
+
+    def detach(self):
+        # Stops updating the batch from the monitors' active links.
+        for monitor in self.monitors:
+            monitor.active_links.batch = None
+            monitor.active_links.batch_row = -1
+
+    # Update the arrays as links are activated and deactivated.
+
+    def link_activated(self, row: int, link: pp.CausalLink):
+        if not self.vectorizedp:
+            return
+        variable_id, value_id = self.condition_ids(link)
+        if variable_id >= self.counts.shape[1]:
+            self.add_variables(variable_id + 1)
+        count = self.counts[row, variable_id]
+        if count == 0:
+            self.expected[row, variable_id] = value_id
+        elif self.expected[row, variable_id] != value_id:
+            self.mixed[row, variable_id] = True
+        self.counts[row, variable_id] = count + 1
+
+    def link_deactivated(self, row: int, link: pp.CausalLink):
+        if not self.vectorizedp:
+            return
+        variable_id, value_id = self.condition_ids(link)
+        count = self.counts[row, variable_id] - 1
+        self.counts[row, variable_id] = count
+        if count == 0:
+            # Values expected by the remaining links are only known again once none remain.
+            self.expected[row, variable_id] = -1
+            self.mixed[row, variable_id] = False
+
+    def condition_ids(self, link: pp.CausalLink) -> tuple[int, int]:
+        # Returns the variable and value ids of the condition of link.
+        condition = link.condition
+        if condition.variable_id is None:
+            condition = self.symbol_table.assignment(condition.variable, condition.value)
+        return condition.variable_id, condition.value_id
+
+    def add_variables(self, n_variables: int):
+        # Adds columns for variables interned since the arrays were made, and some to spare.
+        n_variables = max(n_variables, 2 * self.counts.shape[1])
+        extra = n_variables - self.counts.shape[1]
+        n = len(self.monitors)
+        self.counts = np.hstack((self.counts, np.zeros((n, extra), dtype=np.int32)))
+        self.expected = np.hstack((self.expected, np.full((n, extra), -1, dtype=np.int64)))
+        self.mixed = np.hstack((self.mixed, np.zeros((n, extra), dtype=bool)))
+
+    # Check state changes.
+
+    def check_state_changes(self, changes: list[dict]) -> list[list[pp.LinkConflict]]:
+        # Checks the state changes of every execution, changes[row] being the changed assignments of row's execution,
+        # against the active links of the executions, then records the changes in each execution's current state,
+        # as CausalLinkMonitor.check_state_change does.
+        # Returns the conflicts of each execution.
+        # Variables and values are looked up without interning them, so that the check doesn't add to the symbol table
+        # the values observed that no link expects; a value the table doesn't know is expected by no link,
+        # so it violates every active link of its variable.  The current states record such values without interning them.
+        rows = []
+        variable_ids = []
+        value_ids = []
+        values = []
+        table = self.symbol_table
+        table_variable_ids = table.variable_ids
+        table_value_ids = table.value_ids
+        for row, changed_assignments in enumerate(changes):
+            for variable, value in changed_assignments.items():
+                variable_id = table_variable_ids.get(variable)
+                if variable_id is None:
+                    continue  # No link is on a variable the table doesn't know.
+                rows.append(row)
+                variable_ids.append(variable_id)
+                value_ids.append(table_value_ids.get(value, -1))
+                values.append(value)
+        conflicts = self.check_ids(rows, variable_ids, value_ids, values)
+
+        for monitor, changed_assignments in zip(self.monitors, changes):
+            if changed_assignments:
+                monitor.current_state.update_state(changed_assignments)
+        return conflicts
+
+    def check_deltas(self, rows, variable_ids, value_ids) -> list[list[pp.LinkConflict]]:
+        # Checks a batch of state changes, the assignment of value_ids[i] to variable_ids[i] by the execution of rows[i],
+        # against the active links of the executions, then records the changes in each execution's current state.
+        # The arguments are sequences or arrays of equal length, of ids interned by the symbol table.
+        # Returns the conflicts of each execution, in the order of the changes, then of the links activated.
+        table_values = self.symbol_table.values
+        conflicts = self.check_ids(rows, variable_ids, value_ids, [table_values[value_id] for value_id in value_ids])
+
+        row_variables = [[] for _ in self.monitors]
+        row_values = [[] for _ in self.monitors]
+        for row, variable_id, value_id in zip(rows, variable_ids, value_ids):
+            row_variables[row].append(int(variable_id))
+            row_values[row].append(int(value_id))
+        for monitor, delta_variables, delta_values in zip(self.monitors, row_variables, row_values):
+            if delta_variables:
+                monitor.current_state.apply_delta(delta_variables, delta_values)
+        return conflicts
+
+    def check_ids(self, rows, variable_ids, value_ids, values) -> list[list[pp.LinkConflict]]:
+        # Checks the state changes of check_deltas, whose values are values, and value id -1 if not interned.
+        # Returns the conflicts of each execution.
+        conflicts = [[] for _ in self.monitors]
+        if not self.vectorizedp:
+            for row, variable_id, value in zip(rows, variable_ids, values):
+                self.monitors[row].checks += self.check_delta(row, variable_id, value, conflicts[row])
+            return conflicts
+
+        rows = np.asarray(rows, dtype=np.int64)
+        variable_ids = np.asarray(variable_ids, dtype=np.int64)
+        value_ids = np.asarray(value_ids, dtype=np.int64)
+
+        # Variables interned since the arrays were last extended have no active links.
+        # A value id of -1 differs from the value expected by every active link.
+        known = variable_ids < self.counts.shape[1]
+        cells = (rows[known], variable_ids[known])
+        counts = self.counts[cells]
+        violated = (counts > 0) & ((self.expected[cells] != value_ids[known]) | self.mixed[cells])
+
+        checks = np.bincount(cells[0], weights = counts, minlength = len(self.monitors))
+        for monitor, count in zip(self.monitors, checks.tolist()):
+            monitor.checks += int(count)
+
+        known_indexes = np.flatnonzero(known)
+        for i in known_indexes[violated].tolist():
+            row = int(rows[i])
+            self.check_delta(row, int(variable_ids[i]), values[i], conflicts[row])
+        return conflicts
+
+    def check_delta(self, row: int, variable_id: int, value, conflicts: list[pp.LinkConflict]) -> int:
+        # Checks one state change against the active links of its variable, adding any conflicts to conflicts.
+        # Returns the number of links checked.
+        variable = self.symbol_table.variables[variable_id]
+        links = self.monitors[row].active_links.variable_active_links(variable)
+        for link in links:
+            lm.CausalLinkMonitor.check_link_against_variable_assignment(link, variable, value, True, conflicts)
+        return len(links)
@@ -1,5 +1,7 @@
 import model.actions.action as am
 import planexecutive.stateestimator.currentstate as cs
+import planexecutive.executioncontext as ec
+import planexecutive.events as ev
 import model.plans.partialorderplan as pp
 
 # Causal Link Monitor:
@@ -8,40 +10,53 @@ class CausalLinkMonitor:
     # Monitors the (causal) links of a plan as state is observed over time.
     # Current state starts with start_assignments.
 
-    def __init__(self, total_order_plan, trace = True):
+    def __init__(self, total_order_plan, trace = True, context: ec.ExecutionContext = None):
+        # context is the state of the execution being monitored; a new execution if None.
         self.trace = trace  # Should we trace monitoring?
-        p = total_order_plan.partial_order_plan
-        self.links = p.links # All links to be monitored.
-        self.active_links = [] # No active links until start action dispatched.
+        self.plan = total_order_plan.compiled_plan
+        self.links = self.plan.links # All links to be monitored.
+        if context is None:
+            context = ec.ExecutionContext(self.plan, self.trace)
+        self.context = context
+        self.events = context.events  # Monitoring events, printed if trace (see events).
+        ev.trace_events(self.events, trace)
+        self.active_links = context.active_links # No active links until start action dispatched (see activelinks).
 
         # Encode the current_state as a mutable object.
-        self.current_state = cs.CurrentState([],self.trace)
+        self.current_state: cs.CurrentState = context.current_state
 
-    # Check a state change against all active links.
+        # Number of checks of a link against a state change or the current state, for throughput statistics.
+        self.checks = 0
+
+    # Check a state change against the active links.
 
     def check_state_change(self, changed_assignments: dict, successp: bool, conflicts: list[pp.LinkConflict]):
         # Checks if any assignment in changed_assignments
         # violates one of the active links.
+        # Only the active links of each changed variable are checked.
+        # See batchmonitor to check the changes of many executions at once.
 
-        if self.active_links == list():
-            if self.trace:
-                print(f'         No past active links to check.')
-
-        else:
-            if self.trace:
-                print(f'         Checking past active links')
+        events = self.events
+        if events.sinks:
+            events.emit(ev.Event(ev.STATE_CHANGE_CHECKED, self, None, len(self.active_links)))
 
+        if self.active_links:
             for variable, value in changed_assignments.items():
 
-                # Check changed variable assignment against all active links.
-                for link in self.active_links:
+                # Check changed variable assignment against the active links of variable.
+                links = self.active_links.variable_active_links(variable)
+                self.checks += len(links)
+                for link in links:
+                    count = len(conflicts)
                     successp, conflicts = self.check_link_against_variable_assignment(link, variable, value, successp, conflicts)
 
-                    if self.trace:
-                        if successp:
-                            print(f'            Satisfies link {link}.')
-                        else:
-                            print(f'            Violates link {link}.')
+                    if events.sinks:
+                        kind = ev.LINK_SATISFIED if len(conflicts) == count else ev.LINK_VIOLATED
+                        events.emit(ev.Event(kind, self, link, "change"))
+
+        # Record the changes in the current state, against which the links the action produces are checked.
+        if changed_assignments:
+            self.current_state.update_state(changed_assignments)
 
         return successp, conflicts
 
@@ -53,22 +68,10 @@ class CausalLinkMonitor:
         # Monitor removes the active causal links that action consumes.
 
         # Deactivates active links that action consumes.
-        rlks = []
-        for link in self.active_links:
-            if action == link.consumer:
-                # print(f'      {action} consumes link {link}.')
-                rlks.append(link)
-            # else:
-            #    print(f'      {action} does not consume link {link}.')
-
-        if self.trace:
-            if rlks == list():
-                print(f'      No links consumed.')
-            else:
-                print(f'      Links consumed:')
-                for rlk in rlks:
-                    self.active_links.remove(rlk)
-                    print(f'         {rlk}.')
+        rlks = self.active_links.remove_consumed(action)
+
+        if self.events.sinks:
+            self.events.emit(ev.Event(ev.LINKS_CONSUMED, self, action, rlks))
 
     # Update monitor for completed action.
     # - Enable links produced by action.
@@ -83,34 +86,24 @@ class CausalLinkMonitor:
         # - State was observed and updated since action produced its effects.
 
         # Activate each link that action produces.
-        slinks = action.successor_links
-        if slinks == list():
-            if self.trace:
-                print(f'      Action activates no links.')
-        else:
-            if self.trace:
-                print(f'      Action activates links:')
-                for slink in slinks:
-                    print(f'         {slink}:')
-                print(f'      Check new links against state:')
-
-            # Check each link produced against the current state.
-            for link in slinks:
-                self.active_links.append(link)
-                successp, conflicts = self.check_link_against_state(link, successp, conflicts)
-
-                if self.trace:
-                    if successp:
-                        print(f'         State satisfies link {link}.')
-                    else:
-                        print(f'         State violates link {link}.')
-
-        if self.active_links == list():
-            print(f'      No links currently active.')
-        else:
-            print(f'      Current active links:')
-            for link in self.active_links:
-                 print(f'         {link}')
+        events = self.events
+        slinks = self.plan.produced_links(action.location)
+        if events.sinks:
+            events.emit(ev.Event(ev.LINKS_ACTIVATED, self, action, slinks))
+
+        # Check each link produced against the current state.
+        self.checks += len(slinks)
+        for link in slinks:
+            self.active_links.add(link)
+            count = len(conflicts)
+            successp, conflicts = self.check_link_against_state(link, successp, conflicts)
+
+            if events.sinks:
+                kind = ev.LINK_SATISFIED if len(conflicts) == count else ev.LINK_VIOLATED
+                events.emit(ev.Event(kind, self, link, "state"))
+
+        if events.sinks:
+            events.emit(ev.Event(ev.ACTIVE_LINKS, self, None, list(self.active_links)))
 
         return successp, conflicts
 
@@ -0,0 +1,120 @@
+import asyncio
+import typing
+import model.states.state as st
+import model.actions.action as at
+import planexecutive.robot.bot as bot
+import planexecutive.events as ev
+
+# Asynchronous (ro)Bots, for dispatching actions concurrently (see asyncdispatcher).
+
+# An agent asks an asynchronous bot to
+#	- choose enabled actions to start, up to a number of actions,
+#	- perform an action, returning only when the action is completed, while other actions are performed, and
+#	- observe state and report the values changed since the last observation.
+# The state is observed immediately after each action completes,
+# so that each observation reports the effects of the action just completed.
+
+class AsyncBot:
+
+    # API for a "physical" agent that performs actions concurrently.
+    # Subclasses override execute_action and observe_state_change.
+    # The default bot completes each action immediately and observes no changes.
+
+    def __init__(self, name: str, trace = True) -> None:
+        self.name = name
+
+        # If True,
+        # will print trace messages related to bot actions.
+        self.trace = trace
+
+        # Bot events, reported with the events of the bot's execution once it is dispatched (see events).
+        self.events = ev.EventStream()
+        ev.trace_events(self.events, trace)
+
+    def __str__(self):
+        return f"async bot {self.name}"
+
+    # Select enabled actions:
+    def select_enabled_actions(self, enabled_actions: typing.Collection[at.Action], count: int) -> list[at.Action]:
+        # Select and return up to count of enabled_actions to start, in the order they were enabled.
+        # Returns an empty list if no action should be started now.
+        selected = []
+        for action in enabled_actions:
+            if len(selected) == count:
+                break
+            selected.append(action)
+        return selected
+
+    # Execute action:
+    async def execute_action(self, action: at.Action):
+        # Perform action, returning when action is completed.
+        if self.events.sinks:
+            self.events.emit(ev.Event(ev.ACTION_DISPATCHED, self, action))
+        await asyncio.sleep(0)
+
+    # Observe state:
+    async def observe_state_change(self, current_state: st.State) -> dict:
+        # Read the new state.
+        # Return changed_assignments relative to current_state.
+        return dict()
+
+
+class AsyncBotAdapter(AsyncBot):
+
+    # Adapts a synchronous Bot to the asynchronous API.
+
+    # The bot performs one action at a time: an action is selected only once the previous action's completion,
+    # and the check of its observed state change, have been handled by the dispatcher.
+    # If the bot has a loaded execution scenario, actions are started in the order of the scenario's stages,
+    # each completing with the state change of its stage.  The stages record a sequential execution,
+    # so the action of a stage is not started before the preceding stage's state change is checked:
+    # a change that clobbers a link consumed by a later action is checked while that link is active.
+    # Otherwise, the user is asked for action completion and observations in a worker thread,
+    # so that other executions proceed.
+
+    def __init__(self, sync_bot: bot.Bot, trace = None) -> None:
+        AsyncBot.__init__(self, sync_bot.name, sync_bot.trace if trace is None else trace)
+        self.bot = sync_bot
+        self.events = sync_bot.events
+        ev.trace_events(self.events, self.trace)
+        self.busyp = False  # True while an action is performed and observed.
+
+    def select_enabled_actions(self, enabled_actions: typing.Collection[at.Action], count: int) -> list[at.Action]:
+        # Select and return one of enabled_actions to start, unless an action is being performed.
+        # The dispatcher selects actions only after handling the completions of the actions that ended,
+        # so the previous action's completion has been checked once busyp is False.
+        if self.busyp:
+            return []
+        if self.bot.execution_scenario:
+            # Start the action of the next stage, if it is enabled.
+            action = self.bot.script_select_enabled_action(enabled_actions)
+            if action is not None and self.events.sinks:
+                self.events.emit(ev.Event(ev.ACTION_SELECTED, self, action))
+        else:
+            action = self.bot.select_enabled_action(enabled_actions)
+        if action is None:
+            return []
+        self.busyp = True
+        return [action]
+
+    async def execute_action(self, action: at.Action):
+        # Perform action, returning when action is completed.
+        if self.bot.ask_user_for_action_completionp:
+            await asyncio.to_thread(input, f"{self.bot}: Perform {action.operator} and hit return.")
+        elif self.events.sinks:
+            self.events.emit(ev.Event(ev.ACTION_DISPATCHED, self, action))
+
+    async def observe_state_change(self, current_state: st.State) -> dict:
+        # Read the new state, from the loaded execution scenario, or else from the user.
+        # Return changed_assignments relative to current_state.
+        if self.bot.execution_scenario:
+            # Reads the stage of the action just completed.
+            changes = self.bot.script_observe_state_change()
+        else:
+            changes = await asyncio.to_thread(self.bot.user_observe_state_change, current_state)
+        self.busyp = False
+
+        if self.events.sinks:
+            self.events.emit(ev.Event(ev.STATE_OBSERVED, self, None, changes))
+
+        return changes
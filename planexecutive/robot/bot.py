@@ -1,9 +1,11 @@
+import typing
 import utils.utils as ut
 import model.states.state as st
 import model.actions.action as at
 import planexecutive.executionscenario as es
 import planexecutive.monitor.planmonitor as lm
 import model.plans.partialorderplan as pp
+import planexecutive.events as ev
 
 # A physical (ro)Bot that mediates between the environment
 # and agent (a homunculus).
@@ -38,7 +40,12 @@ class Bot:
         # will print trace messages related to bot actions.
         self.trace = trace
 
+        # Bot events are reported with the events of the monitor's execution (see events).
+        self.events = monitor.events
+        ev.trace_events(self.events, trace)
+
         self.execution_scenario = None
+        self.stage_reader: es.StageReader or None = None  # Reads the stages of the loaded scenario.
         self.index = 0
 
     def __str__(self):
@@ -47,6 +54,7 @@ class Bot:
     def load_scenario(self, execution_scenario: es.ExecutionScenario):
         # Load a scenario object into bot to be executed.
         self.execution_scenario = execution_scenario
+        self.stage_reader = execution_scenario.stage_reader()
         self.index = 0
 
     # Observe state:
@@ -58,15 +66,17 @@ class Bot:
         else:
             changes = self.user_observe_state_change(current_state)
 
-        if self.trace:
-            print(f'      Observes {changes}.')
+        if self.events.sinks:
+            self.events.emit(ev.Event(ev.STATE_OBSERVED, self, None, changes))
 
         return changes
 
     def script_observe_state_change(self) -> dict:
         # Extract the next observed state from the loaded execution scenario.
-        current_stage = self.execution_scenario.encoded_stages[self.index]
+        # Stages before the next are released, so that memory doesn't grow with the length of the scenario.
+        current_stage = self.stage_reader.stage(self.index)
         self.index = self.index +1
+        self.stage_reader.release(self.index)
         return current_stage.state_change
 
     @staticmethod
@@ -86,12 +96,13 @@ class Bot:
         return state_change
 
     # Select an enabled action:
-    def select_enabled_action(self, enabled_actions: list[at.Action])-> at.Action or None:
+    def select_enabled_action(self, enabled_actions: typing.Collection[at.Action])-> at.Action or None:
         # Select and return an enabled action, returning None if no enabled action.
-        if enabled_actions == list():
+        # enabled_actions is any collection of actions, in the order they were enabled.
+        if not enabled_actions:
 
-            if self.trace:
-                print("      No action selected.")
+            if self.events.sinks:
+                self.events.emit(ev.Event(ev.NO_ACTION_SELECTED, self))
 
             return None
         elif self.execution_scenario:
@@ -100,17 +111,19 @@ class Bot:
             sa = self.user_select_enabled_action(enabled_actions)
         else:
             # Returns first enabled action on the list.
-            sa = enabled_actions[0]
+            sa = next(iter(enabled_actions))
 
-        if self.trace:
-            print(f'      Selects action {sa}.')
+        if self.events.sinks:
+            self.events.emit(ev.Event(ev.ACTION_SELECTED, self, sa))
 
         return sa
 
     def script_select_enabled_action(self, enabled_actions):
         # Returns action in enabled_actions whose operator is
         # specified by the current stage of bot's execution script.
-        current_stage = self.execution_scenario.encoded_stages[self.index]
+        current_stage = self.stage_reader.stage(self.index)
+        if current_stage is None:
+            return None
         selected = current_stage.action_name
         for action in enabled_actions:
             if action.operator == selected:
@@ -118,8 +131,9 @@ class Bot:
         return None
 
     @staticmethod
-    def user_select_enabled_action(enabled_actions: list[at.Action])-> at.Action or None:
+    def user_select_enabled_action(enabled_actions: typing.Collection[at.Action])-> at.Action or None:
         # Ask user to select an enabled action, returning None if no enabled action.
+        enabled_actions = list(enabled_actions)
         while True:
             max_i: int = len(enabled_actions) - 1
             i: int = 0
@@ -142,8 +156,8 @@ class Bot:
         # ToDo Document returned values in this and similar methods.
         if self.ask_user_for_action_completionp:
             input(f"{self }: Perform {action.operator} and hit return.")
-        else:
-            print(f"      Dispatches {action.operator}.")
+        elif self.events.sinks:
+            self.events.emit(ev.Event(ev.ACTION_DISPATCHED, self, action))
 
         # Observe state changes after the action completes.
         changes = self.observe_state_change(self.monitor.current_state)
@@ -0,0 +1,117 @@
+import json
+import threading
+import typing
+import model.actions.action as am
+import model.plans.partialorderplan as pp
+import planexecutive.events as ev
+
+# Scenario output:
+
+# Writes the output of an execution in the scenario output format (see planlibrary),
+# its partial order plan followed by its monitored execution, as the execution proceeds.
+# A scenario output writer is an event sink (see events): the partial order plan is written when the execution starts,
+# and each stage of the monitored execution when its action ends, so that the output can be read while the plan
+# is dispatched, and the writer holds no more than the stages of the actions running.
+# The monitored execution begins with the state change of the start action, as {"start": <assignments>};
+# a stage whose action produced conflicts also has "conflicts", each the variable, expected and observed values.
+
+# In json lines mode, each part of the output is written as a json object on a line of its own:
+# the partial order plan, as {"partial_plan": ...}, then each stage of the monitored execution.
+# If the writer has a name, every line has it as "scenario", so that many executions can be written to one file.
+# The writers of one file share a lock, held while each writes, since executions whose events arrive
+# in different threads (see fleetexecutive) write to the file at once.
+
+class ScenarioOutputWriter(ev.StageSink):
+
+    def __init__(self, file: typing.TextIO, partial_order_plan: pp.PartialOrderPlan, json_lines = False, name: str = None,
+                 lock: threading.Lock = None):
+        # file is a text file open for writing, which the writer doesn't close.
+        # lock is shared by the writers of file, by default a lock of the writer's own.
+        super().__init__()
+        self.file = file
+        self.lock = threading.Lock() if lock is None else lock
+        self.partial_order_plan = partial_order_plan
+        self.json_lines = json_lines
+        self.name = name
+        self.stages = 0  # Stages written.
+        self.endedp = False
+
+    def __str__(self):
+        return f"Scenario output writer of {self.stages} stages"
+
+    def start(self, event: ev.Event):
+        plan = partial_plan2dict(self.partial_order_plan)
+        if self.json_lines:
+            self.write_line({"partial_plan": plan})
+        else:
+            self.write('{"partial_plan": ' + json.dumps(plan) + ',\n "monitored_execution": [')
+
+    def stage(self, event: ev.Event, delta: dict, activated: list[pp.CausalLink], deactivated: list[pp.CausalLink]):
+        if self.endedp:
+            return
+        action: am.Action = event.subject
+        if action.location == self.partial_order_plan.start_action.location:
+            stage = {"start": delta}
+        else:
+            stage = {"action": action.operator,
+                     "activated_conditions": links2assignments(activated),
+                     "deactivated-conditions": links2assignments(deactivated),
+                     "state-change": delta}
+        if event.kind != ev.ACTION_SUCCEEDED:
+            stage["conflicts"] = [conflict2dict(conflict) for conflict in event.data]
+
+        if self.json_lines:
+            self.write_line(stage)
+        else:
+            self.write((",\n  " if self.stages else "\n  ") + json.dumps(stage))
+        self.stages += 1
+
+        if event.kind != ev.ACTION_SUCCEEDED:
+            self.end(event)  # The execution ends at its first conflict.
+
+    def end(self, event: ev.Event):
+        if self.endedp:
+            return
+        self.endedp = True
+        with self.lock:
+            if not self.json_lines:
+                self.file.write("\n ]}\n")
+            self.file.flush()
+
+    def write_line(self, record: dict):
+        if self.name is not None:
+            record = {"scenario": self.name, **record}
+        self.write(json.dumps(record) + "\n")
+
+    def write(self, text: str):
+        # Writes text to the file, while no other writer of the file writes.
+        with self.lock:
+            self.file.write(text)
+
+
+def partial_plan2dict(partial_order_plan: pp.PartialOrderPlan) -> dict:
+    # Returns the partial order plan of the scenario output format.
+    return {"actions": [{"name": action.operator,
+                         "precondition": assignments2dict(action.preconditions),
+                         "effect": assignments2dict(action.effects)}
+                        for action in partial_order_plan.actions],
+            "links": [{"condition": {link.condition.variable: link.condition.value},
+                       "producer": link.producer.operator if link.producer is not None else None,
+                       "consumer": link.consumer.operator}
+                      for link in partial_order_plan.links],
+            "orderings": [{"predecessor": ordering.predecessor.operator, "successor": ordering.successor.operator}
+                          for ordering in partial_order_plan.orderings]}
+
+def assignments2dict(assignments) -> dict:
+    # Returns the dictionary description of a set of assignments, as plans and scenarios describe them.
+    return {assignment.variable: assignment.value for assignment in assignments}
+
+def links2assignments(links: list[pp.CausalLink]) -> dict:
+    # Returns the conditions of links, as assignments.
+    return {link.condition.variable: link.condition.value for link in links}
+
+def conflict2dict(conflict: pp.LinkConflict) -> dict:
+    # Returns a conflict as the scenario output and scenario results describe it.
+    condition = conflict.link.condition
+    return {"link": str(conflict.link), "variable": condition.variable, "expected": condition.value,
+            "observed": conflict.observed_value}
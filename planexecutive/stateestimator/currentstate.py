@@ -1,17 +1,66 @@
+from array import array
+import utils.utils as ut
 import model.states.state as st
 import model.states.assignment as asn
+import model.states.symboltable as sym
+import planexecutive.events as ev
+
+# Current state:
+
+# The state of an execution, as it is observed over time.
+# Values are kept in an array indexed by the ids of the variables interned by a symbol table,
+# each entry the id of the variable's value, or -1 if the variable is not assigned,
+# so that an observed change is recorded without allocating an assignment.
+# Every change is appended to a delta log of variable ids, value ids and the value ids they replace.
+# A snapshot shares the array of values with the current state until the current state next changes,
+# when the current state copies it (copy on write), so that a snapshot costs nothing until then.
+# Observed changes are looked up in the symbol table without interning them, since the table is shared by the process:
+# a variable or value that no plan or scenario has, such as telemetry, is kept in the current state's unknown_values,
+# and its variable, if known, is logged as unassigned (-1).
 
 class CurrentState(st.State):
 
-    def __init__(self, assignments: list[asn.Assignment], trace = True):
+    def __init__(self, assignments: list[asn.Assignment], trace = True, events: ev.EventStream = None,
+                 symbol_table: sym.SymbolTable = sym.symbols):
+        # Updates are reported to events, by default a stream of the current state's own.
         self.trace = trace
-        st.State.__init__(self, assignments)
+        self.events = ev.EventStream() if events is None else events
+        ev.trace_events(self.events, trace)
+        self.symbol_table = symbol_table
+
+        self.values = array('l')  # Value id of each variable id, -1 if not assigned.
+        self.sharedp = False  # True if values is shared with a snapshot.
+        self.unknown_values = dict()  # Maps each variable whose variable or value the table doesn't know to its value.
+
+        # Delta log: the variable, value and previous value ids of each change, in order.
+        self.log_variables = array('l')
+        self.log_values = array('l')
+        self.log_previous = array('l')
+
+        for assignment in assignments:
+            self.assign_value(assignment.variable, assignment.value)
+
+    def __str__(self):
+        return ut.list2string(list(self.assignments.values()))
+
+    @property
+    def assignments(self) -> dict[str, asn.Assignment]:
+        # The assignments of the state, as a dictionary from each variable assigned to its assignment.
+        return values_assignments(self.values, self.symbol_table, self.unknown_values)
+
+    def value(self, variable: str):
+        # Given a variable of state self,
+        # returns the value that variable is assigned to.
+        return variable_value(self.values, self.symbol_table, variable, self.unknown_values)
+
+    def assign_value(self, variable, value):
+        self.record_changes({variable: value})
 
     #  Update the record of the current state
 
     def current_value(self, variable: str):
-        # Returns the assignment to variable in the current state.
-        self.value(variable)
+        # Returns the value of variable in the current state.
+        return self.value(variable)
 
     def assign_current_value(self, variable: str, value: str):
         # Updates the assignment to variable in the current state to be value.
@@ -21,9 +70,124 @@ class CurrentState(st.State):
         # Updates the current state with changed_assignments.
         # changed_assignments is a set of variable assignments.
         # Called for effect.
-        if self.trace:
-            print(f'         Updating state:')
+        if self.events.sinks:
+            self.events.emit(ev.Event(ev.STATE_UPDATED, self, None, changed_assignments))
+        self.record_changes(changed_assignments)
+
+    def record_changes(self, changed_assignments: dict):
+        # Records changed_assignments, without interning their variables and values (see unknown_values).
+        table = self.symbol_table
+        table_variable_ids = table.variable_ids
+        table_value_ids = table.value_ids
+        unknown_values = self.unknown_values
+        variable_ids = []
+        value_ids = []
         for variable, value in changed_assignments.items():
-            if self.trace:
-                print(f'           {variable} = {value}')
-            self.assign_current_value(variable, value)
\ No newline at end of file
+            variable_id = table_variable_ids.get(variable)
+            value_id = -1 if variable_id is None else table_value_ids.get(value, -1)
+            if value_id < 0:
+                unknown_values[variable] = value
+            elif unknown_values:
+                unknown_values.pop(variable, None)
+            if variable_id is not None:
+                variable_ids.append(variable_id)
+                value_ids.append(value_id)
+        self.apply_delta(variable_ids, value_ids)
+
+    def apply_delta(self, variable_ids, value_ids):
+        # Assigns value_ids[i] to variable_ids[i], for each i, and appends the changes to the delta log.
+        # The arguments are sequences of ids of equal length.
+        values = self.values
+        if self.sharedp:
+            values = self.values = array('l', values)
+            self.sharedp = False
+        if variable_ids:
+            missing = max(variable_ids) + 1 - len(values)
+            if missing > 0:
+                values.extend([-1] * missing)
+        log_previous = self.log_previous
+        for variable_id, value_id in zip(variable_ids, value_ids):
+            log_previous.append(values[variable_id])
+            values[variable_id] = value_id
+        self.log_variables.extend(variable_ids)
+        self.log_values.extend(value_ids)
+
+    def log_length(self) -> int:
+        # Returns the number of changes in the delta log.
+        return len(self.log_variables)
+
+    def deltas(self, start: int = 0):
+        # Iterates over the changes of the delta log from position start,
+        # each the ids of the variable, its new value, and the value it replaced (-1 if none).
+        return zip(self.log_variables[start:], self.log_values[start:], self.log_previous[start:])
+
+    def snapshot(self) -> "StateSnapshot":
+        # Returns a read only copy of the current state, for a checkpoint.
+        self.sharedp = True
+        return StateSnapshot(self.values, self.log_length(), self.symbol_table, dict(self.unknown_values))
+
+    def restore(self, snapshot: "StateSnapshot"):
+        # Returns the current state to the values of snapshot, appending the changes to the delta log.
+        variable_ids = []
+        value_ids = []
+        values = self.values
+        for variable_id in range(max(len(values), len(snapshot.values))):
+            value_id = snapshot.values[variable_id] if variable_id < len(snapshot.values) else -1
+            if (values[variable_id] if variable_id < len(values) else -1) != value_id:
+                variable_ids.append(variable_id)
+                value_ids.append(value_id)
+        self.apply_delta(variable_ids, value_ids)
+        self.unknown_values = dict(snapshot.unknown_values)
+
+
+class StateSnapshot(st.State):
+    # A read only copy of a current state, taken when its delta log had log_length changes.
+
+    def __init__(self, values: array, log_length: int, symbol_table: sym.SymbolTable, unknown_values: dict):
+        self.values = values  # Shared with the current state until it changes.
+        self.log_length = log_length
+        self.symbol_table = symbol_table
+        self.unknown_values = unknown_values
+
+    def __str__(self):
+        return ut.list2string(list(self.assignments.values()))
+
+    @property
+    def assignments(self) -> dict[str, asn.Assignment]:
+        return values_assignments(self.values, self.symbol_table, self.unknown_values)
+
+    def value(self, variable: str):
+        return variable_value(self.values, self.symbol_table, variable, self.unknown_values)
+
+    def assign_value(self, variable, value):
+        print(f"Can't assign {variable} = {value} in a snapshot, which is read only.")
+
+
+def variable_value(values: array, symbol_table: sym.SymbolTable, variable: str, unknown_values: dict):
+    # Returns the value of variable in values or unknown_values, or None if it is not assigned.
+    if unknown_values and variable in unknown_values:
+        return unknown_values[variable]
+    variable_id = symbol_table.variable_ids.get(variable)
+    if variable_id is None or variable_id >= len(values):
+        return None
+    value_id = values[variable_id]
+    return None if value_id < 0 else symbol_table.values[value_id]
+
+def values_assignments(values: array, symbol_table: sym.SymbolTable, unknown_values: dict) -> dict[str, asn.Assignment]:
+    # Returns the assignments of values, in the order of the variable ids, followed by those of unknown_values.
+    # Assignments are the shared ones of symbol_table where it has them; others are made, not interned.
+    variables = symbol_table.variables
+    table_values = symbol_table.values
+    shared = symbol_table.assignments
+    assignments = dict()
+    for variable_id, value_id in enumerate(values):
+        if value_id >= 0:
+            variable = variables[variable_id]
+            value = table_values[value_id]
+            assignment = shared.get((variable, value))
+            if assignment is None:
+                assignment = asn.Assignment(variable, value, variable_id, value_id)
+            assignments[variable] = assignment
+    for variable, value in unknown_values.items():
+        assignments[variable] = asn.Assignment(variable, value)
+    return assignments
@@ -1,10 +1,20 @@
+import functools
 import json
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-import model.states.assignment as asn
+import model.states.symboltable as sym
 import model.actions.action as at
 import model.plans.totalorderplan as tp
+import plancompiler.plancache as pc
 import planexecutive.executionscenario as es
-import planexecutive.dispatcher.plandispatcher as pd
+import planexecutive.fleetexecutive as fe
+import planexecutive.executionhistory as eh
+import planexecutive.scenariooutput as so
+import planbinary as pb
+import planexecutive.events as ev
 
 # The plan library reads total order plan and execution scenario descriptions,
 # creates corresponding TotalOrderPlan and ExecutionScenario objects,
@@ -44,6 +54,17 @@ import planexecutive.dispatcher.plandispatcher as pd
 
 #           Note: if [], then execution supplied by user.
 
+# Scenario Lines Format:
+
+# A scenario in a file whose name ends in .jsonl is read as it is dispatched, a stage at a time,
+# so that scenarios of any length are dispatched in constant memory (see StreamingExecutionScenario).
+# Its first line is the scenario without its stages, and each following line is a stage:
+
+#  <scenario_lines> ::= “{“ “scenario_name” “:” <string_name> “,”
+#                           “plan_name” “:” <string_name> “,”
+#                           “start” “:” <assignments> "}" <newline>
+#                       (<stage> <newline>)*
+
 
 # Scenario Output Format:
 
@@ -75,6 +96,11 @@ import planexecutive.dispatcher.plandispatcher as pd
 #                                    “state-change” : <assignments> "}")*
 #                           "]"
 
+# Binary Plan and Scenario Format:
+
+# A plan or scenario file whose name ends in .bin is in the binary format of planbinary,
+# which json2binary converts json plan and scenario files to.
+
 # Example Scenario Input 1:
 
 #      """{
@@ -154,9 +180,17 @@ import planexecutive.dispatcher.plandispatcher as pd
 # ***  Scenarios ***
 
 class PlanLibrary:
-    def __init__(self, scenario_directory_name = "", trace = True):
+    def __init__(self, scenario_directory_name = "", trace = True, plan_cache: pc.CompiledPlanCache = None,
+                 backend: str = "python", lazy = False, max_actions: int = None):
        # Set the directory containing scenarios.
        # If no directory specified, default to the current working directory.
+       # If plan_cache is given, compiled plans are restored from and saved to the cache.
+       # backend selects the compiler implementation ("python" or "numpy").
+       # If lazy, the scenario directory is indexed (see index_directory),
+       # and its plans and scenarios are read when they are first retrieved.
+       # If max_actions is given, the plans read from the directory that the library holds have at most
+       # max_actions actions in all, a bound on their memory, since a compiled plan's size grows with its actions.
+       # The least recently retrieved are evicted, and read again if retrieved again.
         if scenario_directory_name == "":
             self.scenario_directory_name = Path.cwd()
         else:
@@ -164,22 +198,42 @@ class PlanLibrary:
 
         self.scenario_directory = Path(self.scenario_directory_name)
 
-        print(f"Will look for scenarios in directory {self.scenario_directory}.")
-
+        # Library events, printed if trace (see events).
         self.trace = trace
+        self.events = ev.EventStream()
+        ev.trace_events(self.events, trace)
+        if self.events.sinks:
+            self.events.emit(ev.Event(ev.LIBRARY_OPENED, self, self.scenario_directory))
+
+        self.plan_cache = plan_cache
+        self.backend = backend
 
         # Libraries of plan compilation and execution scenarios that have been read in.
+        # Plans are kept in the order they were last retrieved, least recently first.
         self.plan_library = dict()
         self.scenario_library = dict()
+        self.max_actions = max_actions
+        self.evictable_actions = 0  # Actions of the plans in the library that can be read again.
+
+        # Paths of the plan and scenario files in the scenario directory, relative to it, by plan or scenario name.
+        self.plan_paths: dict[str, str] = dict()
+        self.scenario_paths: dict[str, str] = dict()
+        if lazy:
+            self.index_directory()
 
     # Read plans into Library
 
     def readplan(self, plan_relative_path : str) -> tp.TotalOrderPlan:
         # Creates a python plan object and registers in plan library.
         # relative_path_for_plan points to a file containing a json plan description.
+        # A file in the binary format is memory mapped rather than parsed.
         fn = self.scenario_directory / plan_relative_path
 
         if fn.exists():
+            if fn.suffix == ".bin":
+                plan = pb.load_binary_plan(fn, self.plan_cache, self.backend)
+                self.register_plan(plan.name, plan)
+                return plan
             with open(fn, "rt") as file:
                 json_plan = file.read()
                 return self.json2plan(json_plan)
@@ -195,17 +249,152 @@ class PlanLibrary:
     def dict2plan (self, dict_plan) -> tp.TotalOrderPlan:
         # Converts a dictionary description of a total order plan,
         # dict_plan, to a python total order plan object.
-        plan_name, plan = dict2total_order_plan(dict_plan)
+        plan_name, plan = dict2total_order_plan(dict_plan, self.plan_cache, self.backend)
+        self.register_plan(plan_name, plan)
+        return plan
 
+    def register_plan(self, plan_name: str, plan: tp.TotalOrderPlan):
         # Register plan in DispatcherIO's plan library.
+        replaced = self.plan_library.pop(plan_name, None)
+        if replaced is not None and plan_name in self.plan_paths:
+            self.evictable_actions -= len(replaced.encoded_sequence)
         self.plan_library[plan_name] = plan
-        if self.trace:
-            print(f"Adding plan {plan_name} to library as {plan}.")
-        return plan
+        if plan_name in self.plan_paths:
+            self.evictable_actions += len(plan.encoded_sequence)
+        if self.events.sinks:
+            self.events.emit(ev.Event(ev.PLAN_ADDED, self, plan_name, plan))
+        if self.max_actions is not None and self.evictable_actions > self.max_actions:
+            self.evict_plans()
+
+    def evict_plans(self):
+        # Removes the least recently retrieved plans that can be read again from the scenario directory,
+        # until those left have at most max_actions actions.  The most recently retrieved plan is kept,
+        # even if it alone has more.
+        evicted = []
+        actions = self.evictable_actions
+        recent = next(reversed(self.plan_library), None)
+        for plan_name, plan in self.plan_library.items():
+            if actions <= self.max_actions:
+                break
+            if plan_name in self.plan_paths and plan_name != recent:
+                evicted.append(plan_name)
+                actions -= len(plan.encoded_sequence)
+        for plan_name in evicted:
+            del self.plan_library[plan_name]
+        self.evictable_actions = actions
+
+    def load_directory(self, pattern: str = "*_plan.txt", jobs: int = None) -> tuple[list[tp.TotalOrderPlan], list[tuple[str, str]]]:
+        # Reads and compiles every plan file in the scenario directory whose name matches pattern,
+        # and registers the plans in the library.
+        # Files are compiled by jobs worker processes, by default one per core;
+        # if jobs is 1, files are compiled in this process.
+        # A file that fails to load is reported, and doesn't stop the other files from loading.
+        # Returns the plans loaded and, for each file that failed, its name and the error.
+        paths = sorted(str(path) for path in self.scenario_directory.glob(pattern))
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+
+        if self.plan_cache is None:
+            cache_arguments = None
+        else:
+            cache_arguments = (str(self.plan_cache.directory), self.plan_cache.max_entries)
+
+        if jobs <= 1 or len(paths) <= 1:
+            init_plan_worker(cache_arguments, self.backend)
+            results = map(compile_plan_file, paths)
+            return self.register_compiled_plans(results)
+        else:
+            chunk_size = max(1, len(paths) // (4 * jobs))
+            with ProcessPoolExecutor(jobs, initializer = init_plan_worker,
+                                     initargs = (cache_arguments, self.backend)) as executor:
+                results = executor.map(compile_plan_file, paths, chunksize = chunk_size)
+                return self.register_compiled_plans(results)
+
+    def register_compiled_plans(self, results) -> tuple[list[tp.TotalOrderPlan], list[tuple[str, str]]]:
+        # Registers the plans compiled by compile_plan_file,
+        # restoring each plan from its compiled record rather than compiling it again.
+        # Returns the plans registered, and the names and errors of the files that failed.
+        plans = []
+        failures = []
+        for path, dict_plan, entry, error in results:
+            if error is None:
+                plan_name, plan = dict2total_order_plan(dict_plan, pc.CompiledPlanRecord(entry))
+                self.register_plan(plan_name, plan)
+                plans.append(plan)
+            else:
+                print(f"Can't load plan file {path}: {error}")
+                failures.append((path, error))
+
+        if self.events.sinks:
+            self.events.emit(ev.Event(ev.PLANS_LOADED, self, self.scenario_directory, (len(plans), len(failures))))
+        return plans, failures
 
     def get_plan (self, plan_name: str) -> tp.TotalOrderPlan or None:
-        # Retrieves plan from the library.
-        return  self.plan_library.get(plan_name)
+        # Retrieves plan from the library, reading it from the scenario directory if it is indexed and not yet read.
+        plan = self.plan_library.pop(plan_name, None)
+        if plan is not None:
+            self.plan_library[plan_name] = plan  # Most recently retrieved.
+            return plan
+        path = self.plan_paths.get(plan_name)
+        if path is not None:
+            return self.readplan(path)
+        return None
+
+    # Index the scenario directory
+
+    def index_directory(self, plan_patterns: tuple = ("*_plan.txt", "*_plan.bin"),
+                        scenario_patterns: tuple = ("*_scenario.txt", "*_scenario.jsonl", "*_scenario.bin")) -> list[tuple[str, str, str]]:
+        # Records the name of the plan or scenario in each file of the scenario directory that matches
+        # one of plan_patterns or scenario_patterns, so that get_plan and get_scenario read them when first retrieved.
+        # The index is kept in the scenario directory (see INDEX_FILE), with the modification time and size of each file,
+        # so that only files that are new or changed since the directory was last indexed are read.
+        # Files are indexed in the order of the patterns, then of their names.  A file whose plan or scenario
+        # has the name of one already indexed is reported, and not indexed.
+        # Returns, for each such file, its name, the name of the file indexed, and the plan or scenario name.
+        index_path = self.scenario_directory / INDEX_FILE
+        old_entries = read_library_index(index_path)
+        entries = dict()
+        read = 0
+        plan_paths = dict()
+        scenario_paths = dict()
+        duplicates = []
+        patterns = [("plan", pattern) for pattern in plan_patterns] + [("scenario", pattern) for pattern in scenario_patterns]
+        for kind, pattern in patterns:
+            for path in sorted(self.scenario_directory.glob(pattern)):
+                relative_path = path.name
+                stat = path.stat()
+                entry = old_entries.get(relative_path)
+                if entry is None or entry[:3] != [kind, stat.st_mtime_ns, stat.st_size]:
+                    name = file_library_name(path, kind)
+                    read += 1
+                    if name is None:
+                        print(f"Can't index {kind} file {path}: no {kind}_name.")
+                        continue
+                    entry = [kind, stat.st_mtime_ns, stat.st_size, name]
+                entries[relative_path] = entry
+                paths = plan_paths if kind == "plan" else scenario_paths
+                name = entry[3]
+                if name in paths:
+                    print(f"Can't index {kind} file {path}: {kind} {name} is also in {paths[name]}, which is indexed.")
+                    duplicates.append((relative_path, paths[name], name))
+                    continue
+                paths[name] = relative_path
+        self.plan_paths = plan_paths
+        self.scenario_paths = scenario_paths
+        self.evictable_actions = sum(len(plan.encoded_sequence) for plan_name, plan in self.plan_library.items()
+                                     if plan_name in plan_paths)
+
+        if read or len(entries) != len(old_entries):
+            try:
+                with open(index_path, "wt") as file:
+                    json.dump({"version": INDEX_VERSION, "files": entries}, file)
+            except OSError as error:
+                print(f"Can't save the library index {index_path}: {error}")
+
+        if self.events.sinks:
+            self.events.emit(ev.Event(ev.LIBRARY_INDEXED, self, self.scenario_directory,
+                                      (len(self.plan_paths), len(self.scenario_paths), read)))
+        return duplicates
 
 
     # Read Execution Scenario into Library
@@ -214,8 +403,13 @@ class PlanLibrary:
         # Creates a scenario dictionary, containing a plan name and a plan execution,
         # which corresponds to a json plan execution scenario description,
         # at the file pointed to by relative_path_for_scenario.
+        # A file in the scenario lines or binary format is read as the scenario is dispatched.
         fn = self.scenario_directory / relative_path_for_scenario
         if Path.exists(fn):
+            if fn.suffix == ".jsonl":
+                return self.register_scenario(read_scenario_lines(fn))
+            if fn.suffix == ".bin":
+                return self.register_scenario(pb.read_binary_scenario(fn))
             with open(fn, "rt") as file:
                 json_scenario = file.read()
                 return self.json2scenario(json_scenario)
@@ -231,46 +425,152 @@ class PlanLibrary:
     def dict2scenario (self, dict_scenario) -> es.ExecutionScenario:
         # Converts a dictionary description of a scenario,
         # dict_scenario, to a dictionary that contains a plan name and a python execution object.
-        scenario_name: str = dict_scenario["scenario_name"]
-        plan_name: str = dict_scenario["plan_name"]
-        start = dict_scenario["start"]
-        seq = dict2stage_sequence(dict_scenario["sequence"])
+        return self.register_scenario(dict2execution_scenario(dict_scenario))
 
-        scenario: es.ExecutionScenario = es.ExecutionScenario(scenario_name, plan_name, start, seq)
+    def register_scenario(self, scenario: es.ExecutionScenario) -> es.ExecutionScenario:
+        # Register scenario in the scenario library.
+        scenario_name = scenario.scenario_name
+        plan_name = scenario.plan_name
 
         self.scenario_library[scenario_name] = scenario
 
-        if self.trace:
-            print(f"Adding scenario {scenario_name} to library as {scenario}.")
+        if self.events.sinks:
+            self.events.emit(ev.Event(ev.SCENARIO_ADDED, self, scenario_name, scenario))
 
-        plan = self.get_plan(plan_name)
-        if plan is None:
+        if plan_name not in self.plan_library and plan_name not in self.plan_paths:
             print(f"Scenario {scenario_name} is for plan {plan_name}, which is not yet in the Library.")
 
         return scenario
 
     def get_scenario (self, scenario_name: str) -> es.ExecutionScenario or None:
-        return  self.scenario_library.get(scenario_name)
+        # Retrieves scenario from the library, reading it from the scenario directory if it is indexed and not yet read.
+        scenario = self.scenario_library.get(scenario_name)
+        if scenario is None and scenario_name in self.scenario_paths:
+            scenario = self.readscenario(self.scenario_paths[scenario_name])
+        return scenario
 
 
     # Execute Library Scenario using the Dispatcher
 
     def dispatch_scenario(self, scenario_name):
-        # Dispatch library execution scenario named scenario_name.
-
-        scenario = self.get_scenario(scenario_name)
-        if scenario is None:
-            print(f"Can't dispatch scenario {scenario_name}.  Not in the Library.")
-        else:
+        # Dispatch library execution scenario named scenario_name, one action at a time, as the Dispatcher does.
+        self.dispatch_scenarios([scenario_name], max_concurrent = 1)
+
+    def dispatch_scenarios(self, scenario_names: list[str], max_concurrent: int = 1, workers: int = 0,
+                           trace = True, history_directory: str = None, output_directory: str = None,
+                           json_lines = False) -> fe.FleetStatistics:
+        # Dispatch the library execution scenarios named scenario_names together, on one fleet executive,
+        # and print the results of each.
+        # Executions of a plan share the plan's compiled plan.  See FleetExecutive for max_concurrent and workers.
+        # A scenario records a sequential execution, so by default each execution runs one action at a time,
+        # and each stage's state change is checked before the next stage's action starts (see asyncbot).
+        # If history_directory is given, the executions are appended to the execution history there (see executionhistory).
+        # If output_directory is given, the scenario output of each execution is written there as it is dispatched
+        # (see scenariooutput), to <scenario_name>_output.json, or, if json_lines, to scenario_output.jsonl.
+        # Returns the fleet's throughput statistics.
+        recorder = None if history_directory is None else eh.ExecutionRecorder(history_directory)
+        fleet = fe.FleetExecutive(max_concurrent, workers, trace, recorder)
+        output_files = []
+        output_lock = threading.Lock()  # Shared by the writers of the json lines output file.
+        if output_directory is not None:
+            output_directory = Path(output_directory)
+            output_directory.mkdir(parents = True, exist_ok = True)
+            if json_lines:
+                output_files.append(open(output_directory / "scenario_output.jsonl", "wt"))
+        dispatched = []
+        for scenario_name in scenario_names:
+            scenario = self.get_scenario(scenario_name)
+            if scenario is None:
+                print(f"Can't dispatch scenario {scenario_name}.  Not in the Library.")
+                continue
             plan_name = scenario.plan_name
             plan = self.get_plan(plan_name)
             if plan is None:
                 print(f"Can't dispatch scenario {scenario_name}, its plan {plan_name} isn't in the Library.")
-            else:
-                disp1 = pd.Dispatcher(f'Dispatcher for {plan_name}', plan)
-                completed, end_state, successp, conflicts = disp1.dispatch_scenario(scenario)
-
-                print_scenario_results(scenario_name, plan_name, end_state, successp, completed, conflicts)
+                continue
+            dispatcher = fleet.add_scenario(f'Dispatcher for {plan_name}', plan, scenario)
+            dispatched.append((scenario_name, plan_name))
+
+            if output_directory is not None:
+                if json_lines:
+                    writer = so.ScenarioOutputWriter(output_files[0], plan.partial_order_plan, True, scenario_name,
+                                                     output_lock)
+                else:
+                    output_files.append(open(output_directory / f"{scenario_name}_output.json", "wt"))
+                    writer = so.ScenarioOutputWriter(output_files[-1], plan.partial_order_plan)
+                dispatcher.events.attach(writer)
+
+        try:
+            results = fleet.run() if dispatched else []
+        finally:
+            # The recorder is closed even if nothing was dispatched, to release the history's writer lock.
+            if recorder is not None:
+                recorder.close()
+            for file in output_files:
+                file.close()
+        for (scenario_name, plan_name), (completed, end_state, successp, conflicts) in zip(dispatched, results):
+            print_scenario_results(scenario_name, plan_name, end_state, successp, completed, conflicts)
+        if len(dispatched) > 1 and self.events.sinks:
+            self.events.emit(ev.Event(ev.SCENARIOS_DISPATCHED, self, None, fleet.statistics))
+        return fleet.statistics
+
+    def run_scenario_batch(self, scenario_names: list[str] = None, pattern: str = None, report_path: str = None,
+                           jobs: int = None, max_concurrent: int = 1) -> list[es.ScenarioResult]:
+        # Dispatches a batch of scenarios with tracing off, for regression testing, and returns their results.
+        # The batch is the library scenarios named scenario_names, by default every scenario in the library,
+        # those read and those indexed but not yet read (see index_directory),
+        # or, if pattern is given, every scenario file in the scenario directory whose name matches pattern.
+        # Scenarios are dispatched against the plans in the library, retrieved as get_plan does.
+        # Scenarios are dispatched by jobs worker processes, by default one per core;
+        # if jobs is 1, scenarios are dispatched in this process.  Each process dispatches its scenarios
+        # on a fleet executive, running up to max_concurrent actions of a scenario at once.
+        # If report_path is given, the results are written to it as json lines (see write_scenario_report).
+        if pattern is not None:
+            items = sorted(str(path) for path in self.scenario_directory.glob(pattern))
+        elif scenario_names is None:
+            # Scenarios indexed but not yet read are read by the workers.
+            items = list(self.scenario_library.values())
+            items.extend(str(self.scenario_directory / relative_path)
+                         for scenario_name, relative_path in self.scenario_paths.items()
+                         if scenario_name not in self.scenario_library)
+        else:
+            items = []
+            for scenario_name in scenario_names:
+                scenario = self.get_scenario(scenario_name)
+                if scenario is None:
+                    print(f"Can't dispatch scenario {scenario_name}.  Not in the Library.")
+                else:
+                    items.append(scenario)
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+
+        # The plans of the scenarios are passed to the workers as their descriptions and compiled plans,
+        # so that workers don't compile them.
+        plan_records = dict()
+        for plan_name in dict.fromkeys(item.plan_name if isinstance(item, es.ExecutionScenario) else file_plan_name(Path(item))
+                                       for item in items):
+            plan = None if plan_name is None else self.get_plan(plan_name)
+            if plan is not None:
+                key = pc.plan_key(plan.encoded_sequence)
+                plan_records[plan_name] = (plan2dict(plan), pc.encode_compiled_plan(key, plan.partial_order_plan, plan.threats))
+
+        if jobs <= 1 or len(items) <= 1:
+            init_scenario_worker(plan_records, max_concurrent)
+            results = dispatch_scenario_chunk(items)
+        else:
+            chunk_size = max(1, len(items) // (4 * jobs))
+            chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+            with ProcessPoolExecutor(jobs, initializer = init_scenario_worker,
+                                     initargs = (plan_records, max_concurrent)) as executor:
+                results = [result for chunk_results in executor.map(dispatch_scenario_chunk, chunks)
+                           for result in chunk_results]
+
+        if report_path is not None:
+            write_scenario_report(results, report_path)
+        if self.events.sinks:
+            succeeded = sum(result.successp for result in results)
+            self.events.emit(ev.Event(ev.BATCH_DISPATCHED, self, None, (len(results), succeeded)))
+        return results
 
 def print_scenario_results(scenario_name: str, plan_name: str, end_state, successp: bool, completed, conflicts):
     print()
@@ -292,24 +592,210 @@ def print_scenario_results(scenario_name: str, plan_name: str, end_state, succes
         print(f"      {c1}")
 
 
+# ***  Library index ***
+
+# The index of a scenario directory is a json file in the directory:
+#    <index> ::= "{" "version" ":" <int> "," "files" ":" "{" (<file_name> ":" <entry>)* "}" "}"
+#    <entry> ::= "[" ("plan" | "scenario") "," <modification_time_ns> "," <size> "," <name> "]"
+
+INDEX_FILE = ".plan_library_index.json"
+INDEX_VERSION = 1
+
+# The name of a plan or scenario is found without parsing its file, by the first "plan_name" or "scenario_name" key.
+# Files are read NAME_READ_SIZE characters at a time, up to the key's value, which is usually at their start.
+name_patterns = {kind: re.compile(rf'"{kind}_name"\s*:\s*("(?:[^"\\]|\\.)*")') for kind in ("plan", "scenario")}
+NAME_READ_SIZE = 4096
+
+def read_library_index(index_path: Path) -> dict:
+    # Returns the entries of the index at index_path, or no entries if it is missing, invalid or of another version.
+    try:
+        with open(index_path, "rt") as file:
+            index = json.load(file)
+        if index.get("version") == INDEX_VERSION:
+            return index["files"]
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+    return dict()
+
+def file_plan_name(path: Path) -> str or None:
+    # Returns the name of the plan of the scenario in the file at path, or None if it has none.
+    if path.suffix == ".bin":
+        return pb.binary_name(path, True)
+    return file_library_name(path, "plan")
+
+def file_library_name(path: Path, kind: str) -> str or None:
+    # Returns the name of the plan or scenario, as kind, in the file at path, or None if it has none.
+    # Only the first line of a file in the scenario lines format is read, the header of a binary file,
+    # and the start of a json file, up to the name.
+    if path.suffix == ".bin":
+        return pb.binary_name(path)
+    pattern = name_patterns[kind]
+    key = f'"{kind}_name"'
+    try:
+        with open(path, "rt") as file:
+            if path.suffix == ".jsonl":
+                match = pattern.search(file.readline())
+            else:
+                text = ""  # The text read since the first match may still start.
+                while True:
+                    chunk = file.read(NAME_READ_SIZE)
+                    text += chunk
+                    match = pattern.search(text)
+                    if match is not None or not chunk:
+                        break
+                    # A key whose value isn't read yet is matched again once more is read.
+                    found = text.find(key)
+                    text = text[found:] if found >= 0 else text[-len(key):]
+    except (OSError, UnicodeDecodeError):
+        return None
+    if match is None:
+        return None
+    return json.loads(match.group(1))
+
+
+# ***  Compiling plan files in worker processes ***
+
+# Plan cache of a worker process, opened once by init_plan_worker.
+worker_plan_cache = None
+worker_backend = "python"
+
+def init_plan_worker(cache_arguments, backend: str = "python"):
+    # Opens the plan cache of a worker, given the cache's directory name and maximum entries, or None,
+    # and sets the compiler backend of the worker.
+    global worker_plan_cache, worker_backend
+    worker_backend = backend
+    if cache_arguments is None:
+        worker_plan_cache = None
+    else:
+        directory_name, max_entries = cache_arguments
+        worker_plan_cache = pc.CompiledPlanCache(directory_name, max_entries)
+
+def compile_plan_file(path: str) -> tuple:
+    # Reads and compiles the json or binary plan in the file at path.
+    # Returns path, the plan's dictionary description and its compiled plan, as a cache entry,
+    # which are passed back to the library in place of the plan's objects.
+    # If the file can't be loaded, returns path and the error instead.
+    try:
+        if path.endswith(".bin"):
+            plan = pb.load_binary_plan(path, worker_plan_cache, worker_backend)
+            dict_plan = plan2dict(plan)
+        else:
+            with open(path, "rt") as file:
+                dict_plan = json.load(file)
+            plan_name, plan = dict2total_order_plan(dict_plan, worker_plan_cache, worker_backend)
+        key = pc.plan_key(plan.encoded_sequence)
+        entry = pc.encode_compiled_plan(key, plan.partial_order_plan, plan.threats)
+        return path, dict_plan, entry, None
+    except Exception as error:
+        return path, None, None, f"{type(error).__name__}: {error}"
+
+
+# Scenario batch workers.
+# Each worker process restores the library's plans from their records when first dispatched,
+# and dispatches its chunks of scenarios on a fleet executive with tracing off.
+
+worker_plan_records: dict = dict()
+worker_plans: dict = dict()
+worker_max_concurrent = 1
+
+def init_scenario_worker(plan_records: dict, max_concurrent: int):
+    # Records the plans of the library that scenarios are dispatched against,
+    # as a dictionary from plan name to the plan's description and compiled plan, as a cache entry.
+    global worker_plan_records, worker_plans, worker_max_concurrent
+    worker_plan_records = plan_records
+    worker_plans = dict()
+    worker_max_concurrent = max_concurrent
+
+def worker_plan(plan_name: str) -> tp.TotalOrderPlan or None:
+    # Returns the plan named plan_name, restoring it from its record the first time it is used.
+    plan = worker_plans.get(plan_name)
+    if plan is None and plan_name in worker_plan_records:
+        dict_plan, entry = worker_plan_records[plan_name]
+        plan_name, plan = dict2total_order_plan(dict_plan, pc.CompiledPlanRecord(entry))
+        worker_plans[plan_name] = plan
+    return plan
+
+def dispatch_scenario_chunk(items: list) -> list[es.ScenarioResult]:
+    # Dispatches a chunk of scenarios, each an ExecutionScenario or the path of a json, json lines or binary scenario file,
+    # and returns their results, in order.
+    fleet = fe.FleetExecutive(worker_max_concurrent, 0, False)
+    results: list[es.ScenarioResult or None] = []
+    dispatched = []
+    for item in items:
+        try:
+            if isinstance(item, es.ExecutionScenario):
+                scenario = item
+            elif item.endswith(".jsonl"):
+                scenario = read_scenario_lines(Path(item))
+            elif item.endswith(".bin"):
+                scenario = pb.read_binary_scenario(item)
+            else:
+                with open(item, "rt") as file:
+                    scenario = dict2execution_scenario(json.load(file))
+        except Exception as error:
+            results.append(es.ScenarioResult(str(item), None, False, [], [], dict(), f"{type(error).__name__}: {error}"))
+            continue
+        plan = worker_plan(scenario.plan_name)
+        if plan is None:
+            results.append(es.ScenarioResult(scenario.scenario_name, scenario.plan_name, False, [], [], dict(),
+                                             f"Plan {scenario.plan_name} isn't in the Library."))
+            continue
+        fleet.add_scenario(f'Dispatcher for {scenario.plan_name}', plan, scenario)
+        dispatched.append((len(results), scenario))
+        results.append(None)
+
+    for (i, scenario), (completed, end_state, successp, conflicts) in zip(dispatched, fleet.run()):
+        results[i] = scenario_result(scenario, completed, end_state, successp, conflicts)
+    return results
+
+def scenario_result(scenario: es.ExecutionScenario, completed: list[at.Action], end_state, successp: bool,
+                    conflicts: list) -> es.ScenarioResult:
+    # Returns the result of dispatching scenario.
+    dict_conflicts = [so.conflict2dict(conflict) for conflict in conflicts]
+    dict_end_state = {variable: assignment.value for variable, assignment in end_state.assignments.items()}
+    return es.ScenarioResult(scenario.scenario_name, scenario.plan_name, successp,
+                             [action.operator for action in completed], dict_conflicts, dict_end_state)
+
+def write_scenario_report(results: list[es.ScenarioResult], report_path: str):
+    # Writes results to the file at report_path, one json object per line.
+    with open(report_path, "wt") as file:
+        for result in results:
+            file.write(json.dumps(result.to_dict()))
+            file.write("\n")
+
+
 # ***  Creating Total Order plans ***
 
-def dict2total_order_plan (dict_plan)-> (str, tp.TotalOrderPlan):
+def dict2total_order_plan (dict_plan, plan_cache: pc.CompiledPlanCache = None,
+                           backend: str = "python")-> (str, tp.TotalOrderPlan):
     # Converts a dictionary description of a total order plan,
     # dict_plan, to a python total order plan object.
+    # If plan_cache is given, the plan's compilation is looked up in the cache.
+    # backend selects the compiler implementation.
     plan_name: str = dict_plan["plan_name"]
     start = dict2assignments(dict_plan["start"])
     goal = dict2assignments(dict_plan["goal"])
     sequence = dict2plan_sequence(dict_plan["sequence"])
-    plan = tp.TotalOrderPlan(plan_name, sequence, start, goal)
+    plan = tp.TotalOrderPlan(plan_name, sequence, start, goal, plan_cache = plan_cache, backend = backend)
     return plan_name, plan
 
-def dict2assignments (dict_assignments):
+def plan2dict (plan: tp.TotalOrderPlan) -> dict:
+    # Returns the dictionary description of a total order plan, from which dict2total_order_plan recreates it.
+    return {"plan_name": plan.name,
+            "start": so.assignments2dict(plan.start),
+            "goal": so.assignments2dict(plan.goal),
+            "sequence": [{"action": action.operator,
+                          "precondition": so.assignments2dict(action.preconditions),
+                          "effect": so.assignments2dict(action.effects)}
+                         for action in plan.action_sequence]}
+
+def dict2assignments (dict_assignments, symbol_table: sym.SymbolTable = sym.symbols):
     # Converts a dictionary description of a set of assignments,
     # dict_assignments, to a python assignments object.
+    # Assignments are the shared assignments of symbol_table.
     asgns = list()
     for var, val in dict_assignments.items():
-        asgn = asn.Assignment(var, val)
+        asgn = symbol_table.assignment(var, val)
         asgns.append(asgn)
     return asgns
 
@@ -333,6 +819,15 @@ def dict2action (dict_action)->at.Action:
 
 # ***  Creating Plan Execution Sequences ***
 
+def dict2execution_scenario (dict_scenario) -> es.ExecutionScenario:
+    # Converts a dictionary description of a scenario,
+    # dict_scenario, to a python execution scenario object.
+    scenario_name: str = dict_scenario["scenario_name"]
+    plan_name: str = dict_scenario["plan_name"]
+    start = dict_scenario["start"]
+    seq = dict2stage_sequence(dict_scenario["sequence"])
+    return es.ExecutionScenario(scenario_name, plan_name, start, seq)
+
 def dict2stage_sequence (dict_stage_sequence)-> list[es.Stage]:
     # Converts a dictionary description of an execution sequence,
     # dict_stage_sequence, to a list of python stage object.
@@ -342,9 +837,37 @@ def dict2stage_sequence (dict_stage_sequence)-> list[es.Stage]:
         pseq.append(stage)
     return pseq
 
+def read_scenario_lines (path: Path) -> es.StreamingExecutionScenario:
+    # Returns the scenario in the file at path, in the scenario lines format,
+    # whose stages are read from the file each time the scenario is dispatched.
+    with open(path, "rb") as file:
+        dict_scenario = json.loads(file.readline())
+        offset = file.tell()
+    return es.StreamingExecutionScenario(dict_scenario["scenario_name"], dict_scenario["plan_name"],
+                                         sym.symbols.intern_assignments(dict_scenario["start"]),
+                                         functools.partial(read_stage_lines, str(path), offset))
+
+def read_stage_lines (path: str, offset: int):
+    # Yields the stages of the file at path, in the scenario lines format, from the line at offset.
+    with open(path, "rb") as file:
+        file.seek(offset)
+        for line in file:
+            if line.strip():
+                yield dict2stage(json.loads(line))
+
+def write_scenario_lines (scenario: es.ExecutionScenario, path: str):
+    # Writes scenario to the file at path, in the scenario lines format, one stage at a time.
+    with open(path, "wt") as file:
+        file.write(json.dumps({"scenario_name": scenario.scenario_name, "plan_name": scenario.plan_name,
+                               "start": scenario.start}))
+        file.write("\n")
+        for stage in scenario.stage_iterator():
+            file.write(json.dumps({"action": stage.action_name, "state_change": stage.state_change}))
+            file.write("\n")
+
 def dict2stage (dict_stage)-> es.Stage:
     # Converts a dictionary description of an execution stage,
     # dict_stage, to a python stage object.
     action_name = dict_stage["action"]
-    state_change = dict_stage["state_change"]
+    state_change = sym.symbols.intern_assignments(dict_stage["state_change"])
     return es.Stage(action_name, state_change)
@@ -0,0 +1,99 @@
+# Project RobustExecution
+
+# Benchmark of the memory used per action by loaded and compiled plans.
+
+# To run this scratch file from any project:
+import sys
+sys.path.insert(0,'/Users/brian/PycharmProjects/robustExecution/robust-execution')
+
+import gc
+import json
+import random
+import tracemalloc
+import planlibrary as plib
+import model.plans.totalorderplan as tp
+
+print('This scratch file measures the memory footprint of plan actions, before and after compilation,')
+print('and compares it with the representation that preceded interned, slotted assignments.')
+
+# The representation of actions before assignments were interned and slotted:
+# each assignment an object with its own dictionary, holding the strings read for it,
+# and each action an object with its own dictionary and empty lists for its links.
+
+class DictAssignment:
+    def __init__(self, variable: str, value):
+        self.variable = variable
+        self.value = value
+
+class DictAction:
+    def __init__(self, operator: str, preconditions: list, effects: list):
+        self.operator = operator
+        self.preconditions = preconditions
+        self.effects = effects
+        self.location = None
+        self.predecessor_links = []
+        self.predecessor_actions = []
+        self.successor_actions = []
+        self.successor_links = []
+
+def dict2dict_assignments(dict_assignments: dict) -> list[DictAssignment]:
+    return [DictAssignment(var, val) for var, val in dict_assignments.items()]
+
+def dict2dict_actions(dict_sequence: list[dict]) -> list[DictAction]:
+    return [DictAction(dict_action["action"],
+                       dict2dict_assignments(dict_action["precondition"]),
+                       dict2dict_assignments(dict_action["effect"]))
+            for dict_action in dict_sequence]
+
+def retained_bytes(load, text: str) -> tuple[int, object]:
+    # Returns the memory retained by the result of load applied to the plan read from json text,
+    # including the strings read that the result holds on to, and the result.
+    gc.collect()
+    base = tracemalloc.get_traced_memory()[0]
+    dict_plan = json.loads(text)
+    result = load(dict_plan)
+    del dict_plan
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0] - base, result
+
+def random_plan(n_actions: int, n_variables: int, seed: int = 0) -> dict:
+    # Returns the dictionary description of a random total order plan with n_actions,
+    # each of which reads the current value of up to two variables and changes one or two variables.
+    rnd = random.Random(seed)
+    values = ["True", "False", "Unknown"]
+    state = {f"var{i}": rnd.choice(values) for i in range(n_variables)}
+    start = dict(state)
+    sequence = []
+    for i in range(n_actions):
+        precondition = {var: state[var] for var in rnd.sample(sorted(state), rnd.randint(0, 2))}
+        effect = {var: rnd.choice(values) for var in rnd.sample(sorted(state), rnd.randint(1, 2))}
+        state.update(effect)
+        sequence.append({"action": f"action{i}", "precondition": precondition, "effect": effect})
+    return {"plan_name": "benchmark", "start": start, "goal": dict(list(state.items())[:3]), "sequence": sequence}
+
+n_actions = 10000
+dict_plan = random_plan(n_actions, 20)
+# Each representation is loaded from the plan as read from a file, so that every string read is a new object.
+text = json.dumps(dict_plan)
+
+tracemalloc.start()
+before, dict_loaded = retained_bytes(lambda d: (dict2dict_assignments(d["start"]),
+                                                dict2dict_assignments(d["goal"]),
+                                                dict2dict_actions(d["sequence"])), text)
+print(f"Loaded {n_actions} actions with dictionary assignments: {before / n_actions:.0f} bytes per action.")
+del dict_loaded
+
+after, (start, goal, sequence) = retained_bytes(lambda d: (plib.dict2assignments(d["start"]),
+                                                          plib.dict2assignments(d["goal"]),
+                                                          plib.dict2plan_sequence(d["sequence"])), text)
+print(f"Loaded {n_actions} actions with interned, slotted assignments: {after / n_actions:.0f} bytes per action,"
+      f" {100 * (before - after) / before:.0f}% less.")
+
+base = tracemalloc.get_traced_memory()[0] - after
+plan = tp.TotalOrderPlan("benchmark", sequence, start, goal)
+# Count only the memory retained by the plan, not the garbage left by the compiler.
+gc.collect()
+compiled = tracemalloc.get_traced_memory()[0] - base
+print(f"Compiled {n_actions} actions: {compiled / n_actions:.0f} bytes per action,"
+      f" {len(plan.partial_order_plan.links)} links, {len(plan.partial_order_plan.orderings)} orderings.")
+tracemalloc.stop()
@@ -0,0 +1,93 @@
+# Project RobustExecution
+
+# Test of checking the state changes of many executions at once, against checking each execution's changes.
+
+# To run this scratch file from any project:
+import sys
+sys.path.insert(0,'/Users/brian/PycharmProjects/robustExecution/robust-execution')
+
+import random
+import planlibrary as plib
+import model.plans.totalorderplan as tp
+import model.states.symboltable as sym
+import planexecutive.monitor.planmonitor as lm
+import planexecutive.monitor.batchmonitor as bm
+
+print('This scratch file runs 40 executions of a plan part way, observes random state changes in each,')
+print('and checks that the batch link monitor finds the conflicts, checks and current states of the link monitor.')
+
+rnd = random.Random(0)
+values = ["True", "False", "Unknown"]
+state = {f"var{i}": rnd.choice(values) for i in range(12)}
+start = dict(state)
+sequence = []
+for i in range(80):
+    precondition = {var: state[var] for var in rnd.sample(sorted(state), rnd.randint(1, 3))}
+    effect = {var: rnd.choice(values) for var in rnd.sample(sorted(state), rnd.randint(1, 2))}
+    state.update(effect)
+    sequence.append({"action": f"a{i}", "precondition": precondition, "effect": effect})
+plan = tp.TotalOrderPlan("monitored", plib.dict2plan_sequence(sequence), plib.dict2assignments(start),
+                         plib.dict2assignments(dict(list(state.items())[:3])))
+
+def run_monitors(steps: list[int]) -> list[lm.CausalLinkMonitor]:
+    # Returns a monitor for each number of steps, that has monitored that many actions of the plan, from its start.
+    monitors = []
+    for count in steps:
+        monitor = lm.CausalLinkMonitor(plan, False)
+        for action in plan.encoded_sequence[:count + 1]:
+            monitor.monitor_action_start(action)
+            monitor.check_state_change({effect.variable: effect.value for effect in action.effects}, True, [])
+            monitor.monitor_completed_action(action, True, [])
+        monitors.append(monitor)
+    return monitors
+
+def outcome(monitors: list[lm.CausalLinkMonitor], conflicts: list[list]) -> list:
+    # Returns, for each execution, its conflicts, in order, its number of checks and its current state.
+    return [([(str(conflict.link), conflict.observed_value) for conflict in row_conflicts], monitor.checks,
+             {variable: assignment.value for variable, assignment in monitor.current_state.assignments.items()})
+            for monitor, row_conflicts in zip(monitors, conflicts)]
+
+steps = [rnd.randint(0, len(sequence)) for _ in range(40)]
+# Changes to the plan's variables, to a value no plan has, and to a variable no plan has.
+changes = [{var: rnd.choice(values + ["Bogus"]) for var in rnd.sample(sorted(state) + ["telemetry"], rnd.randint(0, 4))}
+           for _ in steps]
+
+monitors = run_monitors(steps)
+expected = []
+for monitor, changed_assignments in zip(monitors, changes):
+    successp, conflicts = monitor.check_state_change(changed_assignments, True, [])
+    expected.append(conflicts)
+expected = outcome(monitors, expected)
+print(f"{sum(len(row[0]) for row in expected)} conflicts in {sum(bool(row[0]) for row in expected)} of 40 executions.")
+
+monitors = run_monitors(steps)
+batch = bm.BatchLinkMonitor(monitors)
+assert outcome(monitors, batch.check_state_changes(changes)) == expected
+batch.detach()
+print("Vectorized: same conflicts, checks and current states.")
+
+# Without NumPy, each change is checked link by link.
+numpy = bm.np
+bm.np = None
+monitors = run_monitors(steps)
+batch = bm.BatchLinkMonitor(monitors)
+bm.np = numpy
+assert not batch.vectorizedp
+assert outcome(monitors, batch.check_state_changes(changes)) == expected
+print("Link by link: same conflicts, checks and current states.")
+
+# Changes given as interned ids, to the plan's variables and values only.
+plan_changes = [{var: value for var, value in changed_assignments.items() if var != "telemetry" and value != "Bogus"}
+                for changed_assignments in changes]
+monitors = run_monitors(steps)
+expected = []
+for monitor, changed_assignments in zip(monitors, plan_changes):
+    successp, conflicts = monitor.check_state_change(changed_assignments, True, [])
+    expected.append(conflicts)
+expected = outcome(monitors, expected)
+rows = [row for row, changed_assignments in enumerate(plan_changes) for _ in changed_assignments]
+variable_ids = [sym.symbols.variable_ids[var] for changed_assignments in plan_changes for var in changed_assignments]
+value_ids = [sym.symbols.value_ids[value] for changed_assignments in plan_changes for value in changed_assignments.values()]
+monitors = run_monitors(steps)
+assert outcome(monitors, bm.BatchLinkMonitor(monitors).check_deltas(rows, variable_ids, value_ids)) == expected
+print("Interned deltas: same conflicts, checks and current states.")
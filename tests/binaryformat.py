@@ -0,0 +1,147 @@
+# Project RobustExecution
+
+# Test of the binary plan and scenario format, against the json files it is converted from.
+
+# To run this scratch file from any project:
+import sys
+sys.path.insert(0,'/Users/brian/PycharmProjects/robustExecution/robust-execution')
+
+import contextlib
+import io
+import json
+import random
+import tempfile
+from pathlib import Path
+import planlibrary as plib
+import planbinary as pb
+import planexecutive.executionscenario as es
+import planexecutive.dispatcher.plandispatcher as pd
+
+print('This scratch file converts the example plans and scenarios, a scenario with a conflict and random plans')
+print('to the binary format, and checks that each binary plan compiles to the links and orderings of its json plan,')
+print('and that each binary scenario dispatches with the result of its json scenario.')
+
+def compiled(plan) -> tuple:
+    # Returns the description of a plan, and its links, orderings and threats, by the locations of their actions.
+    def location(action):
+        return None if action is None else action.location
+    pop = plan.partial_order_plan
+    return (plib.plan2dict(plan),
+            [(link.consumer.location, str(link.condition), location(link.producer)) for link in pop.links],
+            [(ordering.predecessor.location, ordering.successor.location) for ordering in pop.orderings],
+            [(str(threat.link.condition), threat.action.location) for threat in plan.threats])
+
+def dispatch(library: plib.PlanLibrary, scenario: es.ExecutionScenario) -> dict:
+    # Dispatches scenario, and returns its result.
+    dispatcher = pd.Dispatcher(f"Dispatcher for {scenario.plan_name}", library.get_plan(scenario.plan_name), trace = False)
+    return plib.scenario_result(scenario, *dispatcher.dispatch_scenario(scenario)).to_dict()
+
+def random_plan(n_actions: int, seed: int) -> tuple[dict, dict]:
+    # Returns a random total order plan whose values are numbers, booleans and strings, with a scenario that follows it.
+    rnd = random.Random(seed)
+    values = [0, 1, True, False, "on", "off", 2.5]
+    state = {f"var{i}": rnd.choice(values) for i in range(8)}
+    start = dict(state)
+    sequence = []
+    for i in range(n_actions):
+        precondition = {var: state[var] for var in rnd.sample(sorted(state), rnd.randint(0, 2))}
+        effect = {var: rnd.choice(values) for var in rnd.sample(sorted(state), rnd.randint(1, 2))}
+        state.update(effect)
+        sequence.append({"action": f"a{i}", "precondition": precondition, "effect": effect})
+    plan = {"plan_name": f"random{seed}_plan", "start": start, "goal": dict(list(state.items())[:3]), "sequence": sequence}
+    scenario = {"scenario_name": f"random{seed}_scenario", "plan_name": plan["plan_name"], "start": start,
+                "sequence": [{"action": action["action"], "state_change": action["effect"]} for action in sequence]}
+    return plan, scenario
+
+with tempfile.TemporaryDirectory() as directory:
+    directory = Path(directory)
+    examples = Path(plib.__file__).parent / "examples"
+    for name in ("hello_plan", "hello_scenario", "rescue_plan", "rescue_scenario"):
+        (directory / f"{name}.txt").write_text((examples / f"{name}.txt").read_text())
+    with open(examples / "rescue_scenario.txt") as file:
+        conflicting = json.load(file)
+    conflicting["scenario_name"] = "conflicting_scenario"
+    conflicting["sequence"][2]["state_change"]["in_air"] = "False"
+    descriptions = {"conflicting_scenario": conflicting}
+    for seed in range(3):
+        descriptions[f"random{seed}_plan"], descriptions[f"random{seed}_scenario"] = random_plan(200, seed)
+    for name, description in descriptions.items():
+        with open(directory / f"{name}.txt", "wt") as file:
+            json.dump(description, file)
+    for path in sorted(directory.glob("*.txt")):
+        binary = pb.json2binary(str(path))
+        assert binary == path.with_suffix(".bin")
+        print(f"{path.name}: {path.stat().st_size} bytes, {binary.name}: {binary.stat().st_size} bytes")
+
+    # Each binary plan has the actions, links, orderings and threats of its json plan.
+    text = plib.PlanLibrary(str(directory), trace = False)
+    binary = plib.PlanLibrary(str(directory), trace = False)
+    plan_names = ["hello_plan", "rescue_plan"] + [f"random{seed}_plan" for seed in range(3)]
+    for name in plan_names:
+        assert compiled(text.readplan(f"{name}.txt")) == compiled(binary.readplan(f"{name}.bin")), name
+    print(f"{len(plan_names)} binary plans compile as their json plans.")
+
+    # Each binary scenario is read as it is dispatched, with the result of its json scenario.
+    scenario_names = ["hello_scenario", "rescue_scenario", "conflicting_scenario"] + \
+                     [f"random{seed}_scenario" for seed in range(3)]
+    expected = []
+    for name in scenario_names:
+        json_scenario = text.readscenario(f"{name}.txt")
+        binary_scenario = binary.readscenario(f"{name}.bin")
+        assert isinstance(binary_scenario, es.StreamingExecutionScenario) and not binary_scenario.stages
+        assert binary_scenario.plan_name == json_scenario.plan_name and binary_scenario.start == json_scenario.start
+        assert [str(stage) for stage in binary_scenario.stage_iterator()] == [str(stage) for stage in json_scenario.stages]
+        result = dispatch(text, json_scenario)
+        assert dispatch(binary, binary_scenario) == result, name
+        expected.append(result)
+    print(f"{len(scenario_names)} binary scenarios, {sum(not result['success'] for result in expected)} failing, "
+          f"dispatch as their json scenarios.")
+
+    # A batch of the binary scenarios, whose plans are found from their headers, dispatched by worker processes.
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = plib.PlanLibrary(str(directory), trace = False, lazy = True).run_scenario_batch(pattern = "*_scenario.bin",
+                                                                                                  jobs = 2)
+    assert sorted(json.dumps(result.to_dict()) for result in results) == sorted(json.dumps(result) for result in expected)
+    print("A batch of the binary scenarios has the results of their json scenarios.")
+
+    # Names are read from the header, without decoding the file.
+    assert pb.binary_name(str(directory / "rescue_scenario.bin")) == "rescue_scenario"
+    assert pb.binary_name(str(directory / "rescue_scenario.bin"), True) == text.get_scenario("rescue_scenario").plan_name
+    assert pb.binary_name(str(directory / "random1_plan.bin")) == pb.binary_name(str(directory / "random1_plan.bin"), True) \
+           == "random1_plan"
+    assert pb.binary_name(str(directory / "rescue_plan.txt")) is None
+
+    # The file is closed at the end of a with statement; actions read before it is closed remain valid.
+    with pb.BinaryPlanFile(str(directory / "rescue_plan.bin")) as plan_file:
+        action = plan_file.action(2)
+        assert plan_file.action(2) is action
+    assert plan_file.map.closed
+    assert str(action) == str(text.get_plan(plan_file.name).action_sequence[2])
+    try:
+        plan_file.action(3)
+        readp = True
+    except ValueError:
+        readp = False
+    assert not readp
+    print("A binary file is closed at the end of a with statement, and its actions read remain valid.")
+
+    # Files of the wrong kind, or cut short, are refused.
+    for path, file_class in ((directory / "rescue_scenario.bin", pb.BinaryPlanFile),
+                             (directory / "rescue_plan.txt", pb.BinaryScenarioFile)):
+        try:
+            file_class(str(path)).close()
+            openedp = True
+        except ValueError as error:
+            print(error)
+            openedp = False
+        assert not openedp
+    truncated = directory / "truncated_plan.bin"
+    truncated.write_bytes((directory / "random0_plan.bin").read_bytes()[:-40])
+    try:
+        pb.load_binary_plan(str(truncated))
+        loadedp = True
+    except ValueError as error:
+        print(error)
+        loadedp = False
+    assert not loadedp
+    print("Binary files of the wrong kind, or cut short, are refused.")
@@ -0,0 +1,54 @@
+# Project RobustExecution
+
+# Test of replaying a scenario in which an action clobbers a link consumed by a later, concurrently enabled action.
+
+# To run this scratch file from any project:
+import sys
+sys.path.insert(0,'/Users/brian/PycharmProjects/robustExecution/robust-execution')
+
+import planlibrary as plib
+import planexecutive.dispatcher.plandispatcher as pd
+
+print('This scratch file replays a clobbering scenario sequentially and with concurrent dispatch,')
+print('and checks that every dispatch reports the conflict.')
+
+# A and B are both enabled at the start.  The scenario records A, then B:
+# A's state change sets P, the condition of the link from start to B, to False, before B starts.
+plan = {"plan_name": "clobber_plan",
+        "start": {"P": "True", "Q": "True"},
+        "goal": {"R": "True", "S": "True"},
+        "sequence": [{"action": "A", "precondition": {"Q": "True"}, "effect": {"R": "True"}},
+                     {"action": "B", "precondition": {"P": "True"}, "effect": {"S": "True"}}]}
+
+scenario = {"scenario_name": "clobber_scenario",
+            "plan_name": "clobber_plan",
+            "start": {"P": "True", "Q": "True"},
+            "sequence": [{"action": "A", "state_change": {"R": "True", "P": "False"}},
+                         {"action": "B", "state_change": {"S": "True"}}]}
+
+library = plib.PlanLibrary(trace = False)
+total_order_plan = library.dict2plan(plan)
+execution_scenario = library.dict2scenario(scenario)
+
+# Sequential dispatcher.
+dispatcher = pd.Dispatcher('Dispatcher for clobber_plan', total_order_plan, trace = False)
+completed, end_state, successp, conflicts = dispatcher.dispatch_scenario(execution_scenario)
+print(f"Dispatcher: success {successp}, conflicts {[str(conflict) for conflict in conflicts]}")
+assert not successp
+
+# Fleet executive, by default one action at a time.
+library.dispatch_scenario("clobber_scenario")
+statistics = library.dispatch_scenarios(["clobber_scenario"], trace = False)
+print(statistics)
+assert statistics.succeeded == 0
+
+# Fleet executive, up to 8 actions at once.
+statistics = library.dispatch_scenarios(["clobber_scenario"], max_concurrent = 8, trace = False)
+print(statistics)
+assert statistics.succeeded == 0
+
+# Batch, in this process, with 1 and 4 actions at once.
+for max_concurrent in (1, 4):
+    results = library.run_scenario_batch(["clobber_scenario"], jobs = 1, max_concurrent = max_concurrent)
+    print(f"Batch, max_concurrent {max_concurrent}: {results[0]}")
+    assert not results[0].successp
@@ -0,0 +1,86 @@
+# Project RobustExecution
+
+# Test of execution events and the sinks they are written to.
+
+# To run this scratch file from any project:
+import sys
+sys.path.insert(0,'/Users/brian/PycharmProjects/robustExecution/robust-execution')
+
+import contextlib
+import io
+from pathlib import Path
+import planlibrary as plib
+import planexecutive.events as ev
+import planexecutive.dispatcher.plandispatcher as pd
+
+print('This scratch file dispatches the rescue scenario with tracing on, and with tracing off and sinks attached,')
+print('and checks that the events the sinks receive are the trace, and that no events are made without sinks.')
+
+class CountingSink:
+    # Counts the events of each kind.
+    def __init__(self):
+        self.counts = dict()
+
+    def handle(self, event: ev.Event):
+        self.counts[event.kind] = self.counts.get(event.kind, 0) + 1
+
+class RecordingStageSink(ev.StageSink):
+    # Records the action, state change and links of each stage.
+    def __init__(self):
+        ev.StageSink.__init__(self)
+        self.stages = []
+        self.endedp = False
+
+    def stage(self, event: ev.Event, delta: dict, activated: list, deactivated: list):
+        self.stages.append((event.subject.operator, dict(delta), len(activated), len(deactivated)))
+
+    def end(self, event: ev.Event):
+        self.endedp = True
+
+library = plib.PlanLibrary(str(Path(plib.__file__).parent / "examples"), trace = False)
+plan = library.readplan("rescue_plan.txt")
+scenario = library.readscenario("rescue_scenario.txt")
+
+# Tracing on: the print sink prints the trace.
+with contextlib.redirect_stdout(io.StringIO()) as output:
+    traced = pd.Dispatcher("Dispatcher for rescue_plan", plan, trace = True).dispatch_scenario(scenario)
+trace = output.getvalue().splitlines()
+
+# Tracing off, with sinks attached: the ring buffer keeps the events, and their lines are the trace.
+dispatcher = pd.Dispatcher("Dispatcher for rescue_plan", plan, trace = False)
+ring = ev.RingBufferSink()
+counting = CountingSink()
+stages = RecordingStageSink()
+for sink in (ring, counting, stages):
+    dispatcher.events.attach(sink)
+dispatcher.events.attach(ring)  # Attached once only.
+with contextlib.redirect_stdout(io.StringIO()) as output:
+    completed, end_state, successp, conflicts = dispatcher.dispatch_scenario(scenario)
+assert output.getvalue() == ""
+assert successp == traced[2] and [action.operator for action in completed] == [action.operator for action in traced[0]]
+lines = [line for event in ring.events() for line in ev.event_lines(event)]
+assert lines == trace
+print(f"{len(ring.events())} events, whose lines are the {len(trace)} lines of the trace.")
+
+events = ring.events()
+assert events[0].kind == ev.EXECUTION_STARTED and events[-1].kind == ev.EXECUTION_ENDED
+assert all(earlier.time <= later.time for earlier, later in zip(events, events[1:]))
+assert counting.counts[ev.ACTION_SUCCEEDED] == len(completed) and sum(counting.counts.values()) == len(events)
+print(f"Stages: {stages.stages}")
+assert stages.endedp and [stage[0] for stage in stages.stages] == [action.operator for action in completed]
+
+# A ring buffer keeps only its last events.
+small = ev.RingBufferSink(5)
+for event in events:
+    small.handle(event)
+assert small.events() == events[-5:]
+
+# Without sinks, components make no events.
+dispatcher = pd.Dispatcher("Dispatcher for rescue_plan", plan, trace = False)
+made = []
+event_class = ev.Event
+ev.Event = lambda *arguments: made.append(arguments) or event_class(*arguments)
+dispatcher.dispatch_scenario(scenario)
+ev.Event = event_class
+assert not dispatcher.events.sinks and not made
+print("No events are made without sinks.")
@@ -0,0 +1,125 @@
+# Project RobustExecution
+
+# Test of recording executions to an execution history, and reading them back.
+
+# To run this scratch file from any project:
+import sys
+sys.path.insert(0,'/Users/brian/PycharmProjects/robustExecution/robust-execution')
+
+import tempfile
+from pathlib import Path
+import planlibrary as plib
+import planexecutive.events as ev
+import planexecutive.executionscenario as es
+import planexecutive.executionhistory as eh
+import planexecutive.fleetexecutive as fe
+
+print('This scratch file records 40 interleaved executions of the hello and rescue scenarios, some with conflicts,')
+print('and checks that the stages read back from the history are those recorded, and that a history has a single writer.')
+
+class ExpectedStages(ev.StageSink):
+    # Keeps each stage of an execution, as the execution history should read it back.
+    def __init__(self):
+        ev.StageSink.__init__(self)
+        self.stages = []
+
+    def stage(self, event: ev.Event, delta: dict, activated: list, deactivated: list):
+        if event.kind == ev.ACTION_SUCCEEDED:
+            outcome, conflicts = eh.SUCCEEDED, []
+        else:
+            outcome = eh.EXECUTION_CONFLICT if event.kind == ev.EXECUTION_CONFLICT else eh.EFFECT_CONFLICT
+            conflicts = event.data
+        self.stages.append({"action": event.subject.operator,
+                            "action_id": event.subject.location,
+                            "outcome": outcome,
+                            "activated_conditions": {str(l.condition.variable): str(l.condition.value) for l in activated},
+                            "deactivated-conditions": {str(l.condition.variable): str(l.condition.value) for l in deactivated},
+                            "state-change": {str(variable): str(value) for variable, value in delta.items()},
+                            "conflicts": [{"variable": str(c.link.condition.variable),
+                                           "expected": str(c.link.condition.value),
+                                           "observed": str(c.observed_value)} for c in conflicts]})
+
+library = plib.PlanLibrary(str(Path(plib.__file__).parent / "examples"), trace = False)
+for name in ("hello", "rescue"):
+    library.readplan(f"{name}_plan.txt")
+    library.readscenario(f"{name}_scenario.txt")
+rescue = library.get_scenario("rescue_scenario")
+stages = [es.Stage(stage.action_name, dict(stage.state_change)) for stage in rescue.stages]
+stages[2].state_change["in_air"] = "False"
+conflicting = es.ExecutionScenario("conflicting_scenario", rescue.plan_name, rescue.start, stages)
+scenarios = [library.get_scenario("scenario_1"), rescue, conflicting]
+
+def record(directory: str, count: int, expected: dict):
+    # Records count executions to the history in directory, several at a time,
+    # and adds the stages of each to expected, by its offset in the history.
+    recorder = eh.ExecutionRecorder(directory, flush_stages = 7)
+    fleet = fe.FleetExecutive(4, 0, False, recorder)
+    sinks = []
+    for i in range(count):
+        scenario = scenarios[i % len(scenarios)]
+        dispatcher = fleet.add_scenario(scenario.scenario_name, library.get_plan(scenario.plan_name), scenario)
+        recording = next(sink for sink in dispatcher.events.sinks if isinstance(sink, eh.ExecutionRecording))
+        sink = ExpectedStages()
+        dispatcher.events.attach(sink)
+        sinks.append((recording, scenario.plan_name, sink))
+    fleet.run()
+    recorder.close()
+    for recording, plan_name, sink in sinks:
+        expected[recording.execution] = (plan_name, sink.stages)
+
+def read_back(directory: str) -> dict:
+    # Returns the plan name and stages of each execution of the history in directory, without their times.
+    history = eh.ExecutionHistory(directory)
+    executions = dict()
+    for execution in range(history.execution_count):
+        stages = []
+        for stage in history.execution_stages(execution):
+            row = history.stage(stage)
+            assert row["execution"] == execution
+            del row["execution"], row["time"]
+            stages.append(row)
+        executions[execution] = (history.execution_plan(execution), stages)
+    history.close()
+    return executions
+
+with tempfile.TemporaryDirectory() as directory:
+    expected = dict()
+    record(directory, 30, expected)
+    record(directory, 10, expected)  # Appended to the history.
+    assert read_back(directory) == expected
+    conflicts = sum(stage["outcome"] != eh.SUCCEEDED for plan_name, stages in expected.values() for stage in stages)
+    print(f"{len(expected)} executions, {sum(len(stages) for plan_name, stages in expected.values())} stages, "
+          f"{conflicts} with conflicts: read back as recorded.")
+
+    # Without NumPy, the stages of each execution are found by indexing the stage column.
+    numpy = eh.np
+    eh.np = None
+    assert read_back(directory) == expected
+    eh.np = numpy
+    print("Without NumPy: read back as recorded.")
+
+    # A flush interrupted part way leaves rows that readers ignore and the next recorder removes.
+    for name, extra in (("delta_variable.i", b"\x01\x00"), ("stage_time.d", b"\x00" * 8), ("stage_outcome.b", b"\x00")):
+        with open(Path(directory) / name, "ab") as file:
+            file.write(extra)
+    with open(Path(directory) / eh.STRINGS_FILE, "ab") as file:
+        file.write(b'"partial')
+    assert read_back(directory) == expected
+    record(directory, 3, expected)
+    assert read_back(directory) == expected
+    print("An interrupted flush is ignored, then removed.")
+
+    # A history has one writer at a time.
+    recorder = eh.ExecutionRecorder(directory)
+    try:
+        eh.ExecutionRecorder(directory)
+        secondp = True
+    except RuntimeError as error:
+        print(error)
+        secondp = False
+    recorder.close()
+    recorder.close()
+    assert secondp == (eh.fcntl is None)
+    eh.ExecutionRecorder(directory).close()
+    assert read_back(directory) == expected
+print("A history has one writer at a time.")
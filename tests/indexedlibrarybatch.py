@@ -0,0 +1,49 @@
+# Project RobustExecution
+
+# Test of dispatching a batch of scenarios from a library whose directory is indexed, but not yet read.
+
+# To run this scratch file from any project:
+import sys
+sys.path.insert(0,'/Users/brian/PycharmProjects/robustExecution/robust-execution')
+
+import json
+import shutil
+import tempfile
+from pathlib import Path
+import planlibrary as plib
+
+print('This scratch file indexes a copy of the examples directory, with a file that duplicates a plan name,')
+print('and dispatches its scenarios in a batch before any plan or scenario is read.')
+
+examples = Path(plib.__file__).parent / "examples"
+directory = Path(tempfile.mkdtemp())
+for name in ("hello_plan.txt", "hello_scenario.txt", "rescue_plan.txt", "rescue_scenario.txt"):
+    shutil.copy(examples / name, directory / name)
+
+# A second file of plan_1, which the index reports and doesn't use.
+with open(examples / "hello_plan.txt", "rt") as file:
+    duplicate = json.load(file)
+duplicate["sequence"] = duplicate["sequence"][:1]
+with open(directory / "zz_hello_plan.txt", "wt") as file:
+    json.dump(duplicate, file)
+
+library = plib.PlanLibrary(str(directory), trace = False, lazy = True)
+print(f"Indexed plans {library.plan_paths}, scenarios {library.scenario_paths}.")
+assert library.plan_paths["plan_1"] == "hello_plan.txt"
+assert library.index_directory() == [("zz_hello_plan.txt", "hello_plan.txt", "plan_1")]
+assert not library.plan_library and not library.scenario_library
+
+for jobs in (1, 2):
+    results = library.run_scenario_batch(jobs = jobs)
+    for result in results:
+        print(f"jobs {jobs}: {result}")
+    assert len(results) == 2 and all(result.successp for result in results)
+
+# A library that holds at most 10 actions of the plans it reads keeps only the most recently retrieved of these.
+library = plib.PlanLibrary(str(directory), trace = False, lazy = True, max_actions = 10)
+for plan_name in ("plan_1", "rescue_plan", "plan_1"):
+    library.get_plan(plan_name)
+print(f"Plans held with at most 10 actions: {list(library.plan_library)}.")
+assert list(library.plan_library) == ["plan_1"]
+
+shutil.rmtree(directory)
@@ -0,0 +1,59 @@
+# Project RobustExecution
+
+# Test of loading a directory of plan files in worker processes.
+
+# To run this scratch file from any project:
+import sys
+sys.path.insert(0,'/Users/brian/PycharmProjects/robustExecution/robust-execution')
+
+import json
+import random
+import shutil
+import tempfile
+from pathlib import Path
+import planlibrary as plib
+
+def random_plan(name: str, n_actions: int, seed: int) -> dict:
+    # Returns a random total order plan, each of whose actions reads and writes some of 6 variables.
+    rnd = random.Random(seed)
+    state = {f"var{i}": rnd.choice(["True", "False"]) for i in range(6)}
+    start = dict(state)
+    sequence = []
+    for i in range(n_actions):
+        precondition = {var: state[var] for var in rnd.sample(sorted(state), rnd.randint(0, 2))}
+        effect = {var: rnd.choice(["True", "False"]) for var in rnd.sample(sorted(state), rnd.randint(1, 2))}
+        state.update(effect)
+        sequence.append({"action": f"a{i}", "precondition": precondition, "effect": effect})
+    return {"plan_name": name, "start": start, "goal": dict(list(state.items())[:2]), "sequence": sequence}
+
+def plan_locations(plan) -> tuple:
+    # Returns the links, orderings and threats of a compiled plan, by the locations of their actions.
+    pop_plan = plan.partial_order_plan
+    links = [(link.consumer.location, str(link.condition), link.producer.location) for link in pop_plan.links]
+    orderings = sorted((o.predecessor.location, o.successor.location) for o in pop_plan.orderings)
+    threats = sorted((t.link.consumer.location, t.action.location) for t in plan.threats)
+    return links, orderings, threats
+
+# Worker processes import this file, so that the test runs only in the main process.
+if __name__ == "__main__":
+    print('This scratch file loads a directory of 20 plans and a broken plan file, in this process and in 2 workers,')
+    print('and checks that every valid plan loads as readplan loads it, and that the broken file is reported.')
+
+    directory = Path(tempfile.mkdtemp())
+    for i in range(20):
+        with open(directory / f"p{i:02}_plan.txt", "wt") as file:
+            json.dump(random_plan(f"p{i:02}", 40, i), file)
+    with open(directory / "broken_plan.txt", "wt") as file:
+        file.write('{"plan_name": "broken", "start": ')
+
+    expected = plib.PlanLibrary(str(directory), trace = False)
+    for jobs in (1, 2):
+        library = plib.PlanLibrary(str(directory), trace = False)
+        plans, failures = library.load_directory(jobs = jobs)
+        print(f"jobs {jobs}: loaded {len(plans)} plans, failed {[Path(path).name for path, _ in failures]}.")
+        assert len(plans) == 20 and sorted(library.plan_library) == [f"p{i:02}" for i in range(20)]
+        assert [Path(path).name for path, _ in failures] == ["broken_plan.txt"]
+        for plan_name, plan in library.plan_library.items():
+            assert plan_locations(plan) == plan_locations(expected.readplan(f"{plan_name}_plan.txt"))
+
+    shutil.rmtree(directory)
@@ -0,0 +1,73 @@
+# Project RobustExecution
+
+# Test of the numpy compiler backend, against the python backend.
+
+# To run this scratch file from any project:
+import sys
+sys.path.insert(0,'/Users/brian/PycharmProjects/robustExecution/robust-execution')
+
+import contextlib
+import io
+import random
+import planlibrary as plib
+import model.plans.totalorderplan as tp
+import plancompiler.extractpartialorderplan as ex
+import plancompiler.numpycompiler as nc
+
+print('This scratch file compiles random plans, with and without threats, with both backends,')
+print('and checks that they give the same links, orderings and threats, and that plans outside its limits are compiled by python.')
+
+def random_plan(n_actions: int, n_variables: int, seed: int) -> dict:
+    # Returns a random total order plan, each of whose actions reads and writes some of n_variables,
+    # and may read a value other than the variable's current one, so that some plans have threats.
+    rnd = random.Random(seed)
+    values = ["True", "False", "Unknown"]
+    state = {f"var{i}": rnd.choice(values) for i in range(n_variables)}
+    start = dict(state)
+    sequence = []
+    for i in range(n_actions):
+        precondition = {var: state[var] if rnd.random() < 0.95 else rnd.choice(values)
+                        for var in rnd.sample(sorted(state), rnd.randint(0, 2))}
+        effect = {var: rnd.choice(values) for var in rnd.sample(sorted(state), rnd.randint(1, 2))}
+        state.update(effect)
+        sequence.append({"action": f"a{i}", "precondition": precondition, "effect": effect})
+    return {"plan_name": f"plan{seed}", "start": start, "goal": dict(list(state.items())[:3]), "sequence": sequence}
+
+def plan_locations(pop_plan, threats) -> tuple:
+    # Returns the links, orderings and threats of a compiled plan, by the locations of their actions, in order.
+    def location(action):
+        return None if action is None else action.location
+    links = [(link.consumer.location, str(link.condition), location(link.producer)) for link in pop_plan.links]
+    orderings = [(o.predecessor.location, o.successor.location) for o in pop_plan.orderings]
+    threats = [(t.link.consumer.location, str(t.link.condition), t.action.location) for t in threats]
+    return links, orderings, threats
+
+def encoded_sequence(dict_plan: dict):
+    return tp.encode_total_order_plan(plib.dict2plan_sequence(dict_plan["sequence"]),
+                                      plib.dict2assignments(dict_plan["start"]), plib.dict2assignments(dict_plan["goal"]))
+
+if nc.np is None:
+    print("NumPy is not installed: every plan is compiled by the python backend.")
+else:
+    threatened = 0
+    for seed in range(40):
+        dict_plan = random_plan(random.Random(seed).choice([10, 60, 300]), random.Random(seed).choice([3, 8]), seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            python = plan_locations(*ex.extract_partial_order_plan(dict_plan["plan_name"], encoded_sequence(dict_plan)))
+            numpy = plan_locations(*nc.extract_partial_order_plan(dict_plan["plan_name"], encoded_sequence(dict_plan)))
+        assert python == numpy, dict_plan["plan_name"]
+        threatened += bool(python[2])
+    print(f"40 random plans, {threatened} with threats: both backends give the same links, orderings and threats.")
+
+    # A plan whose bit matrices are over the limit is compiled by python, with a warning.
+    dict_plan = random_plan(ex.NUMPY_MIN_ACTIONS + 50, 8, 1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = plan_locations(*ex.extract_partial_order_plan("plan", encoded_sequence(dict_plan)))
+    limit = ex.NUMPY_MAX_MATRIX_BYTES
+    ex.NUMPY_MAX_MATRIX_BYTES = nc.matrix_bytes(ex.NUMPY_MIN_ACTIONS)
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        fallback = plan_locations(*ex.extract_partial_order_plan("plan", encoded_sequence(dict_plan), backend = "numpy"))
+    ex.NUMPY_MAX_MATRIX_BYTES = limit
+    print(next(line for line in output.getvalue().splitlines() if "python backend" in line))
+    assert fallback == expected and "python backend" in output.getvalue()
+    assert nc.matrix_bytes(8) == 16 and nc.matrix_bytes(9) == 36
@@ -0,0 +1,86 @@
+# Project RobustExecution
+
+# Test of the persistent cache of compiled plans.
+
+# To run this scratch file from any project:
+import sys
+sys.path.insert(0,'/Users/brian/PycharmProjects/robustExecution/robust-execution')
+
+import os
+import random
+import shutil
+import tempfile
+import time
+import planlibrary as plib
+import plancompiler.plancache as pc
+import plancompiler.extractpartialorderplan as ex
+
+print('This scratch file compiles plans through a cache in a temporary directory,')
+print('and checks that restored plans equal compiled ones, that old compiler versions are removed,')
+print('and that the least recently used entries are evicted.')
+
+def random_plan(name: str, n_actions: int, seed: int) -> dict:
+    # Returns a random total order plan, each of whose actions reads and writes some of 6 variables.
+    rnd = random.Random(seed)
+    state = {f"var{i}": rnd.choice(["True", "False"]) for i in range(6)}
+    start = dict(state)
+    sequence = []
+    for i in range(n_actions):
+        precondition = {var: state[var] for var in rnd.sample(sorted(state), rnd.randint(0, 2))}
+        effect = {var: rnd.choice(["True", "False"]) for var in rnd.sample(sorted(state), rnd.randint(1, 2))}
+        state.update(effect)
+        sequence.append({"action": f"a{i}", "precondition": precondition, "effect": effect})
+    return {"plan_name": name, "start": start, "goal": dict(list(state.items())[:2]), "sequence": sequence}
+
+def plan_locations(plan) -> tuple:
+    # Returns the links, orderings and threats of a compiled plan, by the locations of their actions.
+    pop_plan = plan.partial_order_plan
+    links = [(link.consumer.location, str(link.condition), link.producer.location) for link in pop_plan.links]
+    orderings = sorted((o.predecessor.location, o.successor.location) for o in pop_plan.orderings)
+    threats = sorted((t.link.consumer.location, t.action.location) for t in plan.threats)
+    return links, orderings, threats
+
+directory = tempfile.mkdtemp()
+
+# An entry of an earlier compiler version, and a file that isn't the cache's, in the versions directory.
+old_version = os.path.join(directory, pc.VERSIONS_DIRECTORY, f"v{ex.COMPILER_VERSION - 1}")
+os.makedirs(old_version)
+with open(os.path.join(old_version, "0" * 64 + ".json"), "wt") as file:
+    file.write("{}")
+with open(os.path.join(directory, "notes.txt"), "wt") as file:
+    file.write("Not a compiled plan.")
+
+cache = pc.CompiledPlanCache(directory, max_entries = 5)
+assert not os.path.exists(old_version)
+assert os.path.exists(os.path.join(directory, "notes.txt"))
+
+plans = [random_plan(f"plan{i}", 60, i) for i in range(8)]
+compiled = plib.PlanLibrary(trace = False).dict2plan(plans[0])
+
+library = plib.PlanLibrary(trace = False, plan_cache = cache)
+first = library.dict2plan(plans[0])
+assert (cache.hits, cache.misses, cache.entry_count) == (0, 1, 1)
+
+# A second cache on the same directory, as in a later process, restores the same plan.
+restarted = pc.CompiledPlanCache(directory, max_entries = 5)
+restored = plib.PlanLibrary(trace = False, plan_cache = restarted).dict2plan(plans[0])
+print(f"Restored {restored}: {restarted.hits} hits, {restarted.misses} misses.")
+assert (restarted.hits, restarted.misses) == (1, 0)
+assert plan_locations(restored) == plan_locations(first) == plan_locations(compiled)
+
+# Writing an entry again replaces it, and isn't counted as a new entry.
+key = pc.plan_key(first.encoded_sequence)
+cache.write_entry(key, pc.encode_compiled_plan(key, first.partial_order_plan, first.threats))
+assert cache.entry_count == 1
+
+# Entries are evicted by least recent use, once there are more than 5: plan0, used last, is kept.
+for i, dict_plan in enumerate(plans[1:], 1):
+    library.dict2plan(dict_plan)
+    time.sleep(0.01)  # So that modification times order the entries.
+    library.dict2plan(plans[0])
+entries = os.listdir(os.path.join(directory, pc.VERSIONS_DIRECTORY, f"v{ex.COMPILER_VERSION}"))
+print(f"{len(entries)} entries after compiling {len(plans)} plans: {cache.hits} hits, {cache.misses} misses.")
+assert len(entries) <= 5 and cache.entry_count == len(entries)
+assert pc.plan_key(first.encoded_sequence) + ".json" in entries
+
+shutil.rmtree(directory)
@@ -0,0 +1,80 @@
+# Project RobustExecution
+
+# Test of writing the scenario output format as plans are dispatched.
+
+# To run this scratch file from any project:
+import sys
+sys.path.insert(0,'/Users/brian/PycharmProjects/robustExecution/robust-execution')
+
+import contextlib
+import io
+import json
+import tempfile
+from pathlib import Path
+import planlibrary as plib
+import planexecutive.executionscenario as es
+import planexecutive.scenariooutput as so
+import planexecutive.dispatcher.plandispatcher as pd
+
+print('This scratch file dispatches the rescue scenario, and a copy of it with a conflict, writing their scenario output,')
+print('and checks the output against the compiled plan, the scenario and its result, in both json and json lines modes.')
+
+library = plib.PlanLibrary(str(Path(plib.__file__).parent / "examples"), trace = False)
+for name in ("hello", "rescue"):
+    library.readplan(f"{name}_plan.txt")
+    library.readscenario(f"{name}_scenario.txt")
+rescue = library.get_scenario("rescue_scenario")
+stages = [es.Stage(stage.action_name, dict(stage.state_change)) for stage in rescue.stages]
+stages[2].state_change["in_air"] = "False"
+conflicting = es.ExecutionScenario("conflicting_scenario", rescue.plan_name, rescue.start, stages)
+plan = library.get_plan(rescue.plan_name)
+
+def write_output(scenario: es.ExecutionScenario) -> tuple[dict, es.ScenarioResult]:
+    # Dispatches scenario, and returns its scenario output, read back, and its result.
+    dispatcher = pd.Dispatcher(f"Dispatcher for {scenario.plan_name}", plan, trace = False)
+    output = io.StringIO()
+    dispatcher.events.attach(so.ScenarioOutputWriter(output, plan.partial_order_plan))
+    result = plib.scenario_result(scenario, *dispatcher.dispatch_scenario(scenario))
+    return json.loads(output.getvalue()), result
+
+for scenario in (rescue, conflicting):
+    output, result = write_output(scenario)
+    partial_plan = output["partial_plan"]
+    assert partial_plan == so.partial_plan2dict(plan.partial_order_plan)
+    assert [action["name"] for action in partial_plan["actions"]] == [a.operator for a in plan.partial_order_plan.actions]
+    assert len(partial_plan["links"]) == len(plan.partial_order_plan.links)
+
+    # The start's state change, then a stage for each action dispatched, up to the first conflict.
+    execution = output["monitored_execution"]
+    assert execution[0] == {"start": scenario.start}
+    # The actions completed after start, followed, if the execution failed, by the action that produced the conflict.
+    actions = [stage["action"] for stage in execution[1:]]
+    assert actions[:len(result.completed) - 1] == result.completed[1:]
+    assert len(actions) == len(result.completed) - result.successp
+    for stage, scenario_stage in zip(execution[1:], scenario.stages):
+        assert stage["state-change"] == scenario_stage.state_change
+    assert all("conflicts" not in stage for stage in execution[:-1])
+    assert execution[-1].get("conflicts", []) == result.conflicts
+    print(f"{scenario.scenario_name}: {len(execution)} stages, {len(result.conflicts)} conflicts, "
+          f"as dispatched.  Last stage: {execution[-1]}")
+
+# Executions dispatched together, to a file each, and to one json lines file.
+with tempfile.TemporaryDirectory() as directory:
+    names = list(library.scenario_library)
+    with contextlib.redirect_stdout(io.StringIO()):
+        library.dispatch_scenarios(names, max_concurrent = 4, trace = False, output_directory = directory)
+        library.dispatch_scenarios(names, max_concurrent = 4, trace = False, output_directory = directory,
+                                   json_lines = True)
+    by_scenario = dict()
+    with open(Path(directory) / "scenario_output.jsonl") as file:
+        for line in file:
+            record = json.loads(line)
+            by_scenario.setdefault(record.pop("scenario"), []).append(record)
+    assert sorted(by_scenario) == sorted(names)
+    for name in names:
+        with open(Path(directory) / f"{name}_output.json") as file:
+            output = json.load(file)
+        scenario_lines = by_scenario[name]
+        assert scenario_lines[0] == {"partial_plan": output["partial_plan"]}
+        assert scenario_lines[1:] == output["monitored_execution"]
+    print(f"{len(names)} scenarios dispatched together: the json lines output has the stages of each json output.")
@@ -0,0 +1,125 @@
+# Project RobustExecution
+
+# Test of the streaming compiler, against extract_partial_order_plan.
+
+# To run this scratch file from any project:
+import sys
+sys.path.insert(0,'/Users/brian/PycharmProjects/robustExecution/robust-execution')
+
+import gc
+import random
+import time
+import planlibrary as plib
+import model.plans.totalorderplan as tp
+import plancompiler.streamingcompiler as sc
+
+print('This scratch file compiles plans with the streaming compiler, compares them with extract_partial_order_plan,')
+print('and checks that the windows it keeps stay bounded as plans grow.')
+
+def machine_plan(n_actions: int, n_variables: int, seed: int = 0) -> dict:
+    # Returns a plan without threats, each of whose actions moves one or two variables to a new value,
+    # from the value it reads, and may read a third variable, so that each value written is read before it is overwritten.
+    rnd = random.Random(seed)
+    values = ["a", "b", "c"]
+    state = {f"var{i}": "a" for i in range(n_variables)}
+    start = dict(state)
+    sequence = []
+    for i in range(n_actions):
+        moved = rnd.sample(sorted(state), rnd.randint(1, 2))
+        read = rnd.sample(sorted(state), 1)
+        precondition = {var: state[var] for var in moved + read}
+        effect = {var: rnd.choice([value for value in values if value != state[var]]) for var in moved}
+        state.update(effect)
+        sequence.append({"action": f"m{i}", "precondition": precondition, "effect": effect})
+    return {"plan_name": "machine", "start": start, "goal": dict(state), "sequence": sequence}
+
+def toggle_plan(n_actions: int) -> dict:
+    # Returns a plan each of whose actions reads ok and toggles x, which nothing reads until the goal.
+    sequence = [{"action": f"t{i}", "precondition": {"ok": "True"}, "effect": {"x": str(i % 2 == 0)}}
+                for i in range(n_actions)]
+    return {"plan_name": "toggle", "start": {"ok": "True", "x": "False"},
+            "goal": {"x": str((n_actions - 1) % 2 == 0)}, "sequence": sequence}
+
+def reachability(n_actions: int, pairs) -> list[int]:
+    # Returns, for each location, the bit set of the locations that follow it in the order given by pairs,
+    # which lead from earlier to later locations.
+    successors = [[] for _ in range(n_actions)]
+    for predecessor, successor in pairs:
+        successors[predecessor].append(successor)
+    reach = [0] * n_actions
+    for location in range(n_actions - 1, -1, -1):
+        for successor in successors[location]:
+            reach[location] |= reach[successor] | (1 << successor)
+    return reach
+
+def order_pairs(pop_plan) -> list[tuple[int, int]]:
+    return [(link.producer.location, link.consumer.location) for link in pop_plan.links] + \
+           [(o.predecessor.location, o.successor.location) for o in pop_plan.orderings]
+
+def compare(dict_plan: dict) -> tuple[list[int], list[int]]:
+    # Compiles dict_plan both ways, checks that the links are the same, that every ordering is consistent
+    # with the plan's sequence, and that the streamed partial order implies extract_partial_order_plan's.
+    # Returns the reachability of each partial order.
+    start = plib.dict2assignments(dict_plan["start"])
+    goal = plib.dict2assignments(dict_plan["goal"])
+    plan = tp.TotalOrderPlan(dict_plan["plan_name"], plib.dict2plan_sequence(dict_plan["sequence"]), start, goal)
+    streamed, threats = sc.compile_stream(dict_plan["plan_name"], plib.dict2plan_sequence(dict_plan["sequence"]), start, goal)
+    assert not threats and not plan.threats
+
+    def link_locations(pop_plan):
+        return sorted((link.consumer.location, str(link.condition), link.producer.location) for link in pop_plan.links)
+    assert link_locations(streamed) == link_locations(plan.partial_order_plan)
+    assert all(o.predecessor.location < o.successor.location for o in streamed.orderings)
+
+    n = len(plan.encoded_sequence)
+    expected = reachability(n, order_pairs(plan.partial_order_plan))
+    reach = reachability(n, order_pairs(streamed))
+    assert all(expected[location] & ~reach[location] == 0 for location in range(n))
+    return expected, reach
+
+def max_window(dict_plan: dict) -> dict:
+    # Streams dict_plan, returning the largest size of each variable's window.
+    windows = dict()
+    sizes = dict()
+    sequence = plib.dict2plan_sequence(dict_plan["sequence"])
+    encoded = sc.encode_action_stream(sequence, plib.dict2assignments(dict_plan["start"]),
+                                      plib.dict2assignments(dict_plan["goal"]))
+    for action in encoded:
+        for _ in sc.compile_action(action, windows, []):
+            pass
+        for variable, window in windows.items():
+            sizes[variable] = max(sizes.get(variable, 0), window.size())
+    return sizes
+
+# A plan whose every value is read before it is overwritten: the partial orders are the same.
+expected, reach = compare(machine_plan(300, 8))
+assert expected == reach
+print("Machine plan of 300 actions: same links and partial order as extract_partial_order_plan.")
+
+# A plan whose writes of x aren't read: the streamed order chains them, and implies extract_partial_order_plan's.
+expected, reach = compare(toggle_plan(50))
+print(f"Toggle plan of 50 actions: same links, {sum(bin(r).count('1') for r in reach)} ordered pairs,"
+      f" of which extract_partial_order_plan orders {sum(bin(r).count('1') for r in expected)}.")
+
+# Windows hold each variable's values and the readers since its last writer, however long the plan.
+for n_actions in (1000, 10000):
+    sizes = max_window(machine_plan(n_actions, 8))
+    print(f"Machine plan of {n_actions} actions: largest window {max(sizes.values())}.")
+    assert max(sizes.values()) <= 40
+sizes = max_window(toggle_plan(10000))
+print(f"Toggle plan of 10000 actions: largest windows {sizes}.")
+assert sizes["x"] <= 4  # The readers of ok, which is never written again, are all kept.
+
+# Compilation time is linear in the length of the plan.
+# The garbage collector, whose passes over the records collected grow with them, is paused while timing.
+times = []
+gc.disable()
+for n_actions in (20000, 80000):
+    dict_plan = toggle_plan(n_actions)
+    sequence = plib.dict2plan_sequence(dict_plan["sequence"])
+    started = time.perf_counter()
+    sc.compile_stream("toggle", sequence, plib.dict2assignments(dict_plan["start"]), plib.dict2assignments(dict_plan["goal"]))
+    times.append(time.perf_counter() - started)
+    print(f"Streamed toggle plan of {n_actions} actions in {times[-1]:.2f} s.")
+gc.enable()
+assert times[1] < 6 * times[0]
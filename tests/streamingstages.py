@@ -0,0 +1,96 @@
+# Project RobustExecution
+
+# Test of dispatching scenarios in the scenario lines format, whose stages are read as they are dispatched.
+
+# To run this scratch file from any project:
+import sys
+sys.path.insert(0,'/Users/brian/PycharmProjects/robustExecution/robust-execution')
+
+import contextlib
+import io
+import json
+import tempfile
+from pathlib import Path
+import planlibrary as plib
+import planexecutive.executionscenario as es
+import planexecutive.dispatcher.plandispatcher as pd
+
+print('This scratch file writes the rescue scenario, a copy of it with a conflict, and a scenario of 5000 stages')
+print('in the scenario lines format, and checks that each dispatches with the result of its json scenario,')
+print('reading only a few stages ahead of the actions dispatched.')
+
+def result_dict(result: es.ScenarioResult) -> dict:
+    # Returns the result as a dictionary, without the scenario name.
+    return {key: value for key, value in result.to_dict().items() if key != "scenario_name"}
+
+def dispatch(library: plib.PlanLibrary, scenario: es.ExecutionScenario) -> dict:
+    # Dispatches scenario with the plan dispatcher, and returns its result.
+    dispatcher = pd.Dispatcher(f"Dispatcher for {scenario.plan_name}", library.get_plan(scenario.plan_name), trace = False)
+    return result_dict(plib.scenario_result(scenario, *dispatcher.dispatch_scenario(scenario)))
+
+# The widest window of stages read, over the stage readers of every dispatch.
+widest = [0]
+read_stage = es.StageReader.stage
+def stage(reader: es.StageReader, index: int) -> es.Stage or None:
+    read = read_stage(reader, index)
+    widest[0] = max(widest[0], len(reader.window))
+    return read
+es.StageReader.stage = stage
+
+with tempfile.TemporaryDirectory() as directory:
+    directory = Path(directory)
+    # A plan of 5000 actions, each of which counts x up by one, and its scenario.
+    long_plan = {"plan_name": "long_plan", "start": {"x": "0"}, "goal": {"x": "5000"},
+                 "sequence": [{"action": f"step{i}", "precondition": {"x": str(i)}, "effect": {"x": str(i + 1)}}
+                              for i in range(5000)]}
+    long_scenario = {"scenario_name": "long_scenario", "plan_name": "long_plan", "start": {"x": "0"},
+                     "sequence": [{"action": f"step{i}", "state_change": {"x": str(i + 1)}} for i in range(5000)]}
+    with open(directory / "long_plan.txt", "wt") as file:
+        json.dump(long_plan, file)
+    with open(directory / "long_scenario.txt", "wt") as file:
+        json.dump(long_scenario, file)
+    examples = Path(plib.__file__).parent / "examples"
+    for name in ("rescue_plan.txt", "rescue_scenario.txt"):
+        (directory / name).write_text((examples / name).read_text())
+
+    library = plib.PlanLibrary(str(directory), trace = False)
+    library.readplan("rescue_plan.txt")
+    library.readplan("long_plan.txt")
+    rescue = library.readscenario("rescue_scenario.txt")
+    stages = [es.Stage(stage.action_name, dict(stage.state_change)) for stage in rescue.stages]
+    stages[2].state_change["in_air"] = "False"
+    conflicting = es.ExecutionScenario("conflicting_scenario", rescue.plan_name, rescue.start, stages)
+    scenarios = [rescue, conflicting, library.readscenario("long_scenario.txt")]
+
+    for scenario in scenarios:
+        plib.write_scenario_lines(scenario, str(directory / f"{scenario.scenario_name}_lines_scenario.jsonl"))
+        streaming = library.readscenario(f"{scenario.scenario_name}_lines_scenario.jsonl")
+        assert isinstance(streaming, es.StreamingExecutionScenario) and not streaming.stages
+        assert streaming.plan_name == scenario.plan_name and streaming.start == scenario.start
+        assert [str(stage) for stage in streaming.stage_iterator()] == [str(stage) for stage in scenario.stages]
+        widest[0] = 0
+        expected = dispatch(library, scenario)
+        assert dispatch(library, streaming) == expected
+        assert dispatch(library, streaming) == expected  # Each dispatch reads the file again.
+        print(f"{scenario.scenario_name}: {len(scenario.stages)} stages, success {expected['success']}, "
+              f"the same from its lines file, keeping at most {widest[0]} stages read.")
+        assert widest[0] <= 4
+
+    # Scenario lines files in a batch, dispatched here and by worker processes, found by their first line.
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = [dispatch(library, scenario) for scenario in scenarios]
+        for jobs in (1, 2):
+            results = library.run_scenario_batch(pattern = "*_lines_scenario.jsonl", jobs = jobs)
+            assert sorted(json.dumps(result_dict(result)) for result in results) == \
+                   sorted(json.dumps(result) for result in expected)
+    print("A batch of the lines files, with 1 and 2 jobs, has the results of their json scenarios.")
+
+    # Up to 4 actions of a scenario running at once, in this process.
+    widest[0] = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = library.run_scenario_batch(pattern = "*_lines_scenario.jsonl", jobs = 1, max_concurrent = 4)
+    assert sorted(json.dumps(result_dict(result)) for result in results) == sorted(json.dumps(result) for result in expected)
+    print(f"With 4 actions running at once: the same results, keeping at most {widest[0]} stages read.")
+    assert widest[0] <= 8
+
+es.StageReader.stage = read_stage
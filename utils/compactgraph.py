@@ -0,0 +1,353 @@
+from array import array
+from typing import Any
+
+# A directed graph with the operations of DirectedGraph,
+# whose vertices and edges are integer ids into flat arrays, rather than objects.
+# Out edges are kept in compressed sparse row (CSR) form:
+# the out edges of vertex v are out_edge_ids[out_offsets[v]:out_offsets[v + 1]].
+
+class CompactDirectedGraph:
+    def __init__(self, name, reachability: bool = False):
+        self.name = name
+        self.start = -1  # Id of the start vertex, -1 if none.
+
+        # Vertex columns, indexed by vertex id.
+        self.vertex_names = []
+        self.vertex_marks = bytearray()
+        self.vertex_named = dict()  # Maps a vertex name to its id.
+
+        # Edge columns, indexed by edge id.
+        self.edge_names = []
+        self.edge_sources = array('l')
+        self.edge_targets = array('l')
+        self.edge_priorities = array('l')
+        self.edge_marks = bytearray()
+        self.edge_named = dict()  # Maps an edge name to its id.
+
+        # CSR index of out edges, rebuilt on traversal after edges are added.
+        self.out_offsets = array('l', [0])
+        self.out_edge_ids = array('l')
+        self.csr_valid = True
+
+        # Transitive closure as reachability bitsets, as in DirectedGraph.
+        self.reachability = reachability
+        self.reachable = None
+
+
+    def __str__(self):
+        return f"{self.name}"
+
+
+    def vertex_string(self, vertex: int) -> str:
+        if vertex == self.start:
+            return f"{self.vertex_names[vertex]}(S)"
+        else:
+            return f"{self.vertex_names[vertex]}"
+
+
+    def edge_string(self, edge: int) -> str:
+        source = self.vertex_string(self.edge_sources[edge])
+        target = self.vertex_string(self.edge_targets[edge])
+        if self.edge_names[edge]:
+            return f"[{self.edge_names[edge]}, {source}, {target}]"
+        else:
+            return f"[{source}, {target}]"
+
+
+    def describe_graph(self, markedp: bool = False):
+        # Print a description of Graph vertices and edges.
+        # If markedp is True, then only print marked vertices and edges,
+        # else print all edges and vertices.
+        vertices = range(len(self.vertex_names))
+        edges = range(len(self.edge_names))
+        if markedp:
+            sv = [self.vertex_string(v) for v in vertices if self.vertex_marks[v]]
+            se = [self.edge_string(e) for e in edges if self.edge_marks[e]]
+            print(f"Graph {self.name}, marked vertices {sv}, marked edges: {se}.")
+        else:
+            sv = [self.vertex_string(v) for v in vertices]
+            se = [self.edge_string(e) for e in edges]
+            print(f"Graph {self.name}, vertices {sv}, edges: {se}.")
+
+
+    def add_vertex(self, name: Any, startp: bool = False) -> int:
+        # Creates a vertex with name and returns its id.
+        # startp is true if vertex is the start vertex.
+        vertex = len(self.vertex_names)
+        self.vertex_named[name] = vertex
+        self.vertex_names.append(name)
+        self.vertex_marks.append(0)
+        self.out_offsets.append(self.out_offsets[-1])
+        if startp:
+            self.start = vertex
+        if self.reachable is not None:
+            self.reachable.append(0)
+        return vertex
+
+
+    def check_has_vertex(self, vertex_name: Any):
+        if not vertex_name in self.vertex_named:
+            print(f"{vertex_name} is not a vertex of {self}.")
+
+
+    def get_vertex(self, name: Any, startp: bool = False) -> int:
+        # Retrieves the id of the vertex with name, else creates.
+        # startp is true if vertex is the start vertex.
+        if name in self.vertex_named:
+            vertex = self.vertex_named[name]
+            if startp:
+                self.start = vertex
+            return vertex
+        else:
+            return self.add_vertex(name, startp)
+
+
+    def add_edge(self, edge_name: Any, source_name: Any, target_name: Any, priority: int) -> int:
+        # Creates an edge with edge_name and priority, from the vertex of source_name to the vertex of target_name.
+        # Returns its id.  Creates vertices if they don't exist.
+        source = self.get_vertex(source_name)
+        target = self.get_vertex(target_name)
+        edge = len(self.edge_names)
+        self.edge_named[edge_name] = edge
+        self.edge_names.append(edge_name)
+        self.edge_sources.append(source)
+        self.edge_targets.append(target)
+        self.edge_priorities.append(priority)
+        self.edge_marks.append(0)
+        self.csr_valid = False
+        if self.reachable is not None:
+            self.add_edge_to_reachability(source, target)
+        return edge
+
+
+    def edge_markedp(self, edge_name: Any) -> bool:
+        # Returns True if the edge named edge_name is marked.
+        return bool(self.edge_marks[self.edge_named[edge_name]])
+
+
+    def build_csr(self) -> None:
+        # Sorts edge ids by source vertex with a counting sort,
+        # keeping the out edges of each vertex in the order they were added.
+        if self.csr_valid:
+            return
+        n_vertices = len(self.vertex_names)
+        offsets = array('l', [0]) * (n_vertices + 1)
+        for source in self.edge_sources:
+            offsets[source + 1] += 1
+        for vertex in range(n_vertices):
+            offsets[vertex + 1] += offsets[vertex]
+        edge_ids = array('l', [0]) * len(self.edge_sources)
+        position = offsets[:-1]
+        for edge, source in enumerate(self.edge_sources):
+            edge_ids[position[source]] = edge
+            position[source] += 1
+        self.out_offsets = offsets
+        self.out_edge_ids = edge_ids
+        self.csr_valid = True
+
+
+    def out_edges(self, vertex: int) -> array:
+        # Returns the ids of the out edges of vertex.
+        self.build_csr()
+        return self.out_edge_ids[self.out_offsets[vertex]:self.out_offsets[vertex + 1]]
+
+
+    def path_exists(self, source_name: Any, target_name: Any) -> bool:
+        # Returns True if there exists a path in graph from source to target.
+        # Creates vertices if they don't exist.
+
+        source = self.get_vertex(source_name)
+        target = self.get_vertex(target_name)
+        if target == source:
+            return True
+
+        # Test the bit of target in the reachability set of source.
+        if self.reachability:
+            if self.reachable is None:
+                self.compute_reachability()
+            if self.reachable is not None:
+                return bool(self.reachable[source] >> target & 1)
+
+        # Search depth-first through graph from source to target.
+        self.build_csr()
+        offsets = self.out_offsets
+        edge_ids = self.out_edge_ids
+        targets = self.edge_targets
+        marks = self.vertex_marks
+        self.remove_marks()
+        marks[source] = 1
+        queue = list(edge_ids[offsets[source]:offsets[source + 1]])
+
+        while queue:
+            vert = targets[queue.pop()]
+            # - Visit a vertex at most once.
+            if not marks[vert]:
+
+                # - Mark vertex as reached.
+                marks[vert] = 1
+
+                # If target reached, return success.
+                if vert == target:
+                    return True
+
+                # - Traverse outgoing edges.
+                queue.extend(edge_ids[offsets[vert]:offsets[vert + 1]])
+
+        return False
+
+
+    def topological_order(self) -> list[int] or None:
+        # Returns the vertex ids of graph, ordered so that every edge goes from an earlier to a later vertex.
+        # Returns None if graph has a cycle.
+        self.build_csr()
+        offsets = self.out_offsets
+        edge_ids = self.out_edge_ids
+        targets = self.edge_targets
+        in_degree = array('l', [0]) * len(self.vertex_names)
+        for target in targets:
+            in_degree[target] += 1
+        order = [vertex for vertex in range(len(in_degree)) if in_degree[vertex] == 0]
+        for vertex in order:
+            # order grows while it is traversed.
+            for edge in edge_ids[offsets[vertex]:offsets[vertex + 1]]:
+                target = targets[edge]
+                in_degree[target] -= 1
+                if in_degree[target] == 0:
+                    order.append(target)
+        if len(order) < len(in_degree):
+            return None
+        return order
+
+
+    def compute_reachability(self) -> None:
+        # Computes the transitive closure of graph as reachability bitsets,
+        # visiting vertices in reverse topological order.
+        # If graph has a cycle, reachability is turned off and path_exists falls back to search.
+        order = self.topological_order()
+        if order is None:
+            print(f"Graph {self} has a cycle. Searching for paths instead.")
+            self.reachability = False
+            self.reachable = None
+            return
+
+        offsets = self.out_offsets
+        edge_ids = self.out_edge_ids
+        targets = self.edge_targets
+        reachable = [0] * len(self.vertex_names)
+        for vertex in reversed(order):
+            bits = 0
+            for edge in edge_ids[offsets[vertex]:offsets[vertex + 1]]:
+                target = targets[edge]
+                bits |= reachable[target] | (1 << target)
+            reachable[vertex] = bits
+        self.reachable = reachable
+
+
+    def add_edge_to_reachability(self, source: int, target: int) -> None:
+        # Updates the reachability sets for a new edge from source to target.
+        # Every vertex that reaches source, and source itself, now reaches target and all that target reaches.
+        reachable = self.reachable
+        source_bit = 1 << source
+        if source == target or reachable[target] & source_bit:
+            print(f"Edge from {self.vertex_string(source)} to {self.vertex_string(target)} closes a cycle in {self}."
+                  f" Searching for paths instead.")
+            self.reachability = False
+            self.reachable = None
+            return
+
+        new_bits = reachable[target] | (1 << target)
+        if new_bits & ~reachable[source]:
+            for vertex, bits in enumerate(reachable):
+                if vertex == source or bits & source_bit:
+                    reachable[vertex] = bits | new_bits
+
+
+    def clear_reachability(self) -> None:
+        # Discards the reachability sets, which are recomputed on the next query.
+        # Used before adding many edges at once, to avoid updating the sets for each edge.
+        self.reachable = None
+
+
+    def mark_transitive_reduction(self) -> int or None:
+        # Marks the edges of the transitive reduction of graph, as in DirectedGraph.
+        # Among parallel edges, the edge with the lowest priority is marked.
+        # Graph must be acyclic.  Returns the number of edges that are not marked,
+        # or None if graph has a cycle, in which case no reduction exists and no edge is marked.
+
+        order = self.topological_order()
+        if order is None:
+            print(f"Graph {self} has a cycle. Can't construct transitive reduction.")
+            self.remove_marks()
+            return None
+
+        self.remove_marks()
+        offsets = self.out_offsets
+        edge_ids = self.out_edge_ids
+        targets = self.edge_targets
+        priorities = self.edge_priorities
+        edge_marks = self.edge_marks
+        position = array('l', [0]) * len(order)
+        for i, vertex in enumerate(order):
+            position[vertex] = i
+
+        reachable = [0] * len(order)
+        unmarked = 0
+        for vertex in reversed(order):
+            self.vertex_marks[vertex] = 1
+            bits = 0
+            out_edges = sorted(edge_ids[offsets[vertex]:offsets[vertex + 1]],
+                               key = lambda e: (position[targets[e]], priorities[e]))
+            for edge in out_edges:
+                target = targets[edge]
+                if bits >> target & 1:
+                    unmarked += 1
+                else:
+                    edge_marks[edge] = 1
+                    bits |= reachable[target] | (1 << target)
+            reachable[vertex] = bits
+
+        if self.reachability:
+            self.reachable = reachable
+        return unmarked
+
+
+    def mark_preferred_spanning_tree(self) -> None:
+        # Mark edges of graph to form a spanning tree
+        # by performing a depth-first-traversal.
+
+        # - Start from the start vertex.
+        start = self.start
+        if start < 0:
+            print(f"Missing start for graph {self}. Can't construct spanning tree.")
+        else:
+            self.remove_marks()
+            self.build_csr()
+            offsets = self.out_offsets
+            edge_ids = self.out_edge_ids
+            targets = self.edge_targets
+            priorities = self.edge_priorities
+            vertex_marks = self.vertex_marks
+            edge_marks = self.edge_marks
+            queue = list(edge_ids[offsets[start]:offsets[start + 1]])
+            vertex_marks[start] = 1
+
+            while queue:
+                # Elements are taken off the end of the queue.
+                edge = queue.pop()
+                vert = targets[edge]
+                # - Visit a vertex at most once.
+                if not vertex_marks[vert]:
+                    # - Mark edges that newly visit a vertex as in the spanning tree.
+                    edge_marks[edge] = 1
+                    vertex_marks[vert] = 1
+                    # - Traverse edges by increasing priority.
+                    # Elements are added to the end of the queue, in decreasing priority.
+                    next_edges = sorted(edge_ids[offsets[vert]:offsets[vert + 1]],
+                                        key = priorities.__getitem__, reverse = True)
+                    queue.extend(next_edges)
+
+
+    def remove_marks(self) -> None:
+        # Remove marks on vertices and edges of graph
+        self.vertex_marks[:] = bytes(len(self.vertex_marks))
+        self.edge_marks[:] = bytes(len(self.edge_marks))
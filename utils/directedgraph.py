@@ -3,9 +3,10 @@ from typing import Any
 # Basic operations on a directed graph.
 
 class DGVertex:
-    def __init__(self, name: Any, startp: bool) -> None:
+    def __init__(self, name: Any, startp: bool, index: int = 0) -> None:
         self.name = name
         self.startp = startp
+        self.index = index  # Position of vertex in its graph, used as its bit in reachability sets.
         self.out_edges = []
         self.in_edges = []
         self.mark = False
@@ -41,7 +42,7 @@ def edge_priority(edge: DGEdge) -> int:
 
 
 class DirectedGraph:
-    def __init__(self, name):
+    def __init__(self, name, reachability: bool = False):
         self.name = name
         self.start = None
         self.vertices = []
@@ -49,6 +50,13 @@ class DirectedGraph:
         self.vertex_named = dict()
         self.edge_named = dict()
 
+        # If reachability is True, path_exists is answered from the transitive closure of the graph,
+        # which requires the graph to be acyclic.
+        # The closure is a list, indexed by vertex index, of integer bitsets of the vertices reachable from each vertex.
+        # It is computed on the first query and updated as edges are added.
+        self.reachability = reachability
+        self.reachable = None
+
 
     def __str__(self):
         return f"{self.name}"
@@ -71,9 +79,12 @@ class DirectedGraph:
     def add_vertex(self, name: Any, startp: bool = False) -> DGVertex:
         # Creates a vertex with name and adds to the vertex dictionary.
         # startp is true if vertex is the start vertex.
-        vertex = DGVertex(name, startp)
+        vertex = DGVertex(name, startp, len(self.vertices))
         self.vertex_named[name] = vertex
         self.vertices.append(vertex)
+        if self.reachable is not None:
+            # A new vertex reaches nothing.
+            self.reachable.append(0)
         if startp:
             self.start = vertex
         return vertex
@@ -104,9 +115,16 @@ class DirectedGraph:
         edge = DGEdge(edge_name, source, target, priority)
         self.edge_named[edge_name] = edge
         self.edges.append(edge)
+        if self.reachable is not None:
+            self.add_edge_to_reachability(source, target)
         return edge
 
 
+    def edge_markedp(self, edge_name: Any) -> bool:
+        # Returns True if the edge named edge_name is marked.
+        return self.edge_named[edge_name].mark
+
+
     def path_exists(self, source_name: Any, target_name: Any) -> bool:
         # Returns True if there exists a path in graph from source to target.
         # Creates vertices if they don't exist.
@@ -116,6 +134,13 @@ class DirectedGraph:
         if target == source:
             return True
 
+        # Test the bit of target in the reachability set of source.
+        if self.reachability:
+            if self.reachable is None:
+                self.compute_reachability()
+            if self.reachable is not None:
+                return bool(self.reachable[source.index] >> target.index & 1)
+
         # Search depth-first through graph from source to target.
         queue = source.out_edges.copy()
         self.remove_marks()
@@ -140,6 +165,111 @@ class DirectedGraph:
         return False
 
 
+    def topological_order(self) -> list[DGVertex] or None:
+        # Returns the vertices of graph, ordered so that every edge goes from an earlier to a later vertex.
+        # Returns None if graph has a cycle.
+        in_degree = [len(vertex.in_edges) for vertex in self.vertices]
+        order = [vertex for vertex in self.vertices if in_degree[vertex.index] == 0]
+        for vertex in order:
+            # order grows while it is traversed.
+            for edge in vertex.out_edges:
+                target = edge.target
+                in_degree[target.index] -= 1
+                if in_degree[target.index] == 0:
+                    order.append(target)
+        if len(order) < len(self.vertices):
+            return None
+        return order
+
+
+    def compute_reachability(self) -> None:
+        # Computes the transitive closure of graph as reachability bitsets,
+        # visiting vertices in reverse topological order,
+        # so that the sets of a vertex's successors are complete when the vertex is visited.
+        # If graph has a cycle, reachability is turned off and path_exists falls back to search.
+        order = self.topological_order()
+        if order is None:
+            print(f"Graph {self} has a cycle. Searching for paths instead.")
+            self.reachability = False
+            self.reachable = None
+            return
+
+        reachable = [0] * len(self.vertices)
+        for vertex in reversed(order):
+            bits = 0
+            for edge in vertex.out_edges:
+                index = edge.target.index
+                bits |= reachable[index] | (1 << index)
+            reachable[vertex.index] = bits
+        self.reachable = reachable
+
+
+    def add_edge_to_reachability(self, source: DGVertex, target: DGVertex) -> None:
+        # Updates the reachability sets for a new edge from source to target.
+        # Every vertex that reaches source, and source itself, now reaches target and all that target reaches.
+        reachable = self.reachable
+        source_bit = 1 << source.index
+        if source == target or reachable[target.index] & source_bit:
+            print(f"Edge from {source} to {target} closes a cycle in {self}. Searching for paths instead.")
+            self.reachability = False
+            self.reachable = None
+            return
+
+        new_bits = reachable[target.index] | (1 << target.index)
+        if new_bits & ~reachable[source.index]:
+            for index, bits in enumerate(reachable):
+                if index == source.index or bits & source_bit:
+                    reachable[index] = bits | new_bits
+
+
+    def clear_reachability(self) -> None:
+        # Discards the reachability sets, which are recomputed on the next query.
+        # Used before adding many edges at once, to avoid updating the sets for each edge.
+        self.reachable = None
+
+
+    def mark_transitive_reduction(self) -> int or None:
+        # Marks the edges of the transitive reduction of graph,
+        # the minimal set of edges that preserves which vertices reach which.
+        # Among parallel edges, the edge with the lowest priority is marked.
+        # Graph must be acyclic.  Returns the number of edges that are not marked,
+        # or None if graph has a cycle, in which case no reduction exists and no edge is marked.
+
+        order = self.topological_order()
+        if order is None:
+            print(f"Graph {self} has a cycle. Can't construct transitive reduction.")
+            self.remove_marks()
+            return None
+
+        self.remove_marks()
+        position = [0] * len(self.vertices)
+        for i, vertex in enumerate(order):
+            position[vertex.index] = i
+
+        # Visit vertices in reverse topological order, computing reachability sets as in compute_reachability.
+        # The out edges of a vertex are visited nearest target first.
+        # An edge is in the reduction if its target isn't reached through the nearer targets,
+        # since any other path to the target passes through a nearer target.
+        reachable = [0] * len(self.vertices)
+        unmarked = 0
+        for vertex in reversed(order):
+            vertex.mark = True
+            bits = 0
+            out_edges = sorted(vertex.out_edges, key = lambda e: (position[e.target.index], e.priority))
+            for edge in out_edges:
+                index = edge.target.index
+                if bits >> index & 1:
+                    unmarked += 1
+                else:
+                    edge.mark = True
+                    bits |= reachable[index] | (1 << index)
+            reachable[vertex.index] = bits
+
+        if self.reachability:
+            self.reachable = reachable
+        return unmarked
+
+
     def mark_preferred_spanning_tree(self) -> None:
         # Mark edges of graph to form a spanning tree
         # by performing a depth-first-traversal.